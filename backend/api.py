@@ -4,16 +4,15 @@ from pydantic import BaseModel
 import os
 import json
 import re
+from datetime import datetime
 from openai import OpenAI
 from typing import List, Optional, Dict
 from .utils import parse_response_to_likert, compute_axis_score
 from .providers import call_model
-from .supabase_db import (
-    update_ratings, get_all_ratings, init_database, store_vote_tags, 
-    ensure_tags_table_exists, store_dimension_scores, get_aggregated_dimension_scores,
-    get_dimension_leaderboard
-)
-from .tags import calculate_dimension_scores, validate_tag, get_all_tags
+from .supabase_db import init_database
+from . import async_db, matchmaking, windowed
+from .tags import calculate_dimension_scores, validate_tag, get_all_tags, DIMENSIONS, TAG_CATEGORY
+from .segments import vote_segments
 
 
 app = FastAPI()
@@ -24,6 +23,11 @@ try:
 except Exception as e:
     print(f"Warning: Could not initialize database: {e}")
 
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await async_db.close_pool()
+
 # Add CORS middleware to allow requests from GitHub Pages
 app.add_middleware(
     CORSMiddleware,
@@ -66,6 +70,8 @@ class VoteRequest(BaseModel):
     winner_model: str
     loser_model: str
     prompt: str = None  # Optional: for logging/analytics
+    mode: str = "battle"  # Segment: "battle" or "debate"
+    topic_category: Optional[str] = None  # Derived from the prompt if not given
 
 
 class VoteWithTagsRequest(BaseModel):
@@ -74,6 +80,8 @@ class VoteWithTagsRequest(BaseModel):
     tags: List[str] = []
     topic: Optional[str] = None
     debate_id: Optional[str] = None
+    mode: Optional[str] = None  # "battle" or "debate" (default: "debate" if debate_id is set)
+    topic_category: Optional[str] = None  # Derived from the topic if not given
 
 
 class DebateRequest(BaseModel):
@@ -207,33 +215,60 @@ def battle(req: BattleRequest):
     }
 
 
+@app.get("/api/matchmake")
+async def matchmake(prompt: bool = False):
+    """
+    Propose the next battle pair: the one whose outcome is expected to tell
+    the most about the ranking, given current ratings and their uncertainty.
+    With prompt=true a battle prompt is suggested as well.
+    """
+    pair = await async_db.get_matchmaking_pair()
+    if pair is None:
+        raise HTTPException(status_code=503, detail="Not enough rated models to propose a pair")
+    if prompt:
+        pair["prompt"] = matchmaking.next_prompt()
+    return pair
+
+
 @app.get("/health")
 def health():
     """Health check endpoint."""
     return {"status": "healthy"}
 
 
+def _segments_for(mode: str, topic_category: Optional[str], text: Optional[str]) -> List[str]:
+    """Segments a vote counts toward; 400 on an unknown mode or category."""
+    try:
+        return vote_segments(mode, topic_category, text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/api/vote")
-def vote(req: VoteRequest):
-    """Record a vote and update Elo ratings."""
+async def vote(req: VoteRequest):
+    """Record a vote and update Elo ratings (global and for the vote's segments)."""
     if not req.winner_model or not req.loser_model:
         raise HTTPException(status_code=400, detail="winner_model and loser_model are required")
+    segments = _segments_for(req.mode, req.topic_category, req.prompt)
     
     try:
-        new_winner_rating, new_loser_rating = update_ratings(req.winner_model, req.loser_model)
+        new_winner_rating, new_loser_rating = await async_db.update_ratings(
+            req.winner_model, req.loser_model, segments=segments
+        )
         return {
             "success": True,
             "winner_model": req.winner_model,
             "winner_new_rating": new_winner_rating,
             "loser_model": req.loser_model,
             "loser_new_rating": new_loser_rating,
+            "segments": segments,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Vote failed: {str(e)}")
 
 
 @app.post("/api/vote-with-tags")
-def vote_with_tags(req: VoteWithTagsRequest):
+async def vote_with_tags(req: VoteWithTagsRequest):
     """Record vote with tag annotations and calculate dimension scores."""
     if not req.winner_model or not req.loser_model:
         raise HTTPException(status_code=400, detail="winner_model and loser_model are required")
@@ -242,39 +277,26 @@ def vote_with_tags(req: VoteWithTagsRequest):
     for tag in req.tags:
         if not validate_tag(tag):
             raise HTTPException(status_code=400, detail=f"Invalid tag: {tag}")
+    mode = req.mode or ("debate" if req.debate_id else "battle")
+    segments = _segments_for(mode, req.topic_category, req.topic)
     
     try:
-        # Initialize tags table if needed
-        ensure_tags_table_exists()
-        
-        # Update Elo ratings
-        new_winner_rating, new_loser_rating = update_ratings(req.winner_model, req.loser_model)
-        
-        # Calculate dimension scores from tags
-        winner_dimension_scores = calculate_dimension_scores(req.tags)
+        # Calculate dimension scores from tags, under the active weight version
+        weights = await async_db.refresh_dimension_weights()
+        winner_dimension_scores = calculate_dimension_scores(req.tags, weights)
         # Loser gets opposite interpretation (if tags favor one side, they disfavor the other)
         loser_dimension_scores = {k: 1.0 - v for k, v in winner_dimension_scores.items()}
         
-        # Store tags in database
-        from .tags import TAGS_BY_CATEGORY
-        tag_categories = {}
-        for category, tags_dict in TAGS_BY_CATEGORY.items():
-            for tag_name in tags_dict:
-                tag_categories[tag_name] = category.value
-        
-        store_vote_tags(
+        # Elo update, tags and dimension scores in one transaction
+        new_winner_rating, new_loser_rating = await async_db.record_vote_with_tags(
             winner_model=req.winner_model,
             loser_model=req.loser_model,
             tags=req.tags,
-            tag_categories=tag_categories
-        )
-        
-        # Store dimension scores for both models
-        store_dimension_scores(
-            winner_model=req.winner_model,
-            loser_model=req.loser_model,
+            tag_categories=TAG_CATEGORY,
             winner_scores=winner_dimension_scores,
-            loser_scores=loser_dimension_scores
+            loser_scores=loser_dimension_scores,
+            segments=segments,
+            weight_version=weights.version
         )
         
         return {
@@ -285,7 +307,9 @@ def vote_with_tags(req: VoteWithTagsRequest):
             "loser_new_rating": round(new_loser_rating, 2),
             "tags_recorded": len(req.tags),
             "tags": req.tags,
+            "segments": segments,
             "dimension_scores": {k: round(v, 3) for k, v in winner_dimension_scores.items()},
+            "weight_version": weights.version,
         }
     except Exception as e:
         print(f"Vote with tags error: {e}")
@@ -307,51 +331,214 @@ def get_tags():
 
 
 @app.get("/api/dimension-scores")
-def get_dimension_scores(model_name: Optional[str] = None):
-    """Get aggregated dimension scores for models."""
+async def get_dimension_scores(model_name: Optional[str] = None, confidence: float = 0.95):
+    """
+    Get aggregated dimension scores for models, with standard errors,
+    confidence intervals and approximate quantiles per dimension.
+    """
+    if not 0.0 < confidence < 1.0:
+        raise HTTPException(status_code=400, detail="confidence must be between 0 and 1")
     try:
-        scores = get_aggregated_dimension_scores(model_name=model_name)
+        scores = await async_db.get_aggregated_dimension_scores(model_name=model_name, confidence=confidence)
         return {
             "success": True,
             "dimension_scores": scores,
-            "model_count": len(scores)
+            "model_count": len(scores),
+            "confidence": confidence
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch dimension scores: {str(e)}")
 
 
 @app.get("/api/dimension-leaderboard/{dimension}")
-def get_dimension_board(dimension: str, limit: int = 10):
+async def get_dimension_board(dimension: str, limit: int = 10, min_votes: int = 1):
     """Get leaderboard for a specific dimension."""
-    valid_dimensions = ["empathy", "aggressiveness", "evidence_use", "political_economic", "political_social"]
-    if dimension not in valid_dimensions:
-        raise HTTPException(status_code=400, detail=f"Invalid dimension. Must be one of: {', '.join(valid_dimensions)}")
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid dimension. Must be one of: {', '.join(DIMENSIONS)}")
     
     try:
-        leaderboard = get_dimension_leaderboard(dimension=dimension, limit=limit)
+        leaderboard = await async_db.get_dimension_leaderboard(dimension=dimension, limit=limit, min_votes=min_votes)
         return {
             "success": True,
             "dimension": dimension,
             "leaderboard": leaderboard,
-            "limit": limit
+            "limit": limit,
+            "min_votes": min_votes
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch dimension leaderboard: {str(e)}")
 
 
-@app.get("/api/ratings")
-def get_ratings():
-    """Get all model Elo ratings."""
+@app.get("/api/tag-distribution")
+async def get_tag_distribution_endpoint(model_name: str, role: str = "winner",
+                                  start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Get a model's tag distribution over an optional [start, end) time range."""
+    if role not in ("winner", "loser"):
+        raise HTTPException(status_code=400, detail="role must be 'winner' or 'loser'")
+    
+    try:
+        distribution = await async_db.get_tag_distribution(model_name, role=role, start=start, end=end)
+        return {
+            "success": True,
+            "model_name": model_name,
+            "role": role,
+            "start": start,
+            "end": end,
+            "distribution": distribution
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch tag distribution: {str(e)}")
+
+
+@app.get("/api/tag-trends")
+async def get_tag_trends(model_name: str, role: str = "winner", granularity: str = "day",
+                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   tag: Optional[str] = None):
+    """Get a model's per-hour or per-day tag counts over a time range."""
+    if role not in ("winner", "loser"):
+        raise HTTPException(status_code=400, detail="role must be 'winner' or 'loser'")
+    if granularity not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    
+    try:
+        series = await async_db.get_tag_time_series(model_name, role=role, start=start, end=end,
+                                     granularity=granularity, tag_name=tag)
+        return {
+            "success": True,
+            "model_name": model_name,
+            "role": role,
+            "granularity": granularity,
+            "series": series
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch tag trends: {str(e)}")
+
+
+@app.get("/api/tag-cooccurrence")
+async def get_tag_cooccurrence(tag: Optional[str] = None, model_name: Optional[str] = None,
+                               role: str = "winner", sort: str = "count",
+                               limit: int = 10, min_count: int = 1):
+    """
+    Tags most often selected together with `tag` (with conditional
+    probability and lift), or the top tag pairs when no tag is given.
+    """
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    try:
+        result = await async_db.get_tag_cooccurrence(tag, model_name, role, sort, limit, min_count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch tag co-occurrence: {str(e)}")
+    return {"success": True, "model_name": model_name, "role": role, "sort": sort, **result}
+
+
+@app.get("/api/tag-heatmap")
+async def get_tag_heatmap(role: str = "winner", metric: str = "rate", min_votes: int = 1):
+    """Model x tag matrix of tag counts, rates or lift."""
     try:
-        ratings = get_all_ratings()
+        result = await async_db.get_tag_heatmap(role, metric, min_votes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch tag heatmap: {str(e)}")
+    return {"success": True, "role": role, "metric": metric, **result}
+
+
+RATING_ENGINES = ("elo", "glicko2", "all")
+
+
+@app.get("/api/ratings")
+async def get_ratings(engine: str = "elo", window: Optional[int] = None,
+                      half_life: Optional[float] = None, segment: Optional[str] = None):
+    """
+    Get all model ratings.
+
+    engine=elo (default) returns online Elo; engine=glicko2 returns Glicko-2
+    ratings with rating deviation (rd) and volatility; engine=all returns
+    Elo under "ratings" and Glicko-2 under "glicko2".
+
+    window=7|30|90 returns a Bradley-Terry board over the last N days, and
+    half_life=D one where each vote is weighted by 0.5 ** (age_days / D)
+    (D is rounded to the nearest half day).
+
+    segment=battle|debate returns Elo from that mode's votes only, and
+    segment=debate:economy (any mode:topic_category) narrows it to one topic.
+    """
+    if engine not in RATING_ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of: {', '.join(RATING_ENGINES)}")
+    if window is not None and half_life is not None:
+        raise HTTPException(status_code=400, detail="Use either window or half_life, not both")
+    if (window is not None or half_life is not None) and engine != "elo":
+        raise HTTPException(status_code=400, detail="window and half_life ratings are Bradley-Terry only; drop engine")
+    
+    if segment is not None:
+        if engine != "elo" or window is not None or half_life is not None:
+            raise HTTPException(status_code=400, detail="segment ratings are Elo only; drop engine, window and half_life")
+        try:
+            ratings = await async_db.get_segment_ratings(segment)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         return {
+            "engine": "elo",
+            "segment": segment,
             "ratings": ratings,
             "timestamp": str(__import__('datetime').datetime.now()),
         }
+    
+    if window is not None or half_life is not None:
+        try:
+            if window is not None:
+                ratings = await async_db.get_windowed_ratings(window)
+                response = {"engine": "bradley-terry", "window_days": window}
+            else:
+                ratings = await async_db.get_decayed_ratings(half_life)
+                response = {"engine": "bradley-terry", "half_life_days": windowed.quantize_half_life(half_life)}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        response["ratings"] = ratings
+        response["timestamp"] = str(__import__('datetime').datetime.now())
+        return response
+    
+    try:
+        response = {"engine": engine}
+        if engine == "glicko2":
+            response["ratings"] = await async_db.get_glicko_ratings()
+        else:
+            response["ratings"] = await async_db.get_all_ratings()
+        if engine == "all":
+            response["glicko2"] = await async_db.get_glicko_ratings()
+        response["timestamp"] = str(__import__('datetime').datetime.now())
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch ratings: {str(e)}")
 
 
+@app.get("/api/ratings/segments")
+async def get_rating_segments():
+    """List the segments that have ratings, with model and vote counts."""
+    try:
+        return {
+            "segments": await async_db.get_segment_summary(),
+            "timestamp": str(__import__('datetime').datetime.now()),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch rating segments: {str(e)}")
+
+
+@app.get("/api/ratings/bradley-terry")
+async def get_bt_ratings():
+    """Get Bradley-Terry ratings with bootstrap confidence intervals (fitted offline)."""
+    try:
+        ratings = await async_db.get_bt_ratings()
+        return {
+            "ratings": ratings,
+            "timestamp": str(__import__('datetime').datetime.now()),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch Bradley-Terry ratings: {str(e)}")
+
+
 @app.post("/api/take_test")
 def take_test(req: TakeTestRequest):
     #* 1) Figure out which API key to use: request body or environment variable
@@ -0,0 +1,224 @@
+"""
+Async database access for the FastAPI handlers in backend/api.py.
+
+Mirrors the functions in backend/supabase_db.py (same DATABASE_URL, same
+tables and SQL) but awaits an async connection pool instead of blocking a
+worker thread on every round trip to Supabase.
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, List
+
+from .supabase_db import DATABASE_URL
+from .storage import open_async_storage, AsyncSQLStorage
+from . import tags as tag_weights
+
+_storage: Optional[AsyncSQLStorage] = None
+
+
+def get_async_storage() -> AsyncSQLStorage:
+    """Return the process-wide async storage backend for DATABASE_URL."""
+    global _storage
+    if _storage is None:
+        _storage = open_async_storage(DATABASE_URL)
+    return _storage
+
+
+async def close_pool():
+    """Close the connection pool (call on application shutdown)."""
+    if _storage is not None:
+        await _storage.close()
+
+
+async def update_ratings(winner_model: str, loser_model: str, k_factor: int = 32,
+                         segments: List[str] = None) -> tuple:
+    """
+    Update global and per-segment Elo ratings after a battle result.
+
+    Returns:
+        (new_winner_rating, new_loser_rating) in the global ratings
+    """
+    try:
+        return await get_async_storage().update_ratings(winner_model, loser_model, k_factor, segments)
+    except Exception as e:
+        print(f"Error updating ratings: {e}")
+        raise
+
+
+async def get_all_ratings() -> Dict[str, Dict]:
+    """Get all model ratings sorted by rating (highest first)."""
+    try:
+        return await get_async_storage().get_all_ratings()
+    except Exception as e:
+        print(f"Error fetching ratings: {e}")
+        return {}
+
+
+async def record_vote_with_tags(winner_model: str, loser_model: str, tags: List[str],
+                                tag_categories: Dict[str, str],
+                                winner_scores: Dict[str, float],
+                                loser_scores: Dict[str, float],
+                                segments: List[str] = None,
+                                weight_version: int = tag_weights.DEFAULT_WEIGHT_VERSION) -> tuple:
+    """
+    Record a tagged vote: Elo updates (global and per segment), tags and
+    dimension scores in one transaction.
+
+    Returns:
+        (new_winner_rating, new_loser_rating) in the global ratings
+    """
+    try:
+        return await get_async_storage().record_vote_with_tags(
+            winner_model, loser_model, tags, tag_categories, winner_scores, loser_scores,
+            segments=segments, weight_version=weight_version
+        )
+    except Exception as e:
+        print(f"Error recording vote with tags: {e}")
+        raise
+
+
+async def get_tag_distribution(model: str, role: str = 'winner', start: datetime = None,
+                               end: datetime = None) -> Dict[str, float]:
+    """Get distribution of tags for a model over a time range (see supabase_db)."""
+    try:
+        return await get_async_storage().get_tag_distribution(model, role=role, start=start, end=end)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching tag distribution: {e}")
+        return {}
+
+
+async def get_tag_cooccurrence(tag: str = None, model: str = None, role: str = 'winner',
+                               sort: str = 'count', limit: int = 10, min_count: int = 1) -> Dict:
+    """Slice the tag co-occurrence cube (see supabase_db)."""
+    try:
+        return await get_async_storage().get_tag_cooccurrence(tag, model, role, sort, limit, min_count)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching tag co-occurrence: {e}")
+        raise
+
+
+async def get_tag_heatmap(role: str = 'winner', metric: str = 'rate', min_votes: int = 1) -> Dict:
+    """Model x tag matrix from the co-occurrence cube (see supabase_db)."""
+    try:
+        return await get_async_storage().get_tag_heatmap(role, metric, min_votes)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching tag heatmap: {e}")
+        raise
+
+
+async def get_tag_time_series(model: str, role: str = 'winner', start: datetime = None,
+                              end: datetime = None, granularity: str = 'day',
+                              tag_name: str = None) -> List[Dict]:
+    """Get per-bucket tag counts for a model (see supabase_db)."""
+    try:
+        return await get_async_storage().get_tag_time_series(
+            model, role=role, start=start, end=end,
+            granularity=granularity, tag_name=tag_name
+        )
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching tag time series: {e}")
+        return []
+
+
+async def get_aggregated_dimension_scores(model_name: str = None, confidence: float = 0.95) -> Dict:
+    """Get aggregated dimension scores for models (see supabase_db)."""
+    try:
+        return await get_async_storage().get_aggregated_dimension_scores(model_name, confidence)
+    except Exception as e:
+        print(f"❌ Error getting aggregated dimension scores: {e}")
+        return {}
+
+
+async def refresh_dimension_weights() -> tag_weights.WeightSet:
+    """Make sure new votes are scored with the latest activated weight version (see supabase_db)."""
+    try:
+        return await get_async_storage().refresh_dimension_weights()
+    except Exception as e:
+        print(f"⚠️  Could not refresh dimension weights: {e}")
+        return tag_weights.active_weights()
+
+
+async def get_dimension_leaderboard(dimension: str, limit: int = 10, min_votes: int = 1) -> List[Dict]:
+    """Get leaderboard for a specific dimension (see supabase_db)."""
+    try:
+        return await get_async_storage().get_dimension_leaderboard(dimension, limit=limit, min_votes=min_votes)
+    except Exception as e:
+        print(f"❌ Error getting dimension leaderboard: {e}")
+        return []
+
+
+async def get_bt_ratings() -> Dict[str, Dict]:
+    """Get the latest published Bradley-Terry ratings (see supabase_db)."""
+    try:
+        return await get_async_storage().get_bt_ratings()
+    except Exception as e:
+        print(f"Error fetching Bradley-Terry ratings: {e}")
+        return {}
+
+
+async def get_glicko_ratings() -> Dict[str, Dict]:
+    """Get Glicko-2 ratings (rating, rd, volatility), highest first."""
+    try:
+        return await get_async_storage().get_glicko_ratings()
+    except Exception as e:
+        print(f"Error fetching Glicko-2 ratings: {e}")
+        return {}
+
+
+async def get_windowed_ratings(days: int) -> Dict[str, Dict]:
+    """Get Bradley-Terry ratings over the last `days` days (7, 30 or 90)."""
+    try:
+        return await get_async_storage().get_windowed_ratings(days)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching windowed ratings: {e}")
+        return {}
+
+
+async def get_decayed_ratings(half_life_days: float) -> Dict[str, Dict]:
+    """Get Bradley-Terry ratings with votes weighted by 0.5 ** (age / half_life_days)."""
+    try:
+        return await get_async_storage().get_decayed_ratings(half_life_days)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching decayed ratings: {e}")
+        return {}
+
+
+async def get_segment_ratings(segment: str) -> Dict[str, Dict]:
+    """Get Elo ratings within one segment, e.g. "debate" or "debate:economy" (see supabase_db)."""
+    try:
+        return await get_async_storage().get_segment_ratings(segment)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching segment ratings: {e}")
+        return {}
+
+
+async def get_segment_summary() -> Dict[str, Dict]:
+    """Get the number of models and votes in every segment."""
+    try:
+        return await get_async_storage().get_segment_summary()
+    except Exception as e:
+        print(f"Error fetching segment summary: {e}")
+        return {}
+
+
+async def get_matchmaking_pair() -> Optional[Dict]:
+    """Propose the most informative next battle pair (see backend.matchmaking)."""
+    try:
+        return await get_async_storage().get_matchmaking_pair()
+    except Exception as e:
+        print(f"Error proposing a battle pair: {e}")
+        return None
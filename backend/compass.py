@@ -0,0 +1,259 @@
+"""
+Vectorized political-compass scoring.
+
+A compass position is, per axis, the sum of a run's Likert answers (-2..+2,
+negated for reverse-keyed questions) scaled into [-max_scale, max_scale].
+backend/utils.compute_axis_score does this for one list of answers; here the
+answers of any number of runs are scored together from one array:
+
+  scores[..., q]   Likert answer to question q (NaN = missing), with any
+                   leading shape, e.g. models x runs x questions or
+                   models x resamples x questions
+  axis[..., q]     0 = economic, 1 = social (broadcast against scores)
+  sign[..., q]     -1 for reverse-keyed questions, +1 otherwise
+
+so thousands of runs, or thousands of bootstrap resamples of one run, are
+a few array reductions.
+
+Normalizations:
+  - 'bank': divide by 2 x the axis's question count, missing answers count
+    as 0 (compute_axis_score, used for data/summary/aggregates.csv)
+  - 'answered': divide by 2 x the number of answered axis questions, so
+    unparsed answers don't pull a position toward the centre
+  - 'likert': the mean signed answer on the -2..+2 scale (ignores max_scale)
+
+Uncertainty: bootstrap_positions() rescores question-level resamples (drawn
+with replacement within each axis, so every resample keeps the bank's axis
+counts, and represented as per-question draw counts) and confidence_regions() summarizes them per run as percentile
+intervals per axis plus a covariance ellipse, with width / height the full
+axis lengths and angle in degrees as matplotlib's Ellipse takes them.
+
+Sampled runs: answer_distributions() summarizes N samples of the same
+questions (e.g. a model asked N times at temperature > 0) per question as
+answer counts, entropy and the majority answer.
+"""
+
+import json
+import math
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+AXES = ('economic', 'social')
+NORMALIZATIONS = ('bank', 'answered', 'likert')
+
+DEFAULT_QUESTIONS_PATH = 'data/questions.json'
+MAX_LIKERT = 2
+# The Likert scale, strongly disagree .. strongly agree
+LIKERT_VALUES = np.arange(-MAX_LIKERT, MAX_LIKERT + 1)
+
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+# Runs that parsed less of the bank than this get no confidence region: a
+# resample of mostly-missing answers is pinned near the centre and would
+# report a tight but meaningless interval
+DEFAULT_MIN_PARSED_FRACTION = 0.5
+# Per-run summary columns written by confidence_regions()
+REGION_COLUMNS = (
+    'economic_ci_low', 'economic_ci_high', 'social_ci_low', 'social_ci_high',
+    'ellipse_width', 'ellipse_height', 'ellipse_angle',
+)
+
+
+class QuestionBank(NamedTuple):
+    """Question bank as vectors aligned with the question axis of a score tensor."""
+    ids: List[str]
+    index: Dict[str, int]
+    axis: np.ndarray   # int, index into AXES
+    sign: np.ndarray   # float, -1.0 for reverse-keyed questions
+
+
+def question_bank(qbank: Dict) -> QuestionBank:
+    """
+    Build the question vectors from a parsed questions.json.
+
+    Args:
+        qbank: Dict with "questions": [{id, axis, reverse}]
+    """
+    questions = qbank['questions']
+    ids = [q['id'] for q in questions]
+    # Anything not on the economic axis is scored as social, as before
+    axis = np.array([0 if q['axis'] == 'economic' else 1 for q in questions], dtype=np.int64)
+    sign = np.array([-1.0 if q.get('reverse') else 1.0 for q in questions])
+    return QuestionBank(ids, {qid: i for i, qid in enumerate(ids)}, axis, sign)
+
+
+def load_question_bank(path: str = DEFAULT_QUESTIONS_PATH) -> QuestionBank:
+    """Read and vectorize a question bank file."""
+    with open(path, 'r', encoding='utf-8') as fh:
+        return question_bank(json.load(fh))
+
+
+def axis_counts(axis: np.ndarray) -> np.ndarray:
+    """Questions per axis along the last dimension: shape (..., len(AXES))."""
+    return (np.asarray(axis)[..., None] == np.arange(len(AXES))).sum(axis=-2)
+
+
+def compass_positions(scores: np.ndarray, axis: np.ndarray, sign: np.ndarray = None,
+                      mask: np.ndarray = None, normalization: str = 'bank',
+                      max_scale: float = 10) -> np.ndarray:
+    """
+    Economic and social positions for every leading index of a score tensor.
+
+    Args:
+        scores: (..., questions) Likert answers, NaN where missing
+        axis: Axis index of each question, broadcastable to scores
+        sign: Reverse-keying sign of each question (default: none reversed)
+        mask: Optional boolean array, False marks answers to ignore
+        normalization: One of NORMALIZATIONS
+        max_scale: Positions lie in [-max_scale, max_scale]
+
+    Returns:
+        (..., 2) array of (economic, social); 0.0 on an axis with nothing to score
+    """
+    if normalization not in NORMALIZATIONS:
+        raise ValueError(f"Unknown normalization: {normalization}")
+    scores = np.asarray(scores, dtype=float)
+    answered = np.isfinite(scores)
+    if mask is not None:
+        answered &= np.asarray(mask, dtype=bool)
+    signed = np.where(answered, scores, 0.0)
+    if sign is not None:
+        signed = signed * sign
+
+    # (..., questions, axes) one-hot; per-axis totals are a matmul over questions
+    onehot = (np.asarray(axis)[..., None] == np.arange(len(AXES))).astype(float)
+
+    def per_axis(values):
+        if onehot.ndim == 2:
+            # One BLAS call over all leading indices
+            return np.tensordot(values, onehot, axes=([-1], [0]))
+        # Axis differs across leading indices: batched row-vector products
+        return (values[..., None, :] @ onehot)[..., 0, :]
+
+    totals = per_axis(signed)
+    answered_counts = None if normalization == 'bank' else per_axis(answered.astype(float))
+    return _normalize(totals, axis_counts(axis), answered_counts, normalization, max_scale)
+
+
+def _normalize(totals, bank_counts, answered_counts, normalization, max_scale):
+    counts = np.broadcast_to(bank_counts, totals.shape).astype(float) if normalization == 'bank' else answered_counts
+    scale = 1.0 if normalization == 'likert' else max_scale / MAX_LIKERT
+    return np.divide(totals * scale, counts, out=np.zeros(totals.shape), where=counts > 0)
+
+
+def resample_weights(axis: np.ndarray, n_resamples: int, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Draw counts of n_resamples bootstrap resamples of a question bank.
+
+    Each axis's questions are redrawn with replacement as many times as the
+    axis has questions, so every resample keeps the bank's axis counts.
+
+    Returns:
+        (n_resamples, questions) array, times each question was drawn
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    axis = np.asarray(axis)
+    weights = np.zeros((n_resamples, len(axis)))
+    for a in range(len(AXES)):
+        slots = np.flatnonzero(axis == a)
+        if len(slots):
+            weights[:, slots] = rng.multinomial(len(slots), np.full(len(slots), 1.0 / len(slots)), size=n_resamples)
+    return weights
+
+
+def bootstrap_positions(scores: np.ndarray, axis: np.ndarray, sign: np.ndarray = None,
+                        n_resamples: int = DEFAULT_RESAMPLES, rng: np.random.Generator = None,
+                        normalization: str = 'bank', max_scale: float = 10) -> np.ndarray:
+    """
+    Positions of question-level bootstrap resamples.
+
+    A resample's per-axis total is the draw-count-weighted sum of the
+    answers, so all resamples of all leading indices (e.g. every run of a
+    model, sharing the same draws) come from one matrix product, without
+    materializing the resampled answers.
+
+    Args:
+        scores: (..., questions) Likert answers, NaN where missing
+        axis, sign: Question vectors of the bank (1-D)
+
+    Returns:
+        (..., n_resamples, 2) array of (economic, social)
+    """
+    if normalization not in NORMALIZATIONS:
+        raise ValueError(f"Unknown normalization: {normalization}")
+    scores = np.asarray(scores, dtype=float)
+    answered = np.isfinite(scores)
+    signed = np.where(answered, scores, 0.0)
+    if sign is not None:
+        signed = signed * sign
+
+    onehot = (np.asarray(axis)[:, None] == np.arange(len(AXES))).astype(float)
+    # (resamples, questions, axes): draw counts split by axis
+    design = resample_weights(axis, n_resamples, rng)[:, :, None] * onehot
+    totals = np.tensordot(signed, design, axes=([-1], [1]))
+    answered_counts = None if normalization == 'bank' else np.tensordot(answered.astype(float), design, axes=([-1], [1]))
+    return _normalize(totals, axis_counts(axis), answered_counts, normalization, max_scale)
+
+
+def confidence_regions(samples: np.ndarray, confidence: float = DEFAULT_CONFIDENCE) -> Dict[str, np.ndarray]:
+    """
+    Percentile intervals and covariance ellipses of bootstrap positions.
+
+    Args:
+        samples: (..., n_resamples, 2) output of bootstrap_positions
+        confidence: Coverage of the intervals and of the ellipse
+
+    Returns:
+        Dict of REGION_COLUMNS -> (...) arrays; the ellipse is centred on the
+        run's position and covers `confidence` of a bivariate normal with the
+        resamples' covariance
+    """
+    samples = np.asarray(samples, dtype=float)
+    tail = (1.0 - confidence) / 2.0
+    low, high = np.quantile(samples, [tail, 1.0 - tail], axis=-2)
+
+    centred = samples - samples.mean(axis=-2, keepdims=True)
+    cov = np.einsum('...bi,...bj->...ij', centred, centred) / max(samples.shape[-2] - 1, 1)
+    # Eigenvalues ascending: the last eigenvector is the major axis
+    values, vectors = np.linalg.eigh(cov)
+    # Chi-square quantile with 2 degrees of freedom
+    k = -2.0 * math.log(1.0 - confidence)
+    lengths = 2.0 * np.sqrt(k * np.clip(values, 0.0, None))
+    angle = np.degrees(np.arctan2(vectors[..., 1, 1], vectors[..., 0, 1]))
+    # An ellipse is symmetric: fold the angle into [-90, 90)
+    angle = (angle + 90.0) % 180.0 - 90.0
+
+    return {
+        'economic_ci_low': low[..., 0], 'economic_ci_high': high[..., 0],
+        'social_ci_low': low[..., 1], 'social_ci_high': high[..., 1],
+        'ellipse_width': lengths[..., 1], 'ellipse_height': lengths[..., 0],
+        'ellipse_angle': angle,
+    }
+
+
+def answer_distributions(samples: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-question distribution of sampled Likert answers.
+
+    Args:
+        samples: (..., n_samples, questions) integer answers; anything outside
+            LIKERT_VALUES (e.g. an int8 sentinel for unparsed) is missing
+
+    Returns:
+        Dict of counts (..., questions, len(LIKERT_VALUES)), missing
+        (..., questions), entropy (..., questions) in bits over the parsed
+        answers (0 when there are none) and majority (..., questions), the
+        most frequent answer as a float (ties go to the answer nearest
+        neutral, then the negative one; NaN when none parsed)
+    """
+    samples = np.asarray(samples)
+    counts = (samples[..., None] == LIKERT_VALUES).sum(axis=-3)
+    answered = counts.sum(axis=-1)
+    p = np.divide(counts, answered[..., None], out=np.zeros(counts.shape), where=answered[..., None] > 0)
+    entropy = 0.0 - np.sum(p * np.log2(np.where(p > 0, p, 1.0)), axis=-1)
+    # Candidates ordered 0, -1, +1, -2, +2 so argmax breaks ties toward neutral
+    order = np.argsort(np.abs(LIKERT_VALUES), kind='stable')
+    majority = LIKERT_VALUES[order][np.argmax(counts[..., order], axis=-1)].astype(float)
+    majority[answered == 0] = np.nan
+    return {'counts': counts, 'missing': samples.shape[-2] - answered, 'entropy': entropy, 'majority': majority}
@@ -0,0 +1,171 @@
+"""
+Streaming per-dimension statistics.
+
+Every (model, dimension) pair keeps two summaries that are updated as votes
+land and never require rescanning vote_dimension_scores:
+
+  - Welford accumulators (count, mean, M2 = sum of squared deviations from
+    the mean) in model_dimension_rollups. Unlike running sums of x and x^2,
+    they don't lose precision to cancellation as counts grow. Batches
+    (imports, rebuilds) are folded in with Chan et al.'s parallel merge,
+    of which a single vote is the n = 1, M2 = 0 case.
+  - A fixed-bin histogram over the dimension's range in
+    model_dimension_histograms. Scores are bounded, so HISTOGRAM_BINS equal
+    bins are a mergeable quantile sketch: a quantile read from it is off by
+    at most one bin width (range / HISTOGRAM_BINS).
+
+summarize() turns both into the mean, standard error, a Student-t
+confidence interval (none below two votes) and approximate quantiles.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .tags import DIMENSIONS
+
+# Bins per dimension range; changing it requires rebuilding the histograms
+HISTOGRAM_BINS = 50
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+DEFAULT_CONFIDENCE = 0.95
+
+# Degrees of freedom up to which t_quantile inverts the exact t CDF
+EXACT_T_DF = 30
+
+
+def score_bin(dimension: str, score: float) -> int:
+    """Histogram bin of a score (must agree with queries.score_bin_sql)."""
+    lo, hi = DIMENSIONS[dimension]['min'], DIMENSIONS[dimension]['max']
+    if score >= hi:
+        return HISTOGRAM_BINS - 1
+    if score <= lo:
+        return 0
+    return int((score - lo) * HISTOGRAM_BINS / (hi - lo))
+
+
+def merge(count_a: int, mean_a: float, m2_a: float,
+          count_b: int, mean_b: float, m2_b: float) -> tuple:
+    """Combine two Welford accumulators into (count, mean, m2)."""
+    count = count_a + count_b
+    if count == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / count
+    m2 = m2_a + m2_b + delta * delta * count_a * count_b / count
+    return count, mean, m2
+
+
+def histogram_quantiles(counts: Sequence[float], lo: float, hi: float,
+                        quantiles: Sequence[float] = QUANTILES) -> List[float]:
+    """
+    Approximate quantiles from bin counts, interpolating linearly within a bin.
+
+    Args:
+        counts: Votes per bin (HISTOGRAM_BINS values over [lo, hi])
+        quantiles: Probabilities in [0, 1]
+
+    Returns:
+        One value per quantile (empty histogram: the range midpoint)
+    """
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum()
+    if total <= 0:
+        return [(lo + hi) / 2.0] * len(quantiles)
+    width = (hi - lo) / len(counts)
+    cumulative = np.cumsum(counts)
+    targets = np.asarray(quantiles, dtype=float) * total
+    bins = np.minimum(np.searchsorted(cumulative, targets, side='left'), len(counts) - 1)
+    before = cumulative[bins] - counts[bins]
+    fraction = np.divide(targets - before, counts[bins], out=np.zeros_like(targets), where=counts[bins] > 0)
+    return (lo + (bins + np.clip(fraction, 0.0, 1.0)) * width).tolist()
+
+
+def t_cdf(t: float, df: int) -> float:
+    """
+    Cumulative distribution of Student's t for integer degrees of freedom.
+
+    Closed form from Abramowitz & Stegun 26.7.3 (odd df) and 26.7.4 (even
+    df): a finite series in theta = atan(t / sqrt(df)) with about df / 2 terms.
+    """
+    theta = math.atan(abs(t) / math.sqrt(df))
+    sin, cos2 = math.sin(theta), math.cos(theta) ** 2
+    if df % 2:
+        term = total = sin * math.cos(theta) if df > 1 else 0.0
+        for k in range(3, df - 1, 2):
+            term *= cos2 * (k - 1) / k
+            total += term
+        central = 2.0 / math.pi * (theta + total)
+    else:
+        term = total = 1.0
+        for k in range(2, df - 1, 2):
+            term *= cos2 * (k - 1) / k
+            total += term
+        central = sin * total
+    return 0.5 + math.copysign(central / 2.0, t)
+
+
+def t_quantile(p: float, df: int) -> float:
+    """
+    Quantile of Student's t distribution (no scipy here).
+
+    Up to EXACT_T_DF degrees of freedom it bisects the exact t_cdf; beyond,
+    the Cornish-Fisher expansion around the normal quantile (Abramowitz &
+    Stegun 26.7.5) is within 4e-6 of the true value for p up to 0.9995
+    (99.9% intervals).
+    """
+    if df <= EXACT_T_DF:
+        if p < 0.5:
+            return -t_quantile(1.0 - p, df)
+        lo, hi = 0.0, 1.0
+        while t_cdf(hi, df) < p:
+            lo, hi = hi, hi * 2.0
+        for _ in range(60):
+            mid = (lo + hi) / 2.0
+            if t_cdf(mid, df) < p:
+                lo = mid
+            else:
+                hi = mid
+        return (lo + hi) / 2.0
+    x = NormalDist().inv_cdf(p)
+    g1 = (x ** 3 + x) / 4
+    g2 = (5 * x ** 5 + 16 * x ** 3 + 3 * x) / 96
+    g3 = (3 * x ** 7 + 19 * x ** 5 + 17 * x ** 3 - 15 * x) / 384
+    g4 = (79 * x ** 9 + 776 * x ** 7 + 1482 * x ** 5 - 1920 * x ** 3 - 945 * x) / 92160
+    return x + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def summarize(dimension: str, count: int, mean: float, m2: float,
+              histogram: Sequence[float] = None, confidence: float = DEFAULT_CONFIDENCE) -> Dict:
+    """
+    Statistics for one (model, dimension) from its accumulators.
+
+    Args:
+        count, mean, m2: Welford accumulators
+        histogram: Votes per bin, or None to skip quantiles
+        confidence: Coverage of the confidence interval
+
+    Returns:
+        Dict with mean, variance, std_error, ci_low, ci_high (clipped to the
+        dimension's range; all None with fewer than two votes, which say
+        nothing about spread) and, with a histogram, quantiles {"p50": ...}
+    """
+    lo, hi = DIMENSIONS[dimension]['min'], DIMENSIONS[dimension]['max']
+    stats = {'mean': mean, 'variance': None, 'std_error': None, 'ci_low': None, 'ci_high': None}
+    if count > 1:
+        variance = max(0.0, m2 / (count - 1))
+        std_error = (variance / count) ** 0.5
+        t = t_quantile(0.5 + confidence / 2.0, count - 1)
+        stats.update({
+            'variance': variance,
+            'std_error': std_error,
+            'ci_low': max(lo, mean - t * std_error),
+            'ci_high': min(hi, mean + t * std_error),
+        })
+    if histogram is not None:
+        values = histogram_quantiles(histogram, lo, hi)
+        stats['quantiles'] = {f"p{round(q * 100):02d}": v for q, v in zip(QUANTILES, values)}
+    return stats
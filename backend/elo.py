@@ -8,54 +8,200 @@ Where:
   - K = 32 (points per game; can adjust for volatility)
   - result = 1 for win, 0 for loss, 0.5 for draw
   - expected_result = 1 / (1 + 10^((opponent_rating - player_rating) / 400))
+
+Storage (offline / demo deployments without a database):
+  Ratings live in memory. Each vote appends one line to a write-ahead log
+  (data/elo_ratings.json.wal) instead of rewriting the whole file; the log
+  is periodically folded into data/elo_ratings.json with an atomic rename.
+  A file lock (data/elo_ratings.json.lock) serializes writers across
+  processes, and each process catches up by reading only the log lines
+  appended since it last looked.
+
+Environment variables:
+  - ELO_WAL_COMPACT_BYTES: compact once the log exceeds this size (default 4 MiB)
+  - ELO_WAL_FSYNC: set to 1 to fsync every vote (default: flush only)
 """
 
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
-# Path to store Elo ratings
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+# Path to store Elo ratings (compacted snapshot)
 ELO_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "elo_ratings.json")
 
+# Append-only write-ahead log of rating changes since the snapshot
+WAL_FILE = ELO_FILE + ".wal"
+
+# Lock file shared by every process using the store
+LOCK_FILE = ELO_FILE + ".lock"
+
+# Fold the WAL into a new snapshot once it grows past this many bytes
+COMPACT_BYTES = int(os.getenv("ELO_WAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
+
+# fsync every WAL append (survives power loss, not just process crashes)
+FSYNC = os.getenv("ELO_WAL_FSYNC", "0") == "1"
+
 # Default K factor (points awarded/deducted per game)
 K_FACTOR = 32
 
 # Initial rating for new models
 DEFAULT_RATING = 1600
 
+# In-memory state, kept in step with the snapshot + WAL on disk.
+# Each WAL line is a post-image {"model": {"rating", "wins", "losses"}, ...},
+# so replaying a line twice (or on top of a newer snapshot) is harmless.
+_thread_lock = threading.RLock()
+_lock_fd: Optional[int] = None
+_lock_pid: Optional[int] = None
+_ratings: Optional[Dict[str, Dict]] = None
+_snapshot_inode: Optional[int] = None
+_wal_inode: Optional[int] = None
+_wal_offset = 0
+
 
 def ensure_elo_file():
     """Create elo_ratings.json if it doesn't exist."""
     Path(ELO_FILE).parent.mkdir(parents=True, exist_ok=True)
     if not os.path.exists(ELO_FILE):
-        with open(ELO_FILE, "w") as f:
-            json.dump({}, f, indent=2)
+        _write_atomic(ELO_FILE, json.dumps({}, indent=2).encode())
 
 
-def load_ratings() -> Dict[str, Dict]:
-    """Load Elo ratings from file."""
-    ensure_elo_file()
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _inode(path: str) -> Optional[int]:
     try:
-        with open(ELO_FILE, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _locked(exclusive: bool):
+    """Hold the in-process lock and the cross-process file lock."""
+    global _lock_fd, _lock_pid
+    with _thread_lock:
+        ensure_elo_file()
+        # A forked child must not share the parent's lock file description
+        if _lock_fd is None or _lock_pid != os.getpid():
+            _lock_fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+            _lock_pid = os.getpid()
+        if fcntl is not None:
+            fcntl.flock(_lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(_lock_fd, fcntl.LOCK_UN)
+
+
+def _sync(repair: bool = False):
+    """
+    Bring the in-memory state up to date with the files (caller holds the lock).
+
+    A changed snapshot or WAL inode means another process compacted, so the
+    snapshot is reloaded and the new WAL replayed from the start. Otherwise
+    only WAL lines appended since the last sync are applied. A torn final
+    line (a writer crashed mid-append) is skipped, or cut off if repair is set.
+    """
+    global _ratings, _snapshot_inode, _wal_inode, _wal_offset
+
+    snapshot_inode, wal_inode = _inode(ELO_FILE), _inode(WAL_FILE)
+    if _ratings is None or snapshot_inode != _snapshot_inode or wal_inode != _wal_inode:
+        try:
+            with open(ELO_FILE, "r") as f:
+                _ratings = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            _ratings = {}
+        _snapshot_inode, _wal_inode, _wal_offset = snapshot_inode, wal_inode, 0
+
+    if wal_inode is None:
+        return
+
+    with open(WAL_FILE, "rb") as f:
+        f.seek(_wal_offset)
+        pending = f.read()
+
+    complete = pending.rfind(b"\n") + 1
+    for line in pending[:complete].splitlines():
+        if line.strip():
+            _ratings.update(json.loads(line))
+    _wal_offset += complete
+
+    if repair and complete < len(pending):
+        with open(WAL_FILE, "r+b") as f:
+            f.truncate(_wal_offset)
+
+
+def _append(post_image: Dict[str, Dict]):
+    """Append one post-image line to the WAL (caller holds the exclusive lock)."""
+    global _wal_inode, _wal_offset
+    line = (json.dumps(post_image, separators=(",", ":")) + "\n").encode()
+    with open(WAL_FILE, "ab") as f:
+        f.write(line)
+        f.flush()
+        if FSYNC:
+            os.fsync(f.fileno())
+    if _wal_inode is None:
+        _wal_inode = _inode(WAL_FILE)
+    _wal_offset += len(line)
+    _ratings.update(post_image)
+
+
+def _compact():
+    """Write the current state as the snapshot and start an empty WAL (caller holds the exclusive lock)."""
+    global _snapshot_inode, _wal_inode, _wal_offset
+    # Snapshot first: if we crash before the WAL is replaced, replaying the
+    # old WAL's post-images over the new snapshot yields the same state
+    _write_atomic(ELO_FILE, json.dumps(_ratings, indent=2).encode())
+    _write_atomic(WAL_FILE, b"")
+    _snapshot_inode, _wal_inode, _wal_offset = _inode(ELO_FILE), _inode(WAL_FILE), 0
+
+
+def compact():
+    """Fold the WAL into a fresh snapshot."""
+    with _locked(exclusive=True):
+        _sync(repair=True)
+        _compact()
+
+
+def load_ratings() -> Dict[str, Dict]:
+    """Load Elo ratings (a copy of the in-memory state)."""
+    with _locked(exclusive=False):
+        _sync()
+        return {model: dict(entry) for model, entry in _ratings.items()}
 
 
 def save_ratings(ratings: Dict[str, Dict]):
-    """Save Elo ratings to file."""
-    ensure_elo_file()
-    with open(ELO_FILE, "w") as f:
-        json.dump(ratings, f, indent=2)
+    """Replace all Elo ratings with a new snapshot."""
+    global _ratings
+    with _locked(exclusive=True):
+        _sync(repair=True)
+        _ratings = {model: dict(entry) for model, entry in ratings.items()}
+        _compact()
 
 
 def get_rating(model: str) -> float:
     """Get the current Elo rating for a model."""
-    ratings = load_ratings()
-    if model not in ratings:
-        return DEFAULT_RATING
-    return ratings[model].get("rating", DEFAULT_RATING)
+    with _locked(exclusive=False):
+        _sync()
+        if model not in _ratings:
+            return DEFAULT_RATING
+        return _ratings[model].get("rating", DEFAULT_RATING)
 
 
 def expected_result(player_rating: float, opponent_rating: float) -> float:
@@ -66,9 +212,30 @@ def expected_result(player_rating: float, opponent_rating: float) -> float:
     return 1 / (1 + 10 ** ((opponent_rating - player_rating) / 400))
 
 
+def calc_prob(r1, r2): # From classic elo model. 
+    return 1/(1 + 10**((r2 - r1)/400))
+
+
+def update_elo(p1_elo, p2_elo, winner, k_factor=K_FACTOR):
+    """Return both players' new ratings; winner is "1" if p1 won, otherwise p2 won."""
+    if winner == "1":
+      prob_opposite = calc_prob(p2_elo, p1_elo)
+      S_0, S_1 = 1, -1
+    else:
+      prob_opposite = calc_prob(p1_elo, p2_elo)
+      S_0, S_1 = -1, 1
+    p1_new = p1_elo + k_factor * S_0 * (prob_opposite)
+    p2_new = p2_elo + k_factor * S_1 * (prob_opposite)
+    return p1_new, p2_new
+
+
 def update_ratings(winner_model: str, loser_model: str) -> Tuple[float, float]:
     """Update Elo ratings after a battle result.
     
+    The change is appended to the WAL as one line under an exclusive lock,
+    so concurrent votes from any number of threads or processes are
+    serialized and never lost.
+    
     Args:
         winner_model: Model that won the vote
         loser_model: Model that lost the vote
@@ -76,34 +243,38 @@ def update_ratings(winner_model: str, loser_model: str) -> Tuple[float, float]:
     Returns:
         (new_winner_rating, new_loser_rating)
     """
-    ratings = load_ratings()
-    
-    # Get current ratings
-    winner_rating = get_rating(winner_model)
-    loser_rating = get_rating(loser_model)
-    
-    # Calculate expected results
-    winner_expected = expected_result(winner_rating, loser_rating)
-    loser_expected = expected_result(loser_rating, winner_rating)
-    
-    # Calculate new ratings
-    new_winner_rating = winner_rating + K_FACTOR * (1 - winner_expected)
-    new_loser_rating = loser_rating + K_FACTOR * (0 - loser_expected)
-    
-    # Update ratings dict
-    if winner_model not in ratings:
-        ratings[winner_model] = {"rating": 0, "wins": 0, "losses": 0}
-    if loser_model not in ratings:
-        ratings[loser_model] = {"rating": 0, "wins": 0, "losses": 0}
-    
-    ratings[winner_model]["rating"] = round(new_winner_rating, 1)
-    ratings[winner_model]["wins"] = ratings[winner_model].get("wins", 0) + 1
-    
-    ratings[loser_model]["rating"] = round(new_loser_rating, 1)
-    ratings[loser_model]["losses"] = ratings[loser_model].get("losses", 0) + 1
-    
-    # Save updated ratings
-    save_ratings(ratings)
+    with _locked(exclusive=True):
+        _sync(repair=True)
+        
+        winner = _ratings.get(winner_model, {"rating": DEFAULT_RATING, "wins": 0, "losses": 0})
+        loser = _ratings.get(loser_model, {"rating": DEFAULT_RATING, "wins": 0, "losses": 0})
+        winner_rating = winner.get("rating", DEFAULT_RATING)
+        loser_rating = loser.get("rating", DEFAULT_RATING)
+        
+        # Calculate expected results
+        winner_expected = expected_result(winner_rating, loser_rating)
+        loser_expected = expected_result(loser_rating, winner_rating)
+        
+        # Calculate new ratings
+        new_winner_rating = winner_rating + K_FACTOR * (1 - winner_expected)
+        new_loser_rating = loser_rating + K_FACTOR * (0 - loser_expected)
+        
+        post_image = {
+            winner_model: {
+                **winner,
+                "rating": round(new_winner_rating, 1),
+                "wins": winner.get("wins", 0) + 1,
+            },
+        }
+        post_image[loser_model] = {
+            **post_image.get(loser_model, loser),
+            "rating": round(new_loser_rating, 1),
+            "losses": loser.get("losses", 0) + 1,
+        }
+        _append(post_image)
+        
+        if _wal_offset > COMPACT_BYTES:
+            _compact()
     
     return new_winner_rating, new_loser_rating
 
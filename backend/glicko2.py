@@ -0,0 +1,124 @@
+"""
+Glicko-2 rating system (Glickman, 2013), vectorized over all players.
+
+Unlike Elo's fixed K=32, every model carries a rating deviation (RD: how
+unsure we are of its rating) and a volatility (how erratic its results
+are). New models start with a large RD and move quickly; established ones
+settle. Ratings are updated in batches ("rating periods"): every game in a
+period is scored against the opponents' pre-period ratings, so the result
+does not depend on vote order within a period.
+
+All updates for a period are computed at once with NumPy, so a period with
+thousands of games between a hundred models is a handful of array ops.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+DEFAULT_VOLATILITY = 0.06
+
+# System constant: how much volatility may change per period (0.3-1.2)
+TAU = 0.5
+
+# Glicko-2 internal scale
+SCALE = 173.7178
+CONVERGENCE = 1e-6
+MAX_ITER = 100
+
+
+def g(phi: np.ndarray) -> np.ndarray:
+    return 1.0 / np.sqrt(1.0 + 3.0 * phi ** 2 / np.pi ** 2)
+
+
+def _new_volatility(sigma, phi, v, delta, tau):
+    """Solve for the new volatility of every player at once (Illinois algorithm)."""
+    a = np.log(sigma ** 2)
+    phi2 = phi ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta ** 2 - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    A = a.copy()
+    big = delta ** 2 > phi2 + v
+    B = np.where(big, np.log(np.maximum(delta ** 2 - phi2 - v, 1e-300)), a - tau)
+    # Step B down until f(B) >= 0 where the bracket isn't given directly
+    pending = ~big & (f(B) < 0)
+    for _ in range(MAX_ITER):
+        if not pending.any():
+            break
+        B = np.where(pending, B - tau, B)
+        pending = pending & (f(B) < 0)
+
+    fA, fB = f(A), f(B)
+    for _ in range(MAX_ITER):
+        active = np.abs(B - A) > CONVERGENCE
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        swap = fC * fB <= 0
+        A = np.where(active, np.where(swap, B, A), A)
+        fA = np.where(active, np.where(swap, fB, fA / 2.0), fA)
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+
+    return np.exp(A / 2.0)
+
+
+def rate_period(ratings: np.ndarray, rds: np.ndarray, volatilities: np.ndarray,
+                winners: np.ndarray, losers: np.ndarray, counts: np.ndarray = None,
+                tau: float = TAU) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Apply one rating period to every player.
+
+    Args:
+        ratings, rds, volatilities: Per-player state before the period
+        winners, losers: Player indices of each game (or group of identical games)
+        counts: How many times each (winner, loser) game happened (default 1)
+        tau: System constant
+
+    Returns:
+        (ratings, rds, volatilities) after the period. Players without games
+        keep their rating and volatility; their RD grows.
+    """
+    n = len(ratings)
+    mu = (ratings - DEFAULT_RATING) / SCALE
+    phi = rds / SCALE
+    sigma = volatilities.astype(float)
+    counts = np.ones(len(winners)) if counts is None else np.asarray(counts, dtype=float)
+
+    # Each game seen from both sides: (player, opponent, score)
+    players = np.concatenate([winners, losers])
+    opponents = np.concatenate([losers, winners])
+    scores = np.concatenate([np.ones(len(winners)), np.zeros(len(losers))])
+    weights = np.concatenate([counts, counts])
+
+    g_opp = g(phi[opponents])
+    expected = 1.0 / (1.0 + np.exp(-g_opp * (mu[players] - mu[opponents])))
+    v_inv = np.bincount(players, weights * g_opp ** 2 * expected * (1.0 - expected), minlength=n)
+    score_sum = np.bincount(players, weights * g_opp * (scores - expected), minlength=n)
+
+    new_mu = mu.copy()
+    new_phi = np.sqrt(phi ** 2 + sigma ** 2)
+    new_sigma = sigma.copy()
+
+    active = v_inv > 0
+    if active.any():
+        v = 1.0 / v_inv[active]
+        delta = v * score_sum[active]
+        new_sigma[active] = _new_volatility(sigma[active], phi[active], v, delta, tau)
+        phi_star = np.sqrt(phi[active] ** 2 + new_sigma[active] ** 2)
+        new_phi[active] = 1.0 / np.sqrt(1.0 / phi_star ** 2 + v_inv[active])
+        new_mu[active] = mu[active] + new_phi[active] ** 2 * score_sum[active]
+
+    # Cap RD at its starting value so idle models don't become "less than new"
+    new_rd = np.minimum(new_phi * SCALE, DEFAULT_RD)
+    return DEFAULT_RATING + new_mu * SCALE, new_rd, new_sigma
+
+
+def new_player() -> Dict[str, float]:
+    return {'rating': DEFAULT_RATING, 'rd': DEFAULT_RD, 'volatility': DEFAULT_VOLATILITY}
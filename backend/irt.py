@@ -0,0 +1,406 @@
+"""
+Graded-response IRT model over models x questions, fitted offline.
+
+compute_axis_score treats every question as equally informative. Samejima's
+graded response model instead gives each question q a discrimination a_q
+and ordered thresholds b_q1 < ... < b_q4 between the five Likert categories,
+and each model m a latent position theta_m per axis:
+
+  P(answer >= k | theta) = sigmoid(a_q * (theta - b_qk)),  k = 1..4
+
+Answers are oriented by the question's reverse flag first (as in
+backend/compass.py), so a_q > 0 and a higher theta is further along the axis.
+Every collected answer of every run is one observation; runs of the same
+model share its theta.
+
+The fit maximizes the joint posterior (normal priors on theta, log a and b
+keep models and questions with one-sided answers finite, and fix the scale
+that the likelihood alone leaves free) by alternating Newton steps
+for all thetas and for all questions' parameters, each a vectorized pass
+over every observation with per-model / per-question sums by bincount.
+Nightly refits start from the previous parameters (start=) and only move as
+far as the new answers require.
+
+Outputs feed question pruning and adaptive runs: item_information() is the
+Fisher information a question contributes at a given theta, and the standard
+error of a model's theta is 1 / sqrt(prior + sum of information of the
+questions it answered).
+"""
+
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from .compass import AXES
+
+# Likert answers -2..+2 are categories 0..4
+MIN_LIKERT = -2
+CATEGORIES = 5
+
+THETA_PRIOR_SD = 1.0
+LOG_A_PRIOR_SD = 1.0
+B_PRIOR_SD = 3.0
+
+DEFAULT_THRESHOLDS = (-1.5, -0.5, 0.5, 1.5)
+MIN_GAP = 1e-3
+# Step halvings before a parameter block keeps its value for the iteration
+MAX_HALVINGS = 20
+
+
+class Observations(NamedTuple):
+    """One row per collected answer."""
+    model: np.ndarray      # int, index into the model list
+    question: np.ndarray   # int, index into the question bank
+    category: np.ndarray   # int, 0..CATEGORIES-1 after reverse-keying
+
+
+class GRMParams(NamedTuple):
+    log_a: np.ndarray      # (questions,) log discrimination
+    b: np.ndarray          # (questions, CATEGORIES - 1) increasing thresholds
+    theta: np.ndarray      # (models, len(AXES))
+
+
+def observations(scores: np.ndarray, sign: np.ndarray) -> Observations:
+    """
+    Flatten a models x runs x questions score tensor into observations.
+
+    Args:
+        scores: Likert answers, NaN where missing (e.g. tools/aggregate.load_run_scores)
+        sign: -1 for reverse-keyed questions, +1 otherwise
+    """
+    scores = np.asarray(scores, dtype=float)
+    model, _, question = np.nonzero(np.isfinite(scores))
+    oriented = scores[np.isfinite(scores)] * np.asarray(sign)[question]
+    category = np.clip(np.rint(oriented) - MIN_LIKERT, 0, CATEGORIES - 1).astype(np.int64)
+    return Observations(model, question, category)
+
+
+def discrimination(params: GRMParams) -> np.ndarray:
+    return np.exp(params.log_a)
+
+
+def _ordered(b: np.ndarray) -> np.ndarray:
+    """Project thresholds onto b_k >= b_k-1 + MIN_GAP."""
+    offsets = MIN_GAP * np.arange(b.shape[-1])
+    return np.maximum.accumulate(b - offsets, axis=-1) + offsets
+
+
+def initial_params(n_models: int, n_questions: int) -> GRMParams:
+    return GRMParams(
+        log_a=np.zeros(n_questions),
+        b=np.tile(np.asarray(DEFAULT_THRESHOLDS, dtype=float), (n_questions, 1)),
+        theta=np.zeros((n_models, len(AXES))),
+    )
+
+
+def _cumulative(a: np.ndarray, b: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """P(answer >= k) for k = 0..CATEGORIES, padded with 1 and 0: shape (..., CATEGORIES + 1)."""
+    z = a[..., None] * (theta[..., None] - b)
+    inner = 1.0 / (1.0 + np.exp(-z))
+    ones = np.ones(inner.shape[:-1] + (1,))
+    return np.concatenate([ones, inner, np.zeros_like(ones)], axis=-1)
+
+
+def category_probabilities(a: np.ndarray, b: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """P(answer = k) for every category: shape (..., CATEGORIES)."""
+    cumulative = _cumulative(a, b, theta)
+    return cumulative[..., :-1] - cumulative[..., 1:]
+
+
+def item_information(a: np.ndarray, b: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """
+    Fisher information of questions at theta.
+
+    Args:
+        a: Discriminations (...,); b: thresholds (..., CATEGORIES - 1);
+        theta: Positions broadcastable to a
+
+    Returns:
+        a^2 * sum_k (W_k - W_k+1)^2 / P_k with W = P*(1 - P*), shape of a
+    """
+    cumulative = _cumulative(a, b, theta)
+    w = cumulative * (1.0 - cumulative)
+    probs = np.clip(cumulative[..., :-1] - cumulative[..., 1:], 1e-12, None)
+    return a ** 2 * ((w[..., :-1] - w[..., 1:]) ** 2 / probs).sum(axis=-1)
+
+
+def _log_prior(params: GRMParams) -> float:
+    return -0.5 * float(
+        (params.theta ** 2).sum() / THETA_PRIOR_SD ** 2
+        + (params.log_a ** 2).sum() / LOG_A_PRIOR_SD ** 2
+        + (params.b ** 2).sum() / B_PRIOR_SD ** 2
+    )
+
+
+def _answer_log_probs(params: GRMParams, obs: Observations, axis: np.ndarray) -> np.ndarray:
+    """log P(observed category) of every answer."""
+    a = discrimination(params)[obs.question]
+    cumulative = _cumulative(a, params.b[obs.question], params.theta[obs.model, axis[obs.question]])
+    rows = np.arange(len(obs.category))
+    p = cumulative[rows, obs.category] - cumulative[rows, obs.category + 1]
+    return np.log(np.clip(p, 1e-12, None))
+
+
+def log_likelihood(params: GRMParams, obs: Observations, axis: np.ndarray) -> float:
+    return float(_answer_log_probs(params, obs, axis).sum())
+
+
+def _theta_objective(params: GRMParams, obs: Observations, axis: np.ndarray) -> np.ndarray:
+    """Log posterior terms of each theta given the questions' parameters: (models, axes)."""
+    cells = obs.model * len(AXES) + axis[obs.question]
+    ll = np.bincount(cells, weights=_answer_log_probs(params, obs, axis), minlength=params.theta.size)
+    return ll.reshape(params.theta.shape) - 0.5 * params.theta ** 2 / THETA_PRIOR_SD ** 2
+
+
+def _item_objective(params: GRMParams, obs: Observations, axis: np.ndarray) -> np.ndarray:
+    """Log posterior terms of each question's parameters given the thetas: (questions,)."""
+    ll = np.bincount(obs.question, weights=_answer_log_probs(params, obs, axis), minlength=len(params.log_a))
+    return ll - 0.5 * (params.log_a ** 2 / LOG_A_PRIOR_SD ** 2 + (params.b ** 2).sum(axis=1) / B_PRIOR_SD ** 2)
+
+
+def _theta_step(params: GRMParams, obs: Observations, axis: np.ndarray) -> np.ndarray:
+    """Fisher-scoring step for every theta (one scalar Newton step per model and axis)."""
+    a = discrimination(params)[obs.question]
+    b = params.b[obs.question]
+    obs_axis = axis[obs.question]
+    theta = params.theta[obs.model, obs_axis]
+
+    cumulative = _cumulative(a, b, theta)
+    w = cumulative * (1.0 - cumulative)
+    rows = np.arange(len(obs.category))
+    p = np.clip(cumulative[rows, obs.category] - cumulative[rows, obs.category + 1], 1e-12, None)
+    # d log p / d theta = a * (W_upper - W_lower) / p; the padded boundaries have W = 0
+    gradient = a * (w[rows, obs.category] - w[rows, obs.category + 1]) / p
+
+    n = params.theta.size
+    cells = obs.model * len(AXES) + obs_axis
+    score = np.bincount(cells, weights=gradient, minlength=n).reshape(params.theta.shape)
+    info = np.bincount(cells, weights=item_information(a, b, theta), minlength=n).reshape(params.theta.shape)
+    precision = 1.0 / THETA_PRIOR_SD ** 2
+    return (score - params.theta * precision) / (info + precision)
+
+
+def _item_step(params: GRMParams, obs: Observations, axis: np.ndarray) -> tuple:
+    """
+    Newton step for every question's (log a, b_1..b_4), using the outer
+    product of per-answer gradients (BHHH) as the information matrix.
+
+    Returns:
+        (log_a step, b step)
+    """
+    a = discrimination(params)[obs.question]
+    b = params.b[obs.question]
+    theta = params.theta[obs.model, axis[obs.question]]
+
+    cumulative = _cumulative(a, b, theta)
+    w = cumulative * (1.0 - cumulative)
+    rows = np.arange(len(obs.category))
+    p = np.clip(cumulative[rows, obs.category] - cumulative[rows, obs.category + 1], 1e-12, None)
+    # d log p / dz at the category's two boundaries, z = a * (theta - b)
+    g_upper = w[rows, obs.category] / p
+    g_lower = -w[rows, obs.category + 1] / p
+
+    # Per-answer gradient: column 0 is log a, columns 1..CATEGORIES-1 the
+    # thresholds, padded by one column each side for the outer boundaries
+    width = CATEGORIES + 2
+    b_padded = np.hstack([np.zeros((len(b), 1)), b, np.zeros((len(b), 1))])
+    per_answer = np.zeros((len(rows), width))
+    per_answer[:, 0] = a * (g_upper * (theta - b_padded[rows, obs.category])
+                            + g_lower * (theta - b_padded[rows, obs.category + 1]))
+    per_answer[rows, obs.category + 1] = -a * g_upper
+    per_answer[rows, obs.category + 2] += -a * g_lower
+    per_answer = per_answer[:, :-1]
+    per_answer = np.delete(per_answer, 1, axis=1)
+
+    k = per_answer.shape[1]
+    n_questions = len(params.log_a)
+    gradient = np.stack([
+        np.bincount(obs.question, weights=per_answer[:, j], minlength=n_questions) for j in range(k)
+    ], axis=1)
+    outer = (per_answer[:, :, None] * per_answer[:, None, :]).reshape(len(rows), k * k)
+    cells = (obs.question[:, None] * (k * k) + np.arange(k * k)).ravel()
+    hessian = np.bincount(cells, weights=outer.ravel(), minlength=n_questions * k * k).reshape(n_questions, k, k)
+
+    # Priors: gradient and precision
+    values = np.hstack([params.log_a[:, None], params.b])
+    precision = np.array([1.0 / LOG_A_PRIOR_SD ** 2] + [1.0 / B_PRIOR_SD ** 2] * (k - 1))
+    gradient = gradient - values * precision
+    hessian = hessian + np.diag(precision)
+    step = np.linalg.solve(hessian, gradient[..., None])[..., 0]
+    return step[:, 0], step[:, 1:]
+
+
+def _rescale(params: GRMParams, axis: np.ndarray) -> GRMParams:
+    """
+    Move each axis along the likelihood's shift / scale ridge to the prior's optimum.
+
+    theta' = (theta - mu) / c, b' = (b - mu) / c, a' = a * c leaves every
+    probability unchanged, so only the priors vary along this ridge, which the
+    theta and question steps otherwise crawl along. mu is a weighted mean of
+    thetas and thresholds; u = log c solves the convex
+    S * exp(-2u) = (sum(log a) + n * u) / LOG_A_PRIOR_SD^2 by Newton's method.
+    """
+    params = GRMParams(params.log_a.copy(), params.b.copy(), params.theta.copy())
+    for k in range(len(AXES)):
+        items = axis == k
+        if not items.any():
+            continue
+        theta, b, log_a = params.theta[:, k], params.b[items], params.log_a[items]
+        wt, wb = 1.0 / THETA_PRIOR_SD ** 2, 1.0 / B_PRIOR_SD ** 2
+        mu = (wt * theta.sum() + wb * b.sum()) / (wt * theta.size + wb * b.size)
+        spread = wt * ((theta - mu) ** 2).sum() + wb * ((b - mu) ** 2).sum()
+        n, wa = log_a.size, 1.0 / LOG_A_PRIOR_SD ** 2
+        u = 0.0
+        for _ in range(50):
+            g = -spread * np.exp(-2 * u) + wa * (log_a.sum() + n * u)
+            step = g / (2 * spread * np.exp(-2 * u) + wa * n)
+            u -= step
+            if abs(step) < 1e-12:
+                break
+        c = np.exp(u)
+        params.theta[:, k] = (theta - mu) / c
+        params.b[items] = (b - mu) / c
+        params.log_a[items] = log_a + u
+    return params
+
+
+def fit(obs: Observations, axis: np.ndarray, n_models: int, start: GRMParams = None,
+        max_iter: int = 200, tol: float = 1e-5) -> Dict:
+    """
+    Fit the graded response model by maximum a posteriori.
+
+    Alternates a Fisher-scoring step for all thetas with a Newton step for
+    all questions' parameters, each computed for every model / question at
+    once from one pass over the observations. Given the other block the
+    posterior separates per theta and per question, so each one halves its
+    own step until its own posterior term doesn't decrease. Each axis is
+    then moved to the best point on the likelihood's scale ridge (see
+    _rescale), so every iteration raises the posterior.
+
+    Args:
+        obs: All collected answers
+        axis: Axis index of each question (backend.compass.QuestionBank.axis)
+        n_models: Number of models (rows of theta)
+        start: Parameters to start from (warm start), e.g. from load_start()
+        max_iter: Iteration cap
+        tol: Stop when an iteration improves the log posterior by less than
+            this per observation
+
+    Returns:
+        Dict with params (GRMParams), log_likelihood, iterations, converged
+    """
+    axis = np.asarray(axis)
+    params = start if start is not None else initial_params(n_models, len(axis))
+    if len(obs.category) == 0:
+        return {'params': params, 'log_likelihood': 0.0, 'iterations': 0, 'converged': True}
+
+    converged = False
+    iteration = 0
+    best = log_likelihood(params, obs, axis) + _log_prior(params)
+    for iteration in range(1, max_iter + 1):
+        # Thetas: (models, axes) steps, each accepted or halved on its own
+        step = _theta_step(params, obs, axis)
+        current = _theta_objective(params, obs, axis)
+        scale = np.ones_like(step)
+        for _ in range(MAX_HALVINGS):
+            value = _theta_objective(params._replace(theta=params.theta + scale * step), obs, axis)
+            worse = value < current
+            if not worse.any():
+                break
+            scale[worse] /= 2.0
+        scale[worse] = 0.0
+        params = params._replace(theta=params.theta + scale * step)
+
+        # Questions: (log a, thresholds) steps per question
+        step_a, step_b = _item_step(params, obs, axis)
+        current = _item_objective(params, obs, axis)
+        scale = np.ones(len(step_a))
+        for _ in range(MAX_HALVINGS):
+            candidate = params._replace(log_a=params.log_a + scale * step_a,
+                                        b=_ordered(params.b + scale[:, None] * step_b))
+            worse = _item_objective(candidate, obs, axis) < current
+            if not worse.any():
+                break
+            scale[worse] /= 2.0
+        scale[worse] = 0.0
+        params = params._replace(log_a=params.log_a + scale * step_a,
+                                 b=_ordered(params.b + scale[:, None] * step_b))
+        params = _rescale(params, axis)
+
+        value = log_likelihood(params, obs, axis) + _log_prior(params)
+        if value - best < tol * len(obs.category):
+            converged = True
+            break
+        best = value
+
+    return {'params': params, 'log_likelihood': log_likelihood(params, obs, axis),
+            'iterations': iteration, 'converged': converged}
+
+
+def theta_standard_errors(params: GRMParams, obs: Observations, axis: np.ndarray) -> np.ndarray:
+    """(models, len(AXES)) posterior standard errors of theta from the Fisher information."""
+    axis = np.asarray(axis)
+    obs_axis = axis[obs.question]
+    info = item_information(discrimination(params)[obs.question], params.b[obs.question],
+                            params.theta[obs.model, obs_axis])
+    n_models = params.theta.shape[0]
+    total = np.bincount(obs.model * len(AXES) + obs_axis, weights=info,
+                        minlength=n_models * len(AXES)).reshape(n_models, len(AXES))
+    return 1.0 / np.sqrt(total + 1.0 / THETA_PRIOR_SD ** 2)
+
+
+def to_dict(params: GRMParams, models: List[str], question_ids: List[str], axis: np.ndarray,
+            standard_errors: np.ndarray = None) -> Dict:
+    """
+    Serializable parameters, keyed by model name and question id (the warm-start format).
+
+    Returns:
+        {questions: {id: {axis, discrimination, thresholds, difficulty, information}},
+         models: {name: {economic, social, economic_se, social_se}}}
+    """
+    a = discrimination(params)
+    b = params.b
+    # Information over the theta prior: the expected value of a question to a new model
+    grid = np.linspace(-3, 3, 61)
+    weights = np.exp(-0.5 * grid ** 2)
+    weights /= weights.sum()
+    expected_info = item_information(a[:, None], b[:, None, :], grid[None, :]) @ weights
+
+    questions = {
+        qid: {
+            'axis': AXES[int(axis[q])],
+            'discrimination': float(a[q]),
+            'thresholds': [float(x) for x in b[q]],
+            'difficulty': float(b[q].mean()),
+            'information': float(expected_info[q]),
+        }
+        for q, qid in enumerate(question_ids)
+    }
+    model_rows = {}
+    for i, name in enumerate(models):
+        row = {ax: float(params.theta[i, k]) for k, ax in enumerate(AXES)}
+        if standard_errors is not None:
+            row.update({f"{ax}_se": float(standard_errors[i, k]) for k, ax in enumerate(AXES)})
+        model_rows[name] = row
+    return {'questions': questions, 'models': model_rows}
+
+
+def load_start(saved: Dict, models: List[str], question_ids: List[str]) -> GRMParams:
+    """
+    Warm-start parameters from a previous to_dict() output.
+
+    Models and questions that weren't in the previous fit start from the defaults.
+    """
+    params = initial_params(len(models), len(question_ids))
+    questions = saved.get('questions', {})
+    for q, qid in enumerate(question_ids):
+        item = questions.get(qid)
+        if not item or len(item.get('thresholds', [])) != CATEGORIES - 1:
+            continue
+        params.log_a[q] = np.log(max(item['discrimination'], 1e-3))
+        params.b[q] = _ordered(np.asarray(item['thresholds'], dtype=float))
+    saved_models = saved.get('models', {})
+    for i, name in enumerate(models):
+        if name in saved_models:
+            params.theta[i] = [saved_models[name].get(ax, 0.0) for ax in AXES]
+    return params
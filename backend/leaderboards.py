@@ -0,0 +1,157 @@
+"""
+In-memory per-dimension leaderboards.
+
+Every dimension in backend/tags.DIMENSIONS keeps a list of models already
+sorted by mean score, built from the model_dimension_rollups table. Votes
+stored by this process are applied incrementally: only the voted model's
+entry moves, found and re-inserted by bisection, so a vote costs
+O(log n) comparisons per dimension instead of a sort. A max-staleness timer
+bounds how far a worker can drift from votes written by other workers.
+
+Environment variables:
+  - DIMENSION_LEADERBOARD_MAX_STALENESS: seconds before the cache is
+    reloaded from the database (default 30)
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from .tags import DIMENSIONS
+
+MAX_STALENESS_SECONDS = float(os.getenv("DIMENSION_LEADERBOARD_MAX_STALENESS", "30"))
+
+_lock = threading.Lock()
+
+# model -> dimension -> [vote_count, score_sum]
+_totals: Dict[str, Dict[str, List[float]]] = {}
+
+# dimension -> entries sorted best-first
+_boards: Dict[str, List[Dict]] = {dim: [] for dim in DIMENSIONS}
+
+# dimension -> _sort_key of each entry of _boards[dimension], same order (for bisect)
+_keys: Dict[str, List[tuple]] = {dim: [] for dim in DIMENSIONS}
+
+_loaded_at: Optional[float] = None
+
+
+def _sort_key(entry: Dict):
+    # Highest mean first; ties go to the model with more votes, then by name
+    return (-entry['mean'], -entry['vote_count'], entry['model_name'])
+
+
+def _entry(model: str, vote_count: int, score_sum: float) -> Dict:
+    return {'model_name': model, 'mean': score_sum / vote_count, 'vote_count': int(vote_count)}
+
+
+def _rebuild_board(dimension: str):
+    entries = []
+    for model, dims in _totals.items():
+        if dimension not in dims:
+            continue
+        vote_count, score_sum = dims[dimension]
+        if vote_count <= 0:
+            continue
+        entries.append(_entry(model, vote_count, score_sum))
+    entries.sort(key=_sort_key)
+    _boards[dimension] = entries
+    _keys[dimension] = [_sort_key(entry) for entry in entries]
+
+
+def _reposition(dimension: str, model: str, old: tuple, new: tuple):
+    """Move one model's entry from its old (vote_count, score_sum) to its new place."""
+    board, keys = _boards[dimension], _keys[dimension]
+    if old[0] > 0:
+        key = _sort_key(_entry(model, *old))
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            # Not where its totals say it should be; start this board over
+            _rebuild_board(dimension)
+            return
+        del board[i]
+        del keys[i]
+    entry = _entry(model, *new)
+    key = _sort_key(entry)
+    i = bisect_left(keys, key)
+    board.insert(i, entry)
+    keys.insert(i, key)
+
+
+def is_stale(max_staleness: float = None) -> bool:
+    """True if the leaderboards were never loaded or are older than max_staleness seconds."""
+    if max_staleness is None:
+        max_staleness = MAX_STALENESS_SECONDS
+    return _loaded_at is None or (time.monotonic() - _loaded_at) > max_staleness
+
+
+def load(rows: List[Dict]):
+    """
+    Replace all leaderboards from rollup rows.
+
+    Args:
+        rows: Dicts with model_name, dimension, vote_count and score_sum
+    """
+    global _loaded_at
+
+    totals: Dict[str, Dict[str, List[float]]] = {}
+    for row in rows:
+        if row['dimension'] not in DIMENSIONS:
+            continue
+        totals.setdefault(row['model_name'], {})[row['dimension']] = [
+            int(row['vote_count']), float(row['score_sum'])
+        ]
+
+    with _lock:
+        _totals.clear()
+        _totals.update(totals)
+        for dimension in DIMENSIONS:
+            _rebuild_board(dimension)
+        _loaded_at = time.monotonic()
+
+
+def apply_scores(model_name: str, scores: Dict[str, float]):
+    """Apply one vote's dimension scores for a model to the cached leaderboards."""
+    with _lock:
+        # Nothing to update until the first load; the next read will load everything
+        if _loaded_at is None:
+            return
+        dims = _totals.setdefault(model_name, {})
+        for dimension, score in scores.items():
+            if dimension not in DIMENSIONS:
+                continue
+            totals = dims.setdefault(dimension, [0, 0.0])
+            old = tuple(totals)
+            totals[0] += 1
+            totals[1] += score
+            _reposition(dimension, model_name, old, tuple(totals))
+
+
+def get_leaderboard(dimension: str, limit: int = 10, min_votes: int = 1) -> List[Dict]:
+    """
+    Read a cached leaderboard.
+
+    Args:
+        dimension: Name of dimension (empathy, aggressiveness, evidence_use, etc.)
+        limit: Number of top models to return
+        min_votes: Skip models with fewer votes than this
+
+    Returns:
+        List of dicts with rank, model_name, score and vote_count
+    """
+    results = []
+    # Boards are updated in place, so read under the lock
+    with _lock:
+        for entry in _boards.get(dimension, []):
+            if len(results) >= limit:
+                break
+            if entry['vote_count'] < min_votes:
+                continue
+            results.append({
+                'rank': len(results) + 1,
+                'model_name': entry['model_name'],
+                'score': round(entry['mean'], 3),
+                'vote_count': entry['vote_count'],
+            })
+    return results
@@ -0,0 +1,195 @@
+"""
+Information-gain matchmaking for battles.
+
+Left to the dropdowns, votes pile up on popular pairs while uncertain pairs
+go unmeasured. Instead, each model's rating is treated as a Gaussian whose
+variance shrinks with the Fisher information of the games it has played
+(sum of p * (1 - p) over its games, on the logistic Elo scale), and the next
+battle is the pair whose outcome is expected to tell us the most:
+
+  gain(i, j) = 0.5 * ln(1 + p_ij * (1 - p_ij) * (var_i + var_j) / s^2)
+
+with p_ij the Elo win probability and s = 400 / ln(10). Close matches
+between poorly measured models score highest; lopsided or well-measured
+pairs score low.
+
+The few best pairs are kept in a schedule that is recomputed (one vectorized
+pass over all pairs) whenever a vote is recorded by this process, so serving
+a proposal is a constant-time read that rotates through the schedule. The
+whole state is reloaded from the database after a max-staleness timer to
+pick up other workers' votes.
+
+Environment variables:
+  - MATCHMAKING_TOP_PAIRS: pairs the proposals rotate through (default 5)
+  - MATCHMAKING_MAX_STALENESS: seconds before the state is reloaded (default 300)
+"""
+
+import itertools
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SCALE = 400.0 / np.log(10.0)
+
+# Rating deviation of a model with no games (as in Glicko)
+PRIOR_RD = 350.0
+
+TOP_PAIRS = int(os.getenv("MATCHMAKING_TOP_PAIRS", "5"))
+MAX_STALENESS_SECONDS = float(os.getenv("MATCHMAKING_MAX_STALENESS", "300"))
+
+PROMPTS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "questions.tsv")
+
+_lock = threading.Lock()
+
+_models: List[str] = []
+_index: Dict[str, int] = {}
+_ratings = np.zeros(0)
+_info = np.zeros(0)
+
+# Best pairs first: (gain, model_a, model_b, p_a_wins)
+_schedule: List[Tuple[float, str, str, float]] = []
+_cursor = itertools.count()
+
+_loaded_at: Optional[float] = None
+
+_prompts: Optional[List[str]] = None
+_prompt_cursor = itertools.count()
+
+
+def win_probability(rating_a, rating_b):
+    """Elo probability that a beats b (works on arrays)."""
+    return 1.0 / (1.0 + 10.0 ** ((rating_b - rating_a) / 400.0))
+
+
+def _variance(info: np.ndarray) -> np.ndarray:
+    """Rating variance (Elo points squared) given accumulated Fisher information."""
+    return SCALE ** 2 / (info + (SCALE / PRIOR_RD) ** 2)
+
+
+def _rebuild_schedule():
+    global _schedule
+    n = len(_models)
+    if n < 2:
+        _schedule = []
+        return
+    p = win_probability(_ratings[:, None], _ratings[None, :])
+    var = _variance(_info)
+    gains = 0.5 * np.log1p(p * (1.0 - p) * (var[:, None] + var[None, :]) / SCALE ** 2)
+    rows, cols = np.triu_indices(n, k=1)
+    pair_gains = gains[rows, cols]
+    top = min(TOP_PAIRS, len(pair_gains))
+    best = np.argpartition(-pair_gains, top - 1)[:top]
+    best = best[np.argsort(-pair_gains[best])]
+    _schedule = [
+        (float(pair_gains[k]), _models[rows[k]], _models[cols[k]], float(p[rows[k], cols[k]]))
+        for k in best
+    ]
+
+
+def load(ratings: Dict[str, float], pair_counts: List[Tuple[str, str, int]]):
+    """
+    Replace the state with fresh ratings and pairwise game counts.
+
+    Args:
+        ratings: Model name -> current Elo rating
+        pair_counts: (winner_model, loser_model, games) rows
+    """
+    global _models, _index, _ratings, _info, _loaded_at
+    models = sorted(set(ratings) | {m for w, l, _ in pair_counts for m in (w, l)})
+    index = {m: i for i, m in enumerate(models)}
+    values = np.array([float(ratings.get(m, 1500.0)) for m in models])
+    info = np.zeros(len(models))
+    if pair_counts:
+        winners = np.array([index[w] for w, _, _ in pair_counts])
+        losers = np.array([index[l] for _, l, _ in pair_counts])
+        games = np.array([c for _, _, c in pair_counts], dtype=float)
+        p = win_probability(values[winners], values[losers])
+        fisher = games * p * (1.0 - p)
+        np.add.at(info, winners, fisher)
+        np.add.at(info, losers, fisher)
+
+    with _lock:
+        _models, _index, _ratings, _info = models, index, values, info
+        _rebuild_schedule()
+        _loaded_at = time.monotonic()
+
+
+def apply_vote(winner_model: str, loser_model: str, winner_rating: float, loser_rating: float):
+    """Fold a vote recorded by this process into the state and reschedule."""
+    global _models, _ratings, _info
+    if _loaded_at is None or winner_model == loser_model:
+        return
+    with _lock:
+        for model in (winner_model, loser_model):
+            if model not in _index:
+                _index[model] = len(_models)
+                _models = _models + [model]
+                _ratings = np.append(_ratings, 1500.0)
+                _info = np.append(_info, 0.0)
+        w, l = _index[winner_model], _index[loser_model]
+        p = win_probability(_ratings[w], _ratings[l])
+        _info[w] += p * (1.0 - p)
+        _info[l] += p * (1.0 - p)
+        _ratings[w], _ratings[l] = winner_rating, loser_rating
+        _rebuild_schedule()
+
+
+def is_stale(max_staleness: float = None) -> bool:
+    """True if the state was never loaded or is older than max_staleness seconds."""
+    if max_staleness is None:
+        max_staleness = MAX_STALENESS_SECONDS
+    return _loaded_at is None or (time.monotonic() - _loaded_at) > max_staleness
+
+
+def next_prompt() -> Optional[str]:
+    """Next battle prompt from questions.tsv, in rotation."""
+    global _prompts
+    if _prompts is None:
+        try:
+            with open(PROMPTS_FILE, encoding="utf-8") as f:
+                _prompts = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            print(f"⚠️  Could not load prompts from {PROMPTS_FILE}: {e}")
+            _prompts = []
+    if not _prompts:
+        return None
+    return _prompts[next(_prompt_cursor) % len(_prompts)]
+
+
+def next_pair() -> Optional[Dict]:
+    """
+    Propose the next battle pair in constant time.
+
+    Consecutive calls rotate through the best TOP_PAIRS pairs (so concurrent
+    users spread over them) and alternate which model is shown first.
+
+    Returns:
+        {model_a, model_b, win_probability, expected_information, rating_a,
+        rating_b, rd_a, rd_b}, or None with fewer than two models
+    """
+    schedule = _schedule
+    if not schedule:
+        return None
+    turn = next(_cursor)
+    gain, model_a, model_b, p = schedule[turn % len(schedule)]
+    if (turn // len(schedule)) % 2:
+        model_a, model_b, p = model_b, model_a, 1.0 - p
+
+    with _lock:
+        a, b = _index[model_a], _index[model_b]
+        rating_a, rating_b = float(_ratings[a]), float(_ratings[b])
+        rd_a, rd_b = np.sqrt(_variance(_info[[a, b]]))
+
+    return {
+        'model_a': model_a,
+        'model_b': model_b,
+        'win_probability': round(p, 4),
+        'expected_information': round(gain, 5),
+        'rating_a': round(rating_a, 2),
+        'rating_b': round(rating_b, 2),
+        'rd_a': round(float(rd_a), 2),
+        'rd_b': round(float(rd_b), 2),
+    }
@@ -0,0 +1,170 @@
+"""
+Append-only journal of a tools/run_models run, for resuming it.
+
+One JSON line per event in <store root>/journal/<run_id>.jsonl:
+
+  {"event": "start", "meta": {...}, "models": [...], "shard_size": n, "samples": n,
+   "question_ids": [...]}
+  {"event": "shard", "model", "shard", "samples": [...], "status": "ok" | "failed",
+   "content", "content_hash", "error", "timestamp", "seconds"}
+  {"event": "written", "model", "summary": {...}}      model appended to the store
+  {"event": "complete"}                               every shard ok and written
+
+Shard lines carry the raw response, so a resumed run re-parses finished
+shards instead of calling the model again. A line covers every sample the
+call answered (several when identical requests were deduplicated); the
+content hash is checked on replay and a shard whose content doesn't match
+it counts as not done. Later
+lines win, so a retried shard's "ok" supersedes its "failed". As with the
+Elo WAL (backend/elo.py) a torn final line, from a crash mid-append, is
+ignored, and cut off when the journal is loaded to resume.
+
+Journals are local resume state (gitignored); remove_complete() drops those
+of finished runs, whose answers are all in the store.
+
+Environment:
+  - RUN_JOURNAL_FSYNC: set to 1 to fsync every line (default: flush only)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+JOURNAL_DIR = 'journal'
+
+OK = 'ok'
+FAILED = 'failed'
+
+FSYNC = os.getenv("RUN_JOURNAL_FSYNC", "0") == "1"
+
+# Serializes appends between threads of one process
+_lock = threading.Lock()
+
+
+def journal_path(root: str, run_id: str) -> str:
+    return os.path.join(root, JOURNAL_DIR, f"{run_id}.jsonl")
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _append(root: str, run_id: str, entry: Dict[str, Any]):
+    path = journal_path(root, run_id)
+    line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+    with _lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(line)
+            f.flush()
+            if FSYNC:
+                os.fsync(f.fileno())
+
+
+def start(root: str, run_id: str, meta: Dict, models: list, shard_size: Optional[int], question_ids: list,
+          samples: int = 1):
+    """Open the journal of a new run."""
+    _append(root, run_id, {"event": "start", "meta": meta, "models": models, "shard_size": shard_size,
+                           "samples": samples, "question_ids": question_ids})
+
+
+def record_shard(root: str, run_id: str, model: str, shard: int, content: str, error: Optional[str],
+                 timestamp: str, seconds: float, samples=(0,)):
+    """Record one finished model call, answering shard for each of samples; failed if error is set."""
+    _append(root, run_id, {
+        "event": "shard", "model": model, "shard": shard, "samples": list(samples),
+        "status": FAILED if error else OK,
+        "content": content, "content_hash": content_hash(content),
+        "error": error, "timestamp": timestamp, "seconds": seconds,
+    })
+
+
+def record_written(root: str, run_id: str, model: str, summary: Dict):
+    """Record that a model's answers are in the store (with its run summary entry)."""
+    _append(root, run_id, {"event": "written", "model": model, "summary": summary})
+
+
+def record_complete(root: str, run_id: str):
+    _append(root, run_id, {"event": "complete"})
+
+
+def is_complete(root: str, run_id: str) -> bool:
+    """Whether the run's journal ends with its complete entry."""
+    with open(journal_path(root, run_id), "rb") as f:
+        lines = f.read().split(b"\n")
+    # The last intact line; anything after the final newline is torn
+    last = next((line for line in reversed(lines[:-1]) if line.strip()), None)
+    try:
+        return last is not None and json.loads(last).get("event") == "complete"
+    except ValueError:
+        return False
+
+
+def remove_complete(root: str, dry_run: bool = False) -> list:
+    """
+    Delete the journals of complete runs.
+
+    Returns:
+        The journal files removed (or that would be, with dry_run)
+    """
+    directory = os.path.join(root, JOURNAL_DIR)
+    if not os.path.isdir(directory):
+        return []
+    removed = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl"):
+            continue
+        run_id = name[:-len(".jsonl")]
+        if is_complete(root, run_id):
+            if not dry_run:
+                os.remove(journal_path(root, run_id))
+            removed.append(journal_path(root, run_id))
+    return removed
+
+
+def load(root: str, run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Replay a run's journal (cutting off a torn final line, so appends can follow).
+
+    Returns:
+        None if the run has no journal, else a dict with the start entry's
+        meta / models / shard_size / samples / question_ids, plus shards
+        ((model, sample, shard) -> latest intact shard entry), written
+        (model -> summary entry) and complete
+    """
+    path = journal_path(root, run_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+
+    complete = data.rfind(b"\n") + 1
+    if complete < len(data):
+        with _lock, open(path, "r+b") as f:
+            f.truncate(complete)
+
+    state = {"meta": None, "models": [], "shard_size": None, "samples": 1, "question_ids": [],
+             "shards": {}, "written": {}, "complete": False}
+    for line in data[:complete].splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        event = entry.get("event")
+        if event == "start":
+            for key in ("meta", "models", "shard_size", "question_ids"):
+                state[key] = entry.get(key)
+            state["samples"] = entry.get("samples") or 1
+        elif event == "shard":
+            if content_hash(entry.get("content") or "") != entry.get("content_hash"):
+                continue
+            for sample in entry.get("samples", [0]):
+                state["shards"][(entry["model"], sample, entry["shard"])] = entry
+        elif event == "written":
+            state["written"][entry["model"]] = entry.get("summary")
+        elif event == "complete":
+            state["complete"] = True
+    if state["meta"] is None:
+        raise ValueError(f"Journal {path} has no start entry")
+    return state
@@ -0,0 +1,443 @@
+"""
+Columnar store for compass runs (Parquet, partitioned by date and model).
+
+Layout under the store root (data/runs by default):
+
+  answers/date=YYYY-MM-DD/model=<model>/<run_id>.parquet
+      run_id, question_id, raw_answer, parsed_score (int8, null = unparsed),
+      timestamp; run_id and question_id are dictionary-encoded
+  runs/date=YYYY-MM-DD/model=<model>/<run_id>.parquet
+      one row per (run, model): created_at, run_timestamp, parsed_fraction,
+      question_bank, question_bank_version, n_questions, n_samples, models
+      and params (JSON), raw_response_preview
+  samples/date=YYYY-MM-DD/model=<model>/<run_id>.parquet
+      multi-sample runs only: one row per sample with its answers as an int8
+      list in question order (null = unparsed); the question ids are in the
+      file's metadata. read_samples() returns them as an int8 matrix. The
+      answers rows of such a run hold each question's majority answer.
+  questions.parquet
+      side table of (question_bank, question_id, question_text), so the text
+      isn't repeated in every answer row
+  summaries/<run_id>.json
+      run summary written by tools/run_models (per-model wall time, shards,
+      errors)
+  journal/<run_id>.jsonl
+      run journal for resuming a run (backend/run_journal.py); not committed
+
+Writers are append-only: append_run() writes one new file per (run, model)
+in each dataset (rewriting the same run replaces its files) and adds unseen
+questions to the side table. Files are written to a dot-prefixed temporary
+name, which dataset discovery ignores, and renamed into place.
+
+Readers scan a whole dataset as one pyarrow.dataset with the filters pushed
+down: model and date prune partition directories, run_id is checked against
+row-group statistics. The date partition is the run's UTC start date.
+"""
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+from . import run_journal
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = ds = pq = None
+
+DEFAULT_ROOT = 'data/runs'
+
+ANSWERS = 'answers'
+RUNS = 'runs'
+SAMPLES = 'samples'
+QUESTIONS_FILE = 'questions.parquet'
+SUMMARIES = 'summaries'
+
+# Unparsed answer in an int8 sample matrix
+MISSING_SCORE = -128
+
+# Serializes side-table updates between writers in one process
+_questions_lock = threading.Lock()
+
+
+def _require_arrow():
+    if pa is None:
+        raise RuntimeError("The run store requires pyarrow (pip install pyarrow)")
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([('date', pa.string()), ('model', pa.string())]), flavor='hive')
+
+
+def answers_schema():
+    _require_arrow()
+    return pa.schema([
+        ('run_id', pa.dictionary(pa.int32(), pa.string())),
+        ('question_id', pa.dictionary(pa.int32(), pa.string())),
+        ('raw_answer', pa.string()),
+        ('parsed_score', pa.int8()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+def runs_schema():
+    _require_arrow()
+    return pa.schema([
+        ('run_id', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('run_timestamp', pa.timestamp('us', tz='UTC')),
+        ('parsed_fraction', pa.float64()),
+        ('question_bank', pa.string()),
+        ('question_bank_version', pa.string()),
+        ('n_questions', pa.int32()),
+        ('n_samples', pa.int32()),
+        ('models', pa.string()),
+        ('params', pa.string()),
+        ('raw_response_preview', pa.string()),
+    ])
+
+
+def samples_schema():
+    _require_arrow()
+    return pa.schema([
+        ('run_id', pa.string()),
+        ('sample', pa.int32()),
+        ('scores', pa.list_(pa.int8())),
+    ])
+
+
+def questions_schema():
+    _require_arrow()
+    return pa.schema([
+        ('question_bank', pa.string()),
+        ('question_id', pa.string()),
+        ('question_text', pa.string()),
+    ])
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """ISO string (or datetime) to an aware UTC datetime; None if unparseable."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        ts = value
+    else:
+        try:
+            ts = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def run_date(run_id: str, fallback=None) -> str:
+    """Partition date of a run: from run_YYYYmmddTHHMMSSZ_<id>, else from fallback."""
+    try:
+        return datetime.strptime(run_id.split('_')[1], "%Y%m%dT%H%M%SZ").date().isoformat()
+    except (IndexError, ValueError):
+        ts = parse_timestamp(fallback) or datetime.now(timezone.utc)
+        return ts.date().isoformat()
+
+
+def _partition_dir(root: str, dataset: str, day: str, model: str) -> str:
+    # Model names may contain '/'; hive partition values are URI-encoded
+    return os.path.join(root, dataset, f"date={day}", f"model={quote(model, safe='')}")
+
+
+def _write_atomic(table, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _write_json_atomic(data, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, indent=2)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _score(value) -> Optional[int]:
+    if value in (None, '', 'None'):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def append_run(root: str, run_id: str, model: str, answers: List[Dict], meta: Dict,
+               questions: List[Dict] = None, samples=None) -> str:
+    """
+    Write one model's answers and meta for a run.
+
+    Args:
+        answers: Dicts with question_id, raw_answer, parsed_score ('' or None
+            if unparsed) and timestamp
+        meta: Run meta: created_at, run_timestamp, parsed_fraction,
+            question_bank, question_bank_version, n_questions, models, params,
+            raw_response_preview (missing keys are stored as null)
+        questions: Question bank entries ({id, text}) to add to the side table
+        samples: Optional (question_ids, matrix) of a multi-sample run: an
+            n_samples x questions int8 matrix, MISSING_SCORE where unparsed
+
+    Returns:
+        Path of the answers file
+    """
+    _require_arrow()
+    day = run_date(run_id, meta.get('run_timestamp') or meta.get('created_at'))
+    filename = f"{run_id}.parquet"
+
+    answer_table = pa.table({
+        'run_id': [run_id] * len(answers),
+        'question_id': [a['question_id'] for a in answers],
+        'raw_answer': [a.get('raw_answer') for a in answers],
+        'parsed_score': [_score(a.get('parsed_score')) for a in answers],
+        'timestamp': [parse_timestamp(a.get('timestamp')) for a in answers],
+    }, schema=answers_schema())
+
+    def as_json(value):
+        return value if value is None or isinstance(value, str) else json.dumps(value)
+
+    n_questions, n_samples = meta.get('n_questions'), meta.get('n_samples')
+    run_table = pa.table({
+        'run_id': [run_id],
+        'created_at': [parse_timestamp(meta.get('created_at'))],
+        'run_timestamp': [parse_timestamp(meta.get('run_timestamp'))],
+        'parsed_fraction': [meta.get('parsed_fraction')],
+        'question_bank': [meta.get('question_bank')],
+        'question_bank_version': [meta.get('question_bank_version')],
+        'n_questions': [int(n_questions) if n_questions is not None else None],
+        'n_samples': [int(n_samples) if n_samples is not None else None],
+        'models': [as_json(meta.get('models'))],
+        'params': [as_json(meta.get('params'))],
+        'raw_response_preview': [meta.get('raw_response_preview')],
+    }, schema=runs_schema())
+
+    if questions:
+        add_questions(root, meta.get('question_bank'), questions)
+    answers_path = os.path.join(_partition_dir(root, ANSWERS, day, model), filename)
+    _write_atomic(answer_table, answers_path)
+    if samples is not None:
+        _write_atomic(_samples_table(run_id, *samples), os.path.join(_partition_dir(root, SAMPLES, day, model), filename))
+    # The runs row last: a run listed in runs always has its answers
+    _write_atomic(run_table, os.path.join(_partition_dir(root, RUNS, day, model), filename))
+    return answers_path
+
+
+def _samples_table(run_id: str, question_ids: List[str], matrix):
+    matrix = np.asarray(matrix, dtype=np.int8)
+    n_samples, n_questions = matrix.shape
+    flat = matrix.ravel()
+    values = pa.array(flat, type=pa.int8(), mask=flat == MISSING_SCORE)
+    offsets = pa.array(np.arange(n_samples + 1, dtype=np.int32) * n_questions)
+    table = pa.table({
+        'run_id': [run_id] * n_samples,
+        'sample': np.arange(n_samples, dtype=np.int32),
+        'scores': pa.ListArray.from_arrays(offsets, values),
+    }, schema=samples_schema())
+    return table.replace_schema_metadata({'question_ids': json.dumps(list(question_ids))})
+
+
+def read_samples(root: str, run_id: str, model: str):
+    """
+    Every sample of a multi-sample run for one model.
+
+    Returns:
+        (question_ids, matrix): matrix is n_samples x questions int8 with
+        MISSING_SCORE where unparsed; None if the run has no samples file
+    """
+    _require_arrow()
+    day = run_date(run_id)
+    path = os.path.join(_partition_dir(root, SAMPLES, day, model), f"{run_id}.parquet")
+    if not os.path.exists(path):
+        return None
+    table = pq.read_table(path)
+    question_ids = json.loads(table.schema.metadata[b'question_ids'])
+    scores = table.sort_by('sample').column('scores').combine_chunks()
+    values = pc.fill_null(scores.flatten(), MISSING_SCORE).to_numpy(zero_copy_only=False)
+    return question_ids, values.astype(np.int8).reshape(len(table), len(question_ids))
+
+
+def write_summary(root: str, run_id: str, summary: Dict) -> str:
+    """Atomically write (or replace) a run's summary JSON; returns its path."""
+    path = os.path.join(root, SUMMARIES, f"{run_id}.json")
+    _write_json_atomic(summary, path)
+    return path
+
+
+def read_summary(root: str, run_id: str) -> Optional[Dict]:
+    """A run's summary, or None if it has none."""
+    path = os.path.join(root, SUMMARIES, f"{run_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def add_questions(root: str, question_bank: Optional[str], questions: Iterable[Dict]) -> int:
+    """
+    Add (question_bank, id, text) rows not yet in the side table.
+
+    Returns:
+        Number of rows added
+    """
+    _require_arrow()
+    path = os.path.join(root, QUESTIONS_FILE)
+    with _questions_lock:
+        existing = read_questions(root)
+        seen = set(zip(existing.column('question_bank').to_pylist(), existing.column('question_id').to_pylist()))
+        new = {}
+        for q in questions:
+            key = (question_bank, q.get('id'))
+            if key not in seen and key not in new:
+                new[key] = q.get('text')
+        if not new:
+            return 0
+        added = pa.table({
+            'question_bank': [bank for bank, _ in new],
+            'question_id': [qid for _, qid in new],
+            'question_text': list(new.values()),
+        }, schema=questions_schema())
+        _write_atomic(pa.concat_tables([existing, added]), path)
+    return len(new)
+
+
+def read_questions(root: str = DEFAULT_ROOT):
+    """The question side table (empty if nothing was written yet)."""
+    _require_arrow()
+    path = os.path.join(root, QUESTIONS_FILE)
+    if not os.path.exists(path):
+        return questions_schema().empty_table()
+    return pq.read_table(path, schema=questions_schema())
+
+
+def _as_day(value) -> str:
+    return value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+
+
+def run_filter(models: Iterable[str] = None, run_ids: Iterable[str] = None, since=None, until=None):
+    """
+    Dataset filter expression (None = everything).
+
+    Args:
+        models: Keep these models
+        run_ids: Keep these runs
+        since, until: Inclusive range of run dates (date or 'YYYY-MM-DD')
+    """
+    _require_arrow()
+    conditions = []
+    if models is not None:
+        conditions.append(ds.field('model').isin(list(models)))
+    if run_ids is not None:
+        conditions.append(ds.field('run_id').isin(list(run_ids)))
+    if since is not None:
+        conditions.append(ds.field('date') >= _as_day(since))
+    if until is not None:
+        conditions.append(ds.field('date') <= _as_day(until))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _dataset(root: str, name: str, schema):
+    path = os.path.join(root, name)
+    if not os.path.isdir(path):
+        return None
+    full_schema = schema.append(pa.field('date', pa.string())).append(pa.field('model', pa.string()))
+    return ds.dataset(path, format='parquet', partitioning=_partitioning(), schema=full_schema)
+
+
+def _scan(root, name, schema, columns, **filters):
+    _require_arrow()
+    dataset = _dataset(root, name, schema)
+    if dataset is None:
+        names = columns or schema.names + ['date', 'model']
+        full = schema.append(pa.field('date', pa.string())).append(pa.field('model', pa.string()))
+        return pa.schema([full.field(n) for n in names]).empty_table()
+    return dataset.to_table(columns=columns, filter=run_filter(**filters))
+
+
+def read_answers(root: str = DEFAULT_ROOT, columns: List[str] = None, models=None, run_ids=None,
+                 since=None, until=None):
+    """
+    Scan answers as one pyarrow Table (columns of answers_schema plus date and model).
+
+    Filters are pushed down to partitions and row groups; see run_filter.
+    """
+    return _scan(root, ANSWERS, answers_schema(), columns,
+                 models=models, run_ids=run_ids, since=since, until=until)
+
+
+def read_runs(root: str = DEFAULT_ROOT, columns: List[str] = None, models=None, run_ids=None,
+              since=None, until=None):
+    """Scan run meta rows (one per run and model) as one pyarrow Table."""
+    return _scan(root, RUNS, runs_schema(), columns,
+                 models=models, run_ids=run_ids, since=since, until=until)
+
+
+def partition_dates(root: str = DEFAULT_ROOT) -> List[str]:
+    """Run dates present in the store, oldest first."""
+    dates = set()
+    for name in (ANSWERS, RUNS, SAMPLES):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            dates.update(d.split('=', 1)[1] for d in os.listdir(path) if d.startswith('date='))
+    return sorted(dates)
+
+
+def remove_before(root: str, cutoff, dry_run: bool = False) -> List[str]:
+    """
+    Drop every date partition older than cutoff (a date or 'YYYY-MM-DD'),
+    and the summaries and journals of runs from before it.
+
+    Returns:
+        The partition directories and files removed (or that would be, with dry_run)
+    """
+    cutoff = _as_day(cutoff)
+    removed = []
+    for day in partition_dates(root):
+        if day >= cutoff:
+            continue
+        for name in (RUNS, SAMPLES, ANSWERS):
+            path = os.path.join(root, name, f"date={day}")
+            if os.path.isdir(path):
+                if not dry_run:
+                    shutil.rmtree(path)
+                removed.append(path)
+
+    for name, ext in ((SUMMARIES, '.json'), (run_journal.JOURNAL_DIR, '.jsonl')):
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(ext):
+                continue
+            path = os.path.join(directory, filename)
+            # Runs without a dated id fall back to the file's age
+            mtime = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+            if run_date(filename[:-len(ext)], mtime) < cutoff:
+                if not dry_run:
+                    os.remove(path)
+                removed.append(path)
+    return removed
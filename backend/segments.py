@@ -0,0 +1,150 @@
+"""
+Per-segment Elo leaderboards.
+
+Battle prompts and debate topics are different tasks, and a model that wins
+debates about the economy may lose battles about health. Besides the global
+elo_ratings row, every vote also updates the model's Elo in its segments:
+
+  - the mode:            "battle" or "debate"
+  - mode and topic:      e.g. "debate:economy"
+
+The topic category is sent by the client (e.g. from the question source) or
+derived from the prompt / debate topic by keyword (see topic_category).
+Ratings live in the segment_elo_ratings table keyed by (segment, model_name)
+and are updated with a single upsert per vote. Boards are cached per
+process; votes recorded by this process update the cache in place.
+
+Environment variables:
+  - SEGMENT_RATINGS_MAX_STALENESS: seconds a cached board is served before
+    it is reloaded (default 30)
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+MODES = ('battle', 'debate')
+
+TOPIC_KEYWORDS = {
+    'economy': {'economy', 'economic', 'economics', 'tax', 'taxes', 'market', 'markets', 'trade',
+                'wage', 'wages', 'inflation', 'budget', 'welfare', 'jobs', 'income', 'wealth',
+                'capitalism', 'socialism', 'regulation'},
+    'social': {'abortion', 'marriage', 'religion', 'religious', 'immigration', 'gender', 'family',
+               'drugs', 'gun', 'guns', 'crime', 'race', 'equality', 'lgbt', 'freedom', 'values'},
+    'politics': {'government', 'election', 'elections', 'democracy', 'voting', 'president',
+                 'congress', 'parliament', 'policy', 'law', 'laws', 'constitution', 'military', 'war'},
+    'technology': {'ai', 'technology', 'tech', 'internet', 'privacy', 'data', 'software',
+                   'robots', 'automation', 'social media', 'crypto'},
+    'science': {'science', 'scientific', 'climate', 'energy', 'space', 'nuclear', 'research',
+                'environment', 'evolution', 'physics'},
+    'health': {'health', 'healthcare', 'medical', 'medicine', 'vaccine', 'vaccines', 'disease',
+               'hospital', 'insurance', 'mental'},
+    'education': {'school', 'schools', 'education', 'university', 'college', 'students',
+                  'teachers', 'homework'},
+}
+
+TOPIC_CATEGORIES = tuple(TOPIC_KEYWORDS)
+
+MAX_STALENESS_SECONDS = float(os.getenv("SEGMENT_RATINGS_MAX_STALENESS", "30"))
+
+_WORD = re.compile(r"[a-z]+")
+
+_lock = threading.Lock()
+
+# segment -> (loaded_at, board)
+_cache: Dict[str, Tuple[float, Dict[str, Dict]]] = {}
+
+
+def topic_category(text: Optional[str]) -> Optional[str]:
+    """
+    Guess the topic category of a prompt or debate topic by keyword.
+
+    Returns:
+        The category with the most keyword hits (ties go to the first in
+        TOPIC_KEYWORDS), or None if nothing matches
+    """
+    if not text:
+        return None
+    lowered = text.lower()
+    words = set(_WORD.findall(lowered))
+    best, best_hits = None, 0
+    for category, keywords in TOPIC_KEYWORDS.items():
+        hits = sum(1 for k in keywords if (k in lowered if ' ' in k else k in words))
+        if hits > best_hits:
+            best, best_hits = category, hits
+    return best
+
+
+def vote_segments(mode: str, category: Optional[str] = None, text: Optional[str] = None) -> List[str]:
+    """
+    Segments a vote counts toward.
+
+    Args:
+        mode: 'battle' or 'debate'
+        category: Topic category; derived from text when not given
+        text: Prompt or debate topic
+
+    Returns:
+        [mode] or [mode, "mode:category"]
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    if category is None:
+        category = topic_category(text)
+    elif category not in TOPIC_KEYWORDS:
+        raise ValueError(f"topic_category must be one of: {', '.join(TOPIC_CATEGORIES)}")
+    return [mode] if category is None else [mode, f"{mode}:{category}"]
+
+
+def validate_segment(segment: str):
+    """Raise ValueError unless segment is "mode" or "mode:category"."""
+    mode, _, category = segment.partition(':')
+    if mode not in MODES or (category and category not in TOPIC_KEYWORDS):
+        raise ValueError(
+            f"segment must be a mode ({', '.join(MODES)}), optionally followed by "
+            f"':' and a topic category ({', '.join(TOPIC_CATEGORIES)})"
+        )
+
+
+def _sorted(board: Dict[str, Dict]) -> Dict[str, Dict]:
+    return dict(sorted(board.items(), key=lambda item: item[1]['rating'], reverse=True))
+
+
+def get_cached(segment: str, max_staleness: float = None) -> Optional[Dict[str, Dict]]:
+    """Return a cached board if it was loaded less than max_staleness seconds ago."""
+    if max_staleness is None:
+        max_staleness = MAX_STALENESS_SECONDS
+    with _lock:
+        entry = _cache.get(segment)
+    if entry is None or (time.monotonic() - entry[0]) > max_staleness:
+        return None
+    return entry[1]
+
+
+def store(segment: str, board: Dict[str, Dict]):
+    with _lock:
+        _cache[segment] = (time.monotonic(), board)
+
+
+def apply_updates(rows: List[Dict]):
+    """
+    Apply post-vote rows (segment, model_name, rating, wins, losses) to the
+    cached boards. Segments that aren't cached are left to load on first read.
+    """
+    with _lock:
+        touched = {}
+        for row in rows:
+            entry = _cache.get(row['segment'])
+            if entry is None:
+                continue
+            board = touched.setdefault(row['segment'], dict(entry[1]))
+            board[row['model_name']] = {
+                'rating': round(float(row['rating']), 2),
+                'wins': int(row['wins']),
+                'losses': int(row['losses']),
+            }
+        for segment, board in touched.items():
+            # Keep the load time: the staleness bound is for other workers' votes
+            _cache[segment] = (_cache[segment][0], _sorted(board))
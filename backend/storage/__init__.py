@@ -0,0 +1,42 @@
+"""
+Storage backends for ratings, vote tags and dimension scores.
+
+The backend is chosen by URL scheme:
+  - postgres:// or postgresql://  -> PostgresStorage (psycopg2, e.g. Supabase)
+  - sqlite:///path/to/file.db      -> SQLiteStorage (embedded, WAL mode)
+
+Both run the same SQL plans from backend/storage/queries.py, either
+blocking (open_storage) or on an async pool (open_async_storage).
+"""
+
+from .base import SQLStorage
+from .aio import AsyncSQLStorage
+
+
+def _scheme(url: str) -> str:
+    return url.split("://", 1)[0].lower() if "://" in url else ""
+
+
+def open_storage(url: str) -> SQLStorage:
+    """Create the storage backend for a database URL."""
+    scheme = _scheme(url)
+    if scheme in ("postgres", "postgresql"):
+        # Imported lazily so SQLite-only setups don't need psycopg2
+        from .postgres import PostgresStorage
+        return PostgresStorage(url)
+    if scheme == "sqlite":
+        from .sqlite import SQLiteStorage
+        return SQLiteStorage(url)
+    raise ValueError(f"Unsupported database URL scheme: {scheme or url!r} (expected postgresql:// or sqlite:///)")
+
+
+def open_async_storage(url: str) -> AsyncSQLStorage:
+    """Create the async storage backend for a database URL (the pool opens on first use)."""
+    scheme = _scheme(url)
+    if scheme in ("postgres", "postgresql"):
+        from .aio import AsyncPostgresStorage
+        return AsyncPostgresStorage(url)
+    if scheme == "sqlite":
+        from .aio import AsyncSQLiteStorage
+        return AsyncSQLiteStorage(url)
+    raise ValueError(f"Unsupported database URL scheme: {scheme or url!r} (expected postgresql:// or sqlite:///)")
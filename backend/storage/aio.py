@@ -0,0 +1,422 @@
+"""
+Async storage backends for the FastAPI handlers.
+
+AsyncSQLStorage runs the same plans from backend/storage/queries.py as the
+blocking SQLStorage, but on an async connection pool, so handlers never
+tie up a worker thread while waiting on the database:
+  - AsyncPostgresStorage: psycopg 3 AsyncConnectionPool
+  - AsyncSQLiteStorage: a small pool of aiosqlite connections (WAL mode)
+
+Environment variables:
+  - DB_POOL_MIN_SIZE: connections kept open (default 1)
+  - DB_POOL_MAX_SIZE: maximum pooled connections (default 10)
+"""
+
+import asyncio
+import math
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from . import effects, queries
+from .base import exists_check, row_dict
+from .sqlite import column_exists_sql as sqlite_column_exists_sql
+from .sqlite import date_trunc, prepare_sql, sqlite_path, table_exists_sql as sqlite_table_exists_sql
+from .. import leaderboards, matchmaking, tag_cube, tags as tag_weights, windowed
+from .. import segments as segment_boards
+from ..tags import DEFAULT_WEIGHT_VERSION, DIMENSIONS
+
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+
+class AsyncSQLStorage:
+    """Storage operations on an async connection pool."""
+
+    def __init__(self, url: str, min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE):
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self._opened = False
+        self._open_lock = asyncio.Lock()
+        self._ready = set()
+        self._ready_lock = asyncio.Lock()
+
+    # ---------- driver hooks ----------
+
+    async def _open_pool(self):
+        raise NotImplementedError
+
+    async def close(self):
+        """Close every pooled connection."""
+        raise NotImplementedError
+
+    async def run(self, plan, write: bool = False):
+        """Run a plan from backend/storage/queries.py in one transaction and return its result."""
+        raise NotImplementedError
+
+    def prepare(self, sql: str) -> str:
+        return sql
+
+    def table_exists_statement(self, table: str) -> queries.Statement:
+        raise NotImplementedError
+
+    def column_exists_statement(self, table: str, column: str) -> queries.Statement:
+        raise NotImplementedError
+
+    # ---------- plan runner ----------
+
+    async def open(self):
+        if self._opened:
+            return
+        async with self._open_lock:
+            if not self._opened:
+                await self._open_pool()
+                self._opened = True
+
+    async def drive(self, plan, cursor):
+        try:
+            statement = next(plan)
+            while True:
+                statement = plan.send(await self._execute(cursor, statement))
+        except StopIteration as done:
+            return done.value
+
+    async def _execute(self, cursor, statement):
+        check = exists_check(self, statement)
+        if check is not None:
+            await cursor.execute(self.prepare(check.sql), check.params)
+            return (await cursor.fetchone()) is not None
+
+        sql = self.prepare(statement.sql)
+        if statement.many:
+            if statement.params:
+                await cursor.executemany(sql, statement.params)
+            return cursor.rowcount
+
+        await cursor.execute(sql, statement.params)
+        if statement.fetch == 'one':
+            row = await cursor.fetchone()
+            return row_dict(cursor, row) if row is not None else None
+        if statement.fetch == 'all':
+            return [row_dict(cursor, row) for row in await cursor.fetchall()]
+        return cursor.rowcount
+
+    async def _ensure(self, key: str, plan_factory):
+        """Run a table-creation plan once per process."""
+        if key in self._ready:
+            return
+        async with self._ready_lock:
+            if key not in self._ready:
+                await self.run(plan_factory(), write=True)
+                self._ready.add(key)
+
+    # ---------- ratings ----------
+
+    async def ensure_table_exists(self):
+        await self._ensure('elo_ratings', queries.ensure_ratings_table)
+        await self._ensure('votes', queries.ensure_votes_table)
+        await self._ensure('vote_pair_daily', queries.ensure_vote_pair_daily_table)
+        await self._ensure('segment_elo_ratings', queries.ensure_segment_ratings_table)
+
+    async def get_rating(self, model: str) -> float:
+        await self.ensure_table_exists()
+        return await self.run(queries.get_rating(model))
+
+    async def update_ratings(self, winner_model: str, loser_model: str, k_factor: int = 32,
+                             segments: List[str] = None) -> tuple:
+        await self.ensure_table_exists()
+        ratings, segment_rows = await self.run(
+            queries.record_vote(winner_model, loser_model, k_factor, segments or ()), write=True
+        )
+        effects.vote_recorded(winner_model, loser_model, ratings, segment_rows)
+        return ratings
+
+    async def get_all_ratings(self) -> Dict[str, Dict]:
+        await self.ensure_table_exists()
+        return await self.run(queries.get_all_ratings())
+
+    # ---------- vote tags ----------
+
+    async def ensure_tag_rollup_tables_exist(self):
+        await self._ensure('vote_tags', queries.ensure_tags_table)
+        await self._ensure('vote_tag_rollups', queries.ensure_tag_rollup_tables)
+        await self._ensure('tag_cooccurrence', queries.ensure_tag_cooccurrence_tables)
+
+    async def store_vote_tags(self, winner_model: str, loser_model: str, tags: List[str],
+                              tag_categories: Dict[str, str] = None) -> bool:
+        await self.ensure_tag_rollup_tables_exist()
+        stored = await self.run(
+            queries.store_vote_tags(winner_model, loser_model, tags, tag_categories),
+            write=True
+        )
+        effects.tags_recorded(winner_model, loser_model, tags)
+        return stored
+
+    async def get_tag_distribution(self, model: str, role: str = 'winner', start: datetime = None,
+                                   end: datetime = None) -> Dict[str, float]:
+        effects.check_tag_role(role)
+        await self.ensure_tag_rollup_tables_exist()
+        return await self.run(queries.get_tag_distribution(model, role, start, end))
+
+    async def get_tag_time_series(self, model: str, role: str = 'winner', start: datetime = None,
+                                  end: datetime = None, granularity: str = 'day',
+                                  tag_name: str = None) -> List[Dict]:
+        effects.check_tag_role(role)
+        effects.check_granularity(granularity)
+        await self.ensure_tag_rollup_tables_exist()
+        return await self.run(queries.get_tag_time_series(model, role, start, end, granularity, tag_name))
+
+    async def refresh_tag_cube(self):
+        await self.ensure_tag_rollup_tables_exist()
+        tag_cube.load(*await self.run(queries.get_tag_cube_rows()))
+
+    async def get_tag_cooccurrence(self, tag: str = None, model: str = None, role: str = 'winner',
+                                   sort: str = 'count', limit: int = 10, min_count: int = 1) -> Dict:
+        effects.check_cooccurrence(tag, role, sort)
+        if tag_cube.is_stale():
+            await self.refresh_tag_cube()
+        if tag is None:
+            return tag_cube.top_pairs(model, role, sort, limit, min_count)
+        return tag_cube.cooccurrence(tag, model, role, sort, limit, min_count)
+
+    async def get_tag_heatmap(self, role: str = 'winner', metric: str = 'rate', min_votes: int = 1) -> Dict:
+        effects.check_heatmap(role, metric)
+        if tag_cube.is_stale():
+            await self.refresh_tag_cube()
+        return tag_cube.heatmap(role, metric, min_votes)
+
+    # ---------- dimension scores ----------
+
+    async def ensure_dimension_rollups_table_exists(self):
+        await self._ensure('vote_tags', queries.ensure_tags_table)
+        await self._ensure('vote_dimension_scores', queries.ensure_vote_dimension_scores_table)
+        await self._ensure('model_dimension_rollups', queries.ensure_dimension_rollups_table)
+        await self._ensure('dimension_weight_versions', queries.ensure_dimension_weight_versions_table)
+
+    async def refresh_dimension_weights(self) -> tag_weights.WeightSet:
+        """Switch tags' active weights to the latest activated version once they are stale."""
+        if tag_weights.weights_stale():
+            await self.ensure_dimension_rollups_table_exists()
+            active = await self.run(queries.get_active_weight_version())
+            if active is not None:
+                tag_weights.set_active_weights(active['version'], active['weights'])
+        return tag_weights.active_weights()
+
+    async def list_weight_versions(self) -> List[Dict]:
+        await self.ensure_dimension_rollups_table_exists()
+        return await self.run(queries.list_weight_versions())
+
+    async def store_dimension_scores(self, winner_model: str, loser_model: str,
+                                     winner_scores: Dict[str, float],
+                                     loser_scores: Dict[str, float],
+                                     weight_version: int = DEFAULT_WEIGHT_VERSION) -> bool:
+        await self.ensure_dimension_rollups_table_exists()
+        winner_values = queries.dimension_values(winner_scores)
+        loser_values = queries.dimension_values(loser_scores)
+        await self.run(
+            queries.store_dimension_scores(winner_model, loser_model, winner_values, loser_values,
+                                           weight_version),
+            write=True
+        )
+        effects.dimension_scores_recorded(winner_model, loser_model, winner_values, loser_values)
+        return True
+
+    async def record_vote_with_tags(self, winner_model: str, loser_model: str, tags: List[str],
+                                    tag_categories: Dict[str, str],
+                                    winner_scores: Dict[str, float], loser_scores: Dict[str, float],
+                                    k_factor: int = 32, segments: List[str] = None,
+                                    weight_version: int = DEFAULT_WEIGHT_VERSION) -> tuple:
+        await self.ensure_table_exists()
+        await self.ensure_tag_rollup_tables_exist()
+        await self.ensure_dimension_rollups_table_exists()
+        winner_values = queries.dimension_values(winner_scores)
+        loser_values = queries.dimension_values(loser_scores)
+        ratings, segment_rows = await self.run(queries.record_vote_with_tags(
+            winner_model, loser_model, tags, tag_categories, winner_values, loser_values,
+            k_factor, segments or (), weight_version
+        ), write=True)
+        effects.tagged_vote_recorded(winner_model, loser_model, ratings, segment_rows,
+                                     tags, winner_values, loser_values)
+        return ratings
+
+    async def get_aggregated_dimension_scores(self, model_name: str = None, confidence: float = 0.95) -> Dict:
+        await self.ensure_dimension_rollups_table_exists()
+        return await self.run(queries.get_aggregated_dimension_scores(model_name, confidence))
+
+    async def refresh_dimension_leaderboards(self):
+        await self.ensure_dimension_rollups_table_exists()
+        leaderboards.load(await self.run(queries.get_dimension_rollup_rows()))
+
+    async def get_dimension_leaderboard(self, dimension: str, limit: int = 10, min_votes: int = 1) -> List[Dict]:
+        if dimension not in DIMENSIONS:
+            return []
+        if leaderboards.is_stale():
+            await self.refresh_dimension_leaderboards()
+        return leaderboards.get_leaderboard(dimension, limit=limit, min_votes=min_votes)
+
+    # ---------- Bradley-Terry ratings ----------
+
+    async def get_bt_ratings(self) -> Dict[str, Dict]:
+        await self._ensure('bt_ratings', queries.ensure_bt_ratings_table)
+        return await self.run(queries.get_bt_ratings())
+
+    # ---------- Glicko-2 ratings ----------
+
+    async def get_glicko_ratings(self) -> Dict[str, Dict]:
+        await self._ensure('glicko_ratings', queries.ensure_glicko_ratings_table)
+        return await self.run(queries.get_glicko_ratings())
+
+    # ---------- windowed and decayed leaderboards ----------
+
+    async def get_windowed_ratings(self, days: int) -> Dict[str, Dict]:
+        effects.check_window(days)
+        board = windowed.get_cached('window', days)
+        if board is None:
+            await self.ensure_table_exists()
+            pair_counts = await self.run(queries.get_window_pair_counts(windowed.window_start(days)))
+            board = windowed.windowed_board(pair_counts)
+            windowed.store('window', days, board)
+        return board
+
+    async def get_decayed_ratings(self, half_life_days: float) -> Dict[str, Dict]:
+        effects.check_half_life(half_life_days)
+        half_life_days = windowed.quantize_half_life(half_life_days)
+        board = windowed.get_cached('decay', half_life_days)
+        if board is None:
+            await self.ensure_table_exists()
+            daily_counts = await self.run(queries.get_daily_pair_counts(windowed.decay_start(half_life_days)))
+            board = windowed.decayed_board(daily_counts, half_life_days)
+            windowed.store('decay', half_life_days, board)
+        return board
+
+    # ---------- per-segment Elo ----------
+
+    async def get_segment_ratings(self, segment: str) -> Dict[str, Dict]:
+        segment_boards.validate_segment(segment)
+        board = segment_boards.get_cached(segment)
+        if board is None:
+            await self.ensure_table_exists()
+            board = await self.run(queries.get_segment_ratings(segment))
+            segment_boards.store(segment, board)
+        return board
+
+    async def get_segment_summary(self) -> Dict[str, Dict]:
+        await self.ensure_table_exists()
+        return await self.run(queries.get_segment_summary())
+
+    # ---------- matchmaking ----------
+
+    async def get_matchmaking_pair(self) -> Optional[Dict]:
+        if matchmaking.is_stale():
+            await self.ensure_table_exists()
+            matchmaking.load(*await self.run(queries.get_matchmaking_state()))
+        return matchmaking.next_pair()
+
+
+class AsyncPostgresStorage(AsyncSQLStorage):
+    """Async storage on Postgres through a psycopg 3 connection pool."""
+
+    _pool = None
+
+    async def _open_pool(self):
+        from psycopg_pool import AsyncConnectionPool
+        from .postgres import connect_kwargs
+
+        self._pool = AsyncConnectionPool(
+            self.url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            kwargs=connect_kwargs(self.url),
+            open=False,
+        )
+        await self._pool.open()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+        self._opened = False
+
+    async def run(self, plan, write: bool = False):
+        await self.open()
+        # The pooled connection commits on success and rolls back on error
+        async with self._pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                return await self.drive(plan, cursor)
+
+    def table_exists_statement(self, table: str) -> queries.Statement:
+        from .postgres import table_exists_sql
+        return table_exists_sql(table)
+
+    def column_exists_statement(self, table: str, column: str) -> queries.Statement:
+        from .postgres import column_exists_sql
+        return column_exists_sql(table, column)
+
+
+class AsyncSQLiteStorage(AsyncSQLStorage):
+    """Async storage on SQLite through a pool of aiosqlite connections."""
+
+    def __init__(self, url: str, min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE):
+        super().__init__(url, min_size, max_size)
+        self.path = sqlite_path(url)
+        self._pool = None
+        self._connections = []
+
+    async def _open_pool(self):
+        import aiosqlite
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        # An in-memory database only exists on one connection
+        size = 1 if self.path == ":memory:" else self.max_size
+        self._pool = asyncio.Queue()
+        for _ in range(size):
+            conn = await aiosqlite.connect(
+                self.path,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                isolation_level=None,
+                timeout=30,
+            )
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.create_function("date_trunc", 2, date_trunc, deterministic=True)
+            await conn.create_function("power", 2, math.pow, deterministic=True)
+            await conn.create_function("floor", 1, math.floor, deterministic=True)
+            self._connections.append(conn)
+            self._pool.put_nowait(conn)
+
+    async def close(self):
+        for conn in self._connections:
+            await conn.close()
+        self._connections = []
+        self._opened = False
+
+    async def run(self, plan, write: bool = False):
+        await self.open()
+        conn = await self._pool.get()
+        try:
+            cursor = await conn.cursor()
+            try:
+                await cursor.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+                result = await self.drive(plan, cursor)
+                await conn.commit()
+                return result
+            except Exception:
+                await conn.rollback()
+                raise
+            finally:
+                await cursor.close()
+        finally:
+            self._pool.put_nowait(conn)
+
+    def prepare(self, sql: str) -> str:
+        return prepare_sql(sql)
+
+    def table_exists_statement(self, table: str) -> queries.Statement:
+        return sqlite_table_exists_sql(table)
+
+    def column_exists_statement(self, table: str, column: str) -> queries.Statement:
+        return sqlite_column_exists_sql(table, column)
+
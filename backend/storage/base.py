@@ -0,0 +1,389 @@
+"""
+Blocking storage backend shared by the Postgres and SQLite implementations.
+
+SQLStorage runs the plans in backend/storage/queries.py: it opens a
+connection, executes each yielded statement and sends the result back, then
+commits the whole plan as one transaction. Subclasses only supply
+connections and dialect tweaks. Argument checks and cache updates around a
+plan live in effects.py, shared with the async backends in aio.py.
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from . import effects, queries
+from .. import leaderboards, matchmaking, tag_cube, tags as tag_weights, windowed
+from .. import segments as segment_boards
+from ..tags import DEFAULT_WEIGHT_VERSION, DIMENSIONS
+
+
+def exists_check(storage, statement) -> Optional[queries.Statement]:
+    """The dialect's query for a TableExists / ColumnExists, None for an ordinary statement."""
+    if isinstance(statement, queries.TableExists):
+        return storage.table_exists_statement(statement.table)
+    if isinstance(statement, queries.ColumnExists):
+        return storage.column_exists_statement(statement.table, statement.column)
+    return None
+
+
+def row_dict(cursor, row) -> Dict:
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLStorage:
+    """Storage operations on a DB-API connection."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._ready = set()
+        self._ready_lock = threading.Lock()
+
+    # ---------- driver hooks ----------
+
+    def connect(self):
+        """Return a DB-API connection."""
+        raise NotImplementedError
+
+    def release(self, conn):
+        """Give a connection back once a plan has finished with it."""
+        conn.close()
+
+    def begin(self, cursor, write: bool):
+        """Start a transaction (DB-API drivers begin one implicitly)."""
+
+    def prepare(self, sql: str) -> str:
+        """Translate Postgres-flavoured SQL for this dialect."""
+        return sql
+
+    def table_exists_statement(self, table: str) -> queries.Statement:
+        raise NotImplementedError
+
+    def column_exists_statement(self, table: str, column: str) -> queries.Statement:
+        raise NotImplementedError
+
+    def lock_tables(self, cursor, tables: List[str]):
+        """
+        Keep other writers out of tables until the transaction ends. A no-op by
+        default: drivers whose write transactions are already exclusive need nothing.
+        """
+
+    def advisory_lock(self, cursor, key: int, shared: bool = False):
+        """
+        Hold an application-defined lock until the transaction ends. A no-op by
+        default: drivers whose write transactions are already exclusive need nothing.
+        """
+
+    def execute_many(self, cursor, sql: str, rows):
+        cursor.executemany(sql, rows)
+
+    def stream_cursor(self, conn):
+        """Return a cursor whose fetchmany() pulls rows from the database in chunks."""
+        return conn.cursor()
+
+    def copy_to_csv(self, cursor, sql: str, fileobj) -> bool:
+        """
+        Write the result of sql as CSV (with header) into a binary file object
+        using the driver's bulk COPY path. Returns False if the driver has none.
+        """
+        return False
+
+    def copy_rows(self, cursor, table: str, columns: List[str], rows):
+        """Bulk-load rows into table (drivers with a COPY path override this)."""
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        self.execute_many(cursor, self.prepare(sql), rows)
+
+    # ---------- plan runner ----------
+
+    @contextmanager
+    def transaction(self, write: bool = False):
+        """Yield a cursor inside one transaction; commits on success, rolls back on error."""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            self.begin(cursor, write)
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            self.release(conn)
+
+    def run(self, plan, write: bool = False):
+        """Run a plan from backend/storage/queries.py in one transaction and return its result."""
+        with self.transaction(write) as cursor:
+            return self.drive(plan, cursor)
+
+    def drive(self, plan, cursor):
+        """Run a plan on a cursor inside an open transaction and return its result."""
+        try:
+            statement = next(plan)
+            while True:
+                statement = plan.send(self._execute(cursor, statement))
+        except StopIteration as done:
+            return done.value
+
+    def _execute(self, cursor, statement):
+        check = exists_check(self, statement)
+        if check is not None:
+            cursor.execute(self.prepare(check.sql), check.params)
+            return cursor.fetchone() is not None
+
+        sql = self.prepare(statement.sql)
+        if statement.many:
+            if statement.params:
+                self.execute_many(cursor, sql, statement.params)
+            return cursor.rowcount
+
+        cursor.execute(sql, statement.params)
+        if statement.fetch == 'one':
+            row = cursor.fetchone()
+            return row_dict(cursor, row) if row is not None else None
+        if statement.fetch == 'all':
+            return [row_dict(cursor, row) for row in cursor.fetchall()]
+        return cursor.rowcount
+
+    def _ensure(self, key: str, plan_factory):
+        """Run a table-creation plan once per process."""
+        if key in self._ready:
+            return
+        with self._ready_lock:
+            if key not in self._ready:
+                self.run(plan_factory(), write=True)
+                self._ready.add(key)
+
+    # ---------- ratings ----------
+
+    def init_database(self):
+        count = self.run(queries.init_database(), write=True)
+        self._ready.add('elo_ratings')
+        return count
+
+    def ensure_table_exists(self):
+        self._ensure('elo_ratings', queries.ensure_ratings_table)
+        self._ensure('votes', queries.ensure_votes_table)
+        self._ensure('vote_pair_daily', queries.ensure_vote_pair_daily_table)
+        self._ensure('segment_elo_ratings', queries.ensure_segment_ratings_table)
+
+    def get_rating(self, model: str) -> float:
+        self.ensure_table_exists()
+        return self.run(queries.get_rating(model))
+
+    def update_ratings(self, winner_model: str, loser_model: str, k_factor: int = 32,
+                       segments: List[str] = None) -> tuple:
+        self.ensure_table_exists()
+        ratings, segment_rows = self.run(
+            queries.record_vote(winner_model, loser_model, k_factor, segments or ()), write=True
+        )
+        effects.vote_recorded(winner_model, loser_model, ratings, segment_rows)
+        return ratings
+
+    def get_all_ratings(self) -> Dict[str, Dict]:
+        self.ensure_table_exists()
+        return self.run(queries.get_all_ratings())
+
+    def reset_ratings(self):
+        self.ensure_table_exists()
+        self.run(queries.reset_ratings(), write=True)
+
+    # ---------- vote tags ----------
+
+    def ensure_tags_table_exists(self):
+        self._ensure('vote_tags', queries.ensure_tags_table)
+
+    def ensure_tag_rollup_tables_exist(self):
+        self.ensure_tags_table_exists()
+        self._ensure('vote_tag_rollups', queries.ensure_tag_rollup_tables)
+        self._ensure('tag_cooccurrence', queries.ensure_tag_cooccurrence_tables)
+
+    def store_vote_tags(self, winner_model: str, loser_model: str, tags: List[str],
+                        tag_categories: Dict[str, str] = None) -> bool:
+        self.ensure_tag_rollup_tables_exist()
+        stored = self.run(
+            queries.store_vote_tags(winner_model, loser_model, tags, tag_categories),
+            write=True
+        )
+        effects.tags_recorded(winner_model, loser_model, tags)
+        return stored
+
+    def get_tag_distribution(self, model: str, role: str = 'winner', start: datetime = None,
+                             end: datetime = None) -> Dict[str, float]:
+        effects.check_tag_role(role)
+        self.ensure_tag_rollup_tables_exist()
+        return self.run(queries.get_tag_distribution(model, role, start, end))
+
+    def get_tag_time_series(self, model: str, role: str = 'winner', start: datetime = None,
+                            end: datetime = None, granularity: str = 'day',
+                            tag_name: str = None) -> List[Dict]:
+        effects.check_tag_role(role)
+        effects.check_granularity(granularity)
+        self.ensure_tag_rollup_tables_exist()
+        return self.run(queries.get_tag_time_series(model, role, start, end, granularity, tag_name))
+
+    def refresh_tag_cube(self):
+        self.ensure_tag_rollup_tables_exist()
+        tag_cube.load(*self.run(queries.get_tag_cube_rows()))
+
+    def get_tag_cooccurrence(self, tag: str = None, model: str = None, role: str = 'winner',
+                               sort: str = 'count', limit: int = 10, min_count: int = 1) -> Dict:
+        effects.check_cooccurrence(tag, role, sort)
+        if tag_cube.is_stale():
+            self.refresh_tag_cube()
+        if tag is None:
+            return tag_cube.top_pairs(model, role, sort, limit, min_count)
+        return tag_cube.cooccurrence(tag, model, role, sort, limit, min_count)
+
+    def get_tag_heatmap(self, role: str = 'winner', metric: str = 'rate', min_votes: int = 1) -> Dict:
+        effects.check_heatmap(role, metric)
+        if tag_cube.is_stale():
+            self.refresh_tag_cube()
+        return tag_cube.heatmap(role, metric, min_votes)
+
+    # ---------- dimension scores ----------
+
+    def ensure_vote_dimension_scores_table_exists(self):
+        self._ensure('vote_dimension_scores', queries.ensure_vote_dimension_scores_table)
+
+    def ensure_dimension_rollups_table_exists(self):
+        self.ensure_tags_table_exists()
+        self.ensure_vote_dimension_scores_table_exists()
+        self._ensure('model_dimension_rollups', queries.ensure_dimension_rollups_table)
+        self._ensure('dimension_weight_versions', queries.ensure_dimension_weight_versions_table)
+
+    def refresh_dimension_weights(self) -> tag_weights.WeightSet:
+        """Switch tags' active weights to the latest activated version once they are stale."""
+        if tag_weights.weights_stale():
+            self.ensure_dimension_rollups_table_exists()
+            active = self.run(queries.get_active_weight_version())
+            if active is not None:
+                tag_weights.set_active_weights(active['version'], active['weights'])
+        return tag_weights.active_weights()
+
+    def list_weight_versions(self) -> List[Dict]:
+        self.ensure_dimension_rollups_table_exists()
+        return self.run(queries.list_weight_versions())
+
+    def store_dimension_scores(self, winner_model: str, loser_model: str,
+                               winner_scores: Dict[str, float],
+                               loser_scores: Dict[str, float],
+                               weight_version: int = DEFAULT_WEIGHT_VERSION) -> bool:
+        self.ensure_dimension_rollups_table_exists()
+        winner_values = queries.dimension_values(winner_scores)
+        loser_values = queries.dimension_values(loser_scores)
+        self.run(
+            queries.store_dimension_scores(winner_model, loser_model, winner_values, loser_values,
+                                           weight_version),
+            write=True
+        )
+        effects.dimension_scores_recorded(winner_model, loser_model, winner_values, loser_values)
+        return True
+
+    def record_vote_with_tags(self, winner_model: str, loser_model: str, tags: List[str],
+                              tag_categories: Dict[str, str],
+                              winner_scores: Dict[str, float], loser_scores: Dict[str, float],
+                              k_factor: int = 32, segments: List[str] = None,
+                              weight_version: int = DEFAULT_WEIGHT_VERSION) -> tuple:
+        self.ensure_table_exists()
+        self.ensure_tag_rollup_tables_exist()
+        self.ensure_dimension_rollups_table_exists()
+        winner_values = queries.dimension_values(winner_scores)
+        loser_values = queries.dimension_values(loser_scores)
+        ratings, segment_rows = self.run(queries.record_vote_with_tags(
+            winner_model, loser_model, tags, tag_categories, winner_values, loser_values,
+            k_factor, segments or (), weight_version
+        ), write=True)
+        effects.tagged_vote_recorded(winner_model, loser_model, ratings, segment_rows,
+                                     tags, winner_values, loser_values)
+        return ratings
+
+    def get_aggregated_dimension_scores(self, model_name: str = None, confidence: float = 0.95) -> Dict:
+        self.ensure_dimension_rollups_table_exists()
+        return self.run(queries.get_aggregated_dimension_scores(model_name, confidence))
+
+    def refresh_dimension_leaderboards(self):
+        self.ensure_dimension_rollups_table_exists()
+        leaderboards.load(self.run(queries.get_dimension_rollup_rows()))
+
+    def get_dimension_leaderboard(self, dimension: str, limit: int = 10, min_votes: int = 1) -> List[Dict]:
+        if dimension not in DIMENSIONS:
+            return []
+        if leaderboards.is_stale():
+            self.refresh_dimension_leaderboards()
+        return leaderboards.get_leaderboard(dimension, limit=limit, min_votes=min_votes)
+
+    # ---------- Bradley-Terry ratings ----------
+
+    def ensure_bt_ratings_table_exists(self):
+        self._ensure('bt_ratings', queries.ensure_bt_ratings_table)
+
+    def get_pair_counts(self) -> List[tuple]:
+        self.ensure_table_exists()
+        return self.run(queries.get_pair_counts())
+
+    def replace_bt_ratings(self, rows: List[tuple]) -> int:
+        self.ensure_bt_ratings_table_exists()
+        return self.run(queries.replace_bt_ratings(rows), write=True)
+
+    def get_bt_ratings(self) -> Dict[str, Dict]:
+        self.ensure_bt_ratings_table_exists()
+        return self.run(queries.get_bt_ratings())
+
+    # ---------- Glicko-2 ratings ----------
+
+    def ensure_glicko_tables_exist(self):
+        self.ensure_table_exists()
+        self._ensure('rating_job_state', queries.ensure_rating_job_state_table)
+        self._ensure('glicko_ratings', queries.ensure_glicko_ratings_table)
+
+    def get_glicko_ratings(self) -> Dict[str, Dict]:
+        self.ensure_glicko_tables_exist()
+        return self.run(queries.get_glicko_ratings())
+
+    # ---------- windowed and decayed leaderboards ----------
+
+    def get_windowed_ratings(self, days: int) -> Dict[str, Dict]:
+        effects.check_window(days)
+        board = windowed.get_cached('window', days)
+        if board is None:
+            self.ensure_table_exists()
+            pair_counts = self.run(queries.get_window_pair_counts(windowed.window_start(days)))
+            board = windowed.windowed_board(pair_counts)
+            windowed.store('window', days, board)
+        return board
+
+    def get_decayed_ratings(self, half_life_days: float) -> Dict[str, Dict]:
+        effects.check_half_life(half_life_days)
+        half_life_days = windowed.quantize_half_life(half_life_days)
+        board = windowed.get_cached('decay', half_life_days)
+        if board is None:
+            self.ensure_table_exists()
+            daily_counts = self.run(queries.get_daily_pair_counts(windowed.decay_start(half_life_days)))
+            board = windowed.decayed_board(daily_counts, half_life_days)
+            windowed.store('decay', half_life_days, board)
+        return board
+
+    # ---------- per-segment Elo ----------
+
+    def get_segment_ratings(self, segment: str) -> Dict[str, Dict]:
+        segment_boards.validate_segment(segment)
+        board = segment_boards.get_cached(segment)
+        if board is None:
+            self.ensure_table_exists()
+            board = self.run(queries.get_segment_ratings(segment))
+            segment_boards.store(segment, board)
+        return board
+
+    def get_segment_summary(self) -> Dict[str, Dict]:
+        self.ensure_table_exists()
+        return self.run(queries.get_segment_summary())
+
+    # ---------- matchmaking ----------
+
+    def get_matchmaking_pair(self) -> Optional[Dict]:
+        if matchmaking.is_stale():
+            self.ensure_table_exists()
+            matchmaking.load(*self.run(queries.get_matchmaking_state()))
+        return matchmaking.next_pair()
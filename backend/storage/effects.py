@@ -0,0 +1,80 @@
+"""
+In-process side of storage operations, shared by SQLStorage and AsyncSQLStorage.
+
+The database is the source of truth; the process keeps caches next to it
+(segment boards, matchmaking, the tag cube, dimension leaderboards) that a
+committed write updates in place. Both storage classes run the same plans,
+blocking or awaited, and call these helpers before a query (argument checks)
+and after a write commits (cache updates), so the two stay in step.
+"""
+
+from typing import Dict, List
+
+from . import queries
+from .. import leaderboards, matchmaking, tag_cube, tags as tag_weights, windowed
+from .. import segments as segment_boards
+
+# ---------- argument checks ----------
+
+
+def check_tag_role(role: str):
+    if role not in queries.TAG_ROLES:
+        raise ValueError(f"role must be one of: {', '.join(queries.TAG_ROLES)}")
+
+
+def check_granularity(granularity: str):
+    if granularity not in queries.TAG_ROLLUP_TABLES:
+        raise ValueError(f"granularity must be one of: {', '.join(queries.TAG_ROLLUP_TABLES)}")
+
+
+def check_cooccurrence(tag: str, role: str, sort: str):
+    if role not in tag_cube.ROLES:
+        raise ValueError(f"role must be one of: {', '.join(tag_cube.ROLES)}")
+    if sort not in tag_cube.SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(tag_cube.SORTS)}")
+    if tag is not None and not tag_weights.validate_tag(tag):
+        raise ValueError(f"Invalid tag: {tag}")
+
+
+def check_heatmap(role: str, metric: str):
+    if role not in tag_cube.ROLES:
+        raise ValueError(f"role must be one of: {', '.join(tag_cube.ROLES)}")
+    if metric not in tag_cube.HEATMAP_METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(tag_cube.HEATMAP_METRICS)}")
+
+
+def check_window(days: int):
+    if days not in windowed.WINDOWS_DAYS:
+        raise ValueError(f"window must be one of: {', '.join(map(str, windowed.WINDOWS_DAYS))}")
+
+
+def check_half_life(half_life_days: float):
+    if not 0 < half_life_days <= windowed.MAX_HALF_LIFE_DAYS:
+        raise ValueError(f"half_life must be in (0, {windowed.MAX_HALF_LIFE_DAYS:g}] days")
+
+
+# ---------- committed writes ----------
+
+
+def vote_recorded(winner_model: str, loser_model: str, ratings: tuple, segment_rows: List[Dict]):
+    """A vote's global and segment ratings are committed."""
+    segment_boards.apply_updates(segment_rows)
+    matchmaking.apply_vote(winner_model, loser_model, *ratings)
+
+
+def tags_recorded(winner_model: str, loser_model: str, tags: List[str]):
+    tag_cube.apply_vote(winner_model, loser_model, tags)
+
+
+def dimension_scores_recorded(winner_model: str, loser_model: str,
+                              winner_values: Dict[str, float], loser_values: Dict[str, float]):
+    leaderboards.apply_scores(winner_model, winner_values)
+    leaderboards.apply_scores(loser_model, loser_values)
+
+
+def tagged_vote_recorded(winner_model: str, loser_model: str, ratings: tuple, segment_rows: List[Dict],
+                         tags: List[str], winner_values: Dict[str, float], loser_values: Dict[str, float]):
+    """A vote with its tags and dimension scores is committed (queries.record_vote_with_tags)."""
+    vote_recorded(winner_model, loser_model, ratings, segment_rows)
+    tags_recorded(winner_model, loser_model, tags)
+    dimension_scores_recorded(winner_model, loser_model, winner_values, loser_values)
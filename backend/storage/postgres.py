@@ -0,0 +1,74 @@
+"""
+Postgres storage backend (Supabase in production), using psycopg2.
+"""
+
+import csv
+import io
+
+import psycopg2
+from psycopg2.extras import execute_batch
+
+from . import queries
+from .base import SQLStorage
+
+
+def table_exists_sql(table: str) -> queries.Statement:
+    return queries.fetch_one("""
+        SELECT 1 FROM information_schema.tables WHERE table_name = %s
+    """, (table,))
+
+
+def column_exists_sql(table: str, column: str) -> queries.Statement:
+    return queries.fetch_one("""
+        SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s
+    """, (table, column))
+
+
+def connect_kwargs(url: str) -> dict:
+    # Supabase requires SSL; a URL can still opt out with ?sslmode=disable
+    return {} if 'sslmode=' in url else {'sslmode': 'require'}
+
+
+class PostgresStorage(SQLStorage):
+    """Storage on a Postgres database; one short-lived connection per operation."""
+
+    def connect(self):
+        try:
+            return psycopg2.connect(self.url, **connect_kwargs(self.url))
+        except Exception as e:
+            print(f"Database connection error: {e}")
+            raise
+
+    def table_exists_statement(self, table: str) -> queries.Statement:
+        return table_exists_sql(table)
+
+    def column_exists_statement(self, table: str, column: str) -> queries.Statement:
+        return column_exists_sql(table, column)
+
+    def lock_tables(self, cursor, tables):
+        # Blocks concurrent writers (but not readers) until the transaction ends
+        cursor.execute(f"LOCK TABLE {', '.join(tables)} IN SHARE ROW EXCLUSIVE MODE")
+
+    def advisory_lock(self, cursor, key, shared=False):
+        # Waits for any holder of the other mode; released at commit or rollback
+        lock = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+        cursor.execute(f"SELECT {lock}(%s)", (key,))
+
+    def execute_many(self, cursor, sql: str, rows):
+        # Sends rows in pages instead of one round trip per row
+        execute_batch(cursor, sql, rows)
+
+    def stream_cursor(self, conn):
+        # Named cursors are server-side, so fetchmany() never holds the whole result
+        return conn.cursor(name="nnn_export")
+
+    def copy_to_csv(self, cursor, sql: str, fileobj) -> bool:
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", fileobj)
+        return True
+
+    def copy_rows(self, cursor, table: str, columns, rows):
+        # COPY ... FROM STDIN is several times faster than batched INSERTs
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
@@ -0,0 +1,1526 @@
+"""
+SQL for every storage operation, written once for all backends.
+
+Each operation is a generator ("plan") that yields statements and is sent
+back their results, so the same logic runs on any driver that can execute a
+statement (see SQLStorage.run in backend/storage/base.py). SQL is written
+for Postgres with %s placeholders; drivers translate it for their dialect.
+
+Statement results sent back into a plan:
+  - fetch_one: a dict row, or None
+  - fetch_all: a list of dict rows
+  - execute / execute_many: the driver's rowcount
+  - table_exists / column_exists: a bool
+"""
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from ..dimension_stats import HISTOGRAM_BINS, score_bin, summarize
+from ..elo import update_elo
+from ..tags import DEFAULT_WEIGHT_VERSION, DIMENSION_WEIGHTS, DIMENSIONS
+
+
+class Statement(NamedTuple):
+    sql: str
+    params: Any = ()
+    fetch: Optional[str] = None  # 'one', 'all' or None
+    many: bool = False
+
+
+class TableExists(NamedTuple):
+    table: str
+
+
+class ColumnExists(NamedTuple):
+    table: str
+    column: str
+
+
+def execute(sql: str, params: Any = ()) -> Statement:
+    return Statement(sql, params)
+
+
+def execute_many(sql: str, rows: List[tuple]) -> Statement:
+    return Statement(sql, rows, many=True)
+
+
+def fetch_one(sql: str, params: Any = ()) -> Statement:
+    return Statement(sql, params, fetch='one')
+
+
+def fetch_all(sql: str, params: Any = ()) -> Statement:
+    return Statement(sql, params, fetch='all')
+
+
+def table_exists(table: str) -> TableExists:
+    return TableExists(table)
+
+
+def column_exists(table: str, column: str) -> ColumnExists:
+    return ColumnExists(table, column)
+
+
+DEFAULT_RATING = 1500.0
+
+STARTER_MODELS = [
+    "OpenAI GPT-4o Mini",
+    "OpenAI GPT-4o",
+    "OpenAI GPT-3.5 Turbo",
+    "Claude 3 Haiku",
+    "Claude 3 Sonnet",
+    "Gemini 1.5 Pro",
+    "Gemini 2.0 Flash"
+]
+
+# Time-bucketed tag rollups: granularity -> (table name, bucket width)
+TAG_ROLLUP_TABLES = {
+    'hour': ('vote_tag_rollups_hourly', timedelta(hours=1)),
+    'day': ('vote_tag_rollups_daily', timedelta(days=1)),
+}
+
+TAG_ROLES = ('winner', 'loser')
+
+
+# ---------- ratings ----------
+
+ELO_RATINGS_DDL = """
+    CREATE TABLE IF NOT EXISTS elo_ratings (
+        id SERIAL PRIMARY KEY,
+        model_name VARCHAR(255) UNIQUE NOT NULL,
+        rating DECIMAL(10, 2) DEFAULT 1500.0,
+        wins INTEGER DEFAULT 0,
+        losses INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Append-only log of every pairwise outcome; offline rating engines fit from it
+VOTES_DDL = """
+    CREATE TABLE IF NOT EXISTS votes (
+        id SERIAL PRIMARY KEY,
+        winner_model VARCHAR(255) NOT NULL,
+        loser_model VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+def init_database():
+    """Drop and recreate elo_ratings with the starter models."""
+    yield execute("DROP TABLE IF EXISTS elo_ratings;")
+    yield execute(ELO_RATINGS_DDL)
+    yield execute("CREATE INDEX IF NOT EXISTS idx_elo_model_name ON elo_ratings(model_name);")
+    yield execute_many("""
+        INSERT INTO elo_ratings (model_name, rating, wins, losses)
+        VALUES (%s, 1500.0, 0, 0)
+    """, [(model,) for model in STARTER_MODELS])
+    return len(STARTER_MODELS)
+
+
+def ensure_ratings_table():
+    exists = yield table_exists('elo_ratings')
+    if not exists:
+        print("⚠️  Table not found, initializing database...")
+        yield execute(ELO_RATINGS_DDL)
+        yield execute("CREATE INDEX IF NOT EXISTS idx_elo_model_name ON elo_ratings(model_name);")
+        print("✅ Database table created successfully")
+
+
+def ensure_votes_table():
+    exists = yield table_exists('votes')
+    if not exists:
+        print("⚠️  votes table not found, creating...")
+        yield execute(VOTES_DDL)
+        yield execute("CREATE INDEX IF NOT EXISTS idx_votes_created_at ON votes(created_at);")
+        print("✅ votes table created successfully")
+
+
+def ensure_vote_pair_daily_table():
+    """
+    Create vote_pair_daily (votes per day per winner/loser pair), backfilling
+    it from the vote log. Windowed and decayed leaderboards read from it.
+    """
+    exists = yield table_exists('vote_pair_daily')
+    if exists:
+        return
+
+    print("⚠️  vote_pair_daily table not found, creating...")
+    yield execute("""
+        CREATE TABLE vote_pair_daily (
+            day TIMESTAMP NOT NULL,
+            winner_model VARCHAR(255) NOT NULL,
+            loser_model VARCHAR(255) NOT NULL,
+            votes BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, winner_model, loser_model)
+        );
+    """)
+    yield execute("""
+        INSERT INTO vote_pair_daily (day, winner_model, loser_model, votes)
+        SELECT date_trunc('day', created_at), winner_model, loser_model, COUNT(*)
+        FROM votes
+        GROUP BY date_trunc('day', created_at), winner_model, loser_model
+    """)
+    print("✅ vote_pair_daily table created successfully")
+
+
+def get_rating(model: str):
+    row = yield fetch_one("SELECT rating FROM elo_ratings WHERE model_name = %s", (model,))
+    return float(row['rating']) if row else DEFAULT_RATING
+
+
+def update_ratings(winner_model: str, loser_model: str, k_factor: int = 32, now: datetime = None):
+    models = sorted({winner_model, loser_model})
+    # Models we haven't seen yet start at the default rating (concurrent
+    # first votes for a model both get here, hence DO NOTHING)
+    yield execute_many("""
+        INSERT INTO elo_ratings (model_name, rating, wins, losses)
+        VALUES (%s, 1500.0, 0, 0)
+        ON CONFLICT (model_name) DO NOTHING
+    """, [(m,) for m in models])
+
+    # The Elo update is computed here from the current ratings, so both rows
+    # are locked before they're read: under READ COMMITTED two concurrent
+    # votes would otherwise start from the same rating and one update would
+    # be lost. Name order keeps concurrent votes from deadlocking. (SQLite
+    # has no FOR UPDATE; its write transactions are serialized instead.)
+    rows = yield fetch_all("""
+        SELECT model_name, rating FROM elo_ratings WHERE model_name IN (%s, %s)
+        ORDER BY model_name
+        FOR UPDATE
+    """, (winner_model, loser_model))
+    current = {row['model_name']: float(row['rating']) for row in rows}
+
+    winner_rating = current.get(winner_model, DEFAULT_RATING)
+    loser_rating = current.get(loser_model, DEFAULT_RATING)
+    new_winner_rating, new_loser_rating = update_elo(winner_rating, loser_rating, "1", k_factor)
+
+    yield execute("""
+        UPDATE elo_ratings
+        SET rating = %s, wins = wins + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE model_name = %s
+    """, (round(new_winner_rating, 2), winner_model))
+
+    yield execute("""
+        UPDATE elo_ratings
+        SET rating = %s, losses = losses + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE model_name = %s
+    """, (round(new_loser_rating, 2), loser_model))
+
+    now = _to_utc_naive(now or datetime.now(timezone.utc))
+    yield execute("""
+        INSERT INTO votes (winner_model, loser_model, created_at) VALUES (%s, %s, %s)
+    """, (winner_model, loser_model, now))
+
+    yield execute("""
+        INSERT INTO vote_pair_daily (day, winner_model, loser_model, votes)
+        VALUES (%s, %s, %s, 1)
+        ON CONFLICT (day, winner_model, loser_model) DO UPDATE
+        SET votes = vote_pair_daily.votes + 1
+    """, (bucket_start(now, 'day'), winner_model, loser_model))
+
+    return new_winner_rating, new_loser_rating
+
+
+def get_all_ratings():
+    rows = yield fetch_all("""
+        SELECT model_name, rating, wins, losses
+        FROM elo_ratings
+        ORDER BY rating DESC
+    """)
+    return {
+        row['model_name']: {
+            'rating': float(row['rating']),
+            'wins': int(row['wins']),
+            'losses': int(row['losses'])
+        }
+        for row in rows
+    }
+
+
+def reset_ratings():
+    yield execute("""
+        UPDATE elo_ratings
+        SET rating = 1500.0, wins = 0, losses = 0, updated_at = CURRENT_TIMESTAMP
+    """)
+
+
+# ---------- vote tags ----------
+
+def ensure_tags_table():
+    exists = yield table_exists('vote_tags')
+    if not exists:
+        print("⚠️  vote_tags table not found, creating...")
+        yield execute("""
+            CREATE TABLE vote_tags (
+                id SERIAL PRIMARY KEY,
+                winner_model VARCHAR(255) NOT NULL,
+                loser_model VARCHAR(255) NOT NULL,
+                tag_name VARCHAR(100) NOT NULL,
+                tag_category VARCHAR(50),
+                vote_uid VARCHAR(32),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        yield execute("CREATE INDEX idx_vote_tags_models ON vote_tags(winner_model, loser_model);")
+        yield execute("CREATE INDEX idx_vote_tags_name ON vote_tags(tag_name);")
+        print("✅ vote_tags table created successfully")
+    yield from add_column('vote_tags', 'vote_uid', 'VARCHAR(32)')
+    yield execute("CREATE INDEX IF NOT EXISTS idx_vote_tags_uid ON vote_tags(vote_uid);")
+
+
+def add_column(table: str, column: str, definition: str):
+    """Add a column to a table created before it existed. Returns True if it was added."""
+    exists = yield column_exists(table, column)
+    if not exists:
+        print(f"⚠️  {table}.{column} not found, adding...")
+        yield execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
+    return not exists
+
+
+def _to_utc_naive(ts: datetime) -> datetime:
+    """Normalize a timestamp to naive UTC (the format stored in bucket_start)."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its hour or day bucket."""
+    ts = _to_utc_naive(ts).replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        ts = ts.replace(hour=0)
+    return ts
+
+
+def ensure_tag_rollup_tables():
+    """
+    Create the hourly and daily tag rollup tables, backfilling new ones.
+
+    Each row counts how often a tag was attached to a model in one role
+    (winner or loser) during one bucket.
+    """
+    for granularity, (table, _) in TAG_ROLLUP_TABLES.items():
+        exists = yield table_exists(table)
+        if exists:
+            continue
+
+        print(f"⚠️  {table} table not found, creating...")
+        yield execute(f"""
+            CREATE TABLE {table} (
+                bucket_start TIMESTAMP NOT NULL,
+                model_name VARCHAR(255) NOT NULL,
+                role VARCHAR(10) NOT NULL,
+                tag_name VARCHAR(100) NOT NULL,
+                tag_category VARCHAR(50),
+                tag_count BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (model_name, role, bucket_start, tag_name)
+            );
+        """)
+
+        for role in TAG_ROLES:
+            yield execute(f"""
+                INSERT INTO {table}
+                (bucket_start, model_name, role, tag_name, tag_category, tag_count)
+                SELECT date_trunc('{granularity}', created_at), {role}_model, %s, tag_name,
+                       MAX(tag_category), COUNT(*)
+                FROM vote_tags
+                GROUP BY date_trunc('{granularity}', created_at), {role}_model, tag_name
+            """, (role,))
+
+        print(f"✅ {table} table created successfully")
+
+
+def ensure_tag_cooccurrence_tables():
+    """
+    Create tag_cooccurrence and tag_vote_totals, backfilling them from vote_tags
+    (see backend/tag_cube.py).
+    """
+    exists = yield table_exists('tag_cooccurrence')
+    if exists:
+        return
+
+    print("⚠️  tag_cooccurrence table not found, creating...")
+    yield execute("""
+        CREATE TABLE tag_cooccurrence (
+            model_name VARCHAR(255) NOT NULL,
+            role VARCHAR(10) NOT NULL,
+            tag_name VARCHAR(100) NOT NULL,
+            co_tag VARCHAR(100) NOT NULL,
+            pair_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (model_name, role, tag_name, co_tag)
+        );
+    """)
+    yield execute("""
+        CREATE TABLE tag_vote_totals (
+            model_name VARCHAR(255) NOT NULL,
+            role VARCHAR(10) NOT NULL,
+            tagged_votes BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (model_name, role)
+        );
+    """)
+
+    # One-time self-join over the tag log. Votes recorded before vote_uid
+    # existed are told apart by pair and timestamp.
+    yield from merge_tag_cooccurrence('vote_tags')
+    print("✅ tag_cooccurrence table created successfully")
+
+
+def merge_tag_cooccurrence(source: str):
+    """Add the votes in a table shaped like vote_tags to the co-occurrence cube."""
+    # Distinct (vote, tag) rows: duplicate tags in a vote count once, as in store_vote_tags
+    vote_tags = f"""(
+        SELECT DISTINCT winner_model, loser_model, created_at, COALESCE(vote_uid, '') as vote_key, tag_name
+        FROM {source}
+    )"""
+    for role in TAG_ROLES:
+        yield execute(f"""
+            INSERT INTO tag_cooccurrence (model_name, role, tag_name, co_tag, pair_count)
+            SELECT t1.{role}_model, %s, t1.tag_name, t2.tag_name, COUNT(*)
+            FROM {vote_tags} t1
+            JOIN {vote_tags} t2
+              ON t2.winner_model = t1.winner_model AND t2.loser_model = t1.loser_model
+             AND t2.created_at = t1.created_at AND t2.vote_key = t1.vote_key
+            WHERE true
+            GROUP BY t1.{role}_model, t1.tag_name, t2.tag_name
+            ON CONFLICT (model_name, role, tag_name, co_tag) DO UPDATE
+            SET pair_count = tag_cooccurrence.pair_count + EXCLUDED.pair_count
+        """, (role,))
+        yield execute(f"""
+            INSERT INTO tag_vote_totals (model_name, role, tagged_votes)
+            SELECT {role}_model, %s, COUNT(*)
+            FROM (
+                SELECT DISTINCT winner_model, loser_model, created_at, vote_key FROM {vote_tags} v
+            ) votes
+            WHERE true
+            GROUP BY {role}_model
+            ON CONFLICT (model_name, role) DO UPDATE
+            SET tagged_votes = tag_vote_totals.tagged_votes + EXCLUDED.tagged_votes
+        """, (role,))
+
+
+def get_tag_cube_rows():
+    """
+    All co-occurrence cells and tagged-vote totals.
+
+    Returns:
+        (pair rows, total rows) for tag_cube.load
+    """
+    pairs = yield fetch_all("""
+        SELECT model_name, role, tag_name, co_tag, pair_count FROM tag_cooccurrence
+    """)
+    totals = yield fetch_all("""
+        SELECT model_name, role, tagged_votes FROM tag_vote_totals
+    """)
+    return pairs, totals
+
+
+def store_vote_tags(winner_model: str, loser_model: str, tags: List[str],
+                    tag_categories: Dict[str, str] = None, now: datetime = None,
+                    vote_uid: str = None):
+    # One timestamp for the raw rows and their buckets keeps them consistent
+    now = _to_utc_naive(now or datetime.now(timezone.utc))
+
+    rows = []
+    for tag in tags:
+        category = tag_categories.get(tag, "unknown") if tag_categories else "unknown"
+        rows.append((winner_model, loser_model, tag, category))
+
+    if not rows:
+        return True
+
+    yield execute_many("""
+        INSERT INTO vote_tags (winner_model, loser_model, tag_name, tag_category, vote_uid, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [row + (vote_uid, now) for row in rows])
+
+    for granularity, (table, _) in TAG_ROLLUP_TABLES.items():
+        bucket = bucket_start(now, granularity)
+        yield execute_many(f"""
+            INSERT INTO {table}
+            (bucket_start, model_name, role, tag_name, tag_category, tag_count)
+            VALUES (%s, %s, %s, %s, %s, 1)
+            ON CONFLICT (model_name, role, bucket_start, tag_name) DO UPDATE
+            SET tag_count = {table}.tag_count + 1
+        """, [
+            (bucket, model, role, tag, category)
+            for (_, _, tag, category) in rows
+            for model, role in ((winner_model, 'winner'), (loser_model, 'loser'))
+        ])
+
+    # Co-occurrence cube: every ordered pair of distinct tags, diagonal included
+    distinct = list(dict.fromkeys(tags))
+    roles = ((winner_model, 'winner'), (loser_model, 'loser'))
+    yield execute_many("""
+        INSERT INTO tag_cooccurrence (model_name, role, tag_name, co_tag, pair_count)
+        VALUES (%s, %s, %s, %s, 1)
+        ON CONFLICT (model_name, role, tag_name, co_tag) DO UPDATE
+        SET pair_count = tag_cooccurrence.pair_count + 1
+    """, [(model, role, a, b) for model, role in roles for a in distinct for b in distinct])
+    yield execute_many("""
+        INSERT INTO tag_vote_totals (model_name, role, tagged_votes)
+        VALUES (%s, %s, 1)
+        ON CONFLICT (model_name, role) DO UPDATE
+        SET tagged_votes = tag_vote_totals.tagged_votes + 1
+    """, list(roles))
+
+    return True
+
+
+def rollup_ranges(start: Optional[datetime], end: Optional[datetime]) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+    """
+    Split [start, end) into (granularity, range_start, range_end) pieces.
+
+    Whole days are read from the daily table and only the ragged edges from
+    the hourly table, so a range of months touches a few hundred buckets.
+    Bounds are resolved to whole hours.
+    """
+    start = bucket_start(start, 'hour') if start else None
+    end = bucket_start(end, 'hour') if end else None
+
+    first_day = start if start is None or start == bucket_start(start, 'day') \
+        else bucket_start(start, 'day') + timedelta(days=1)
+    last_day = bucket_start(end, 'day') if end else None
+
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        return [('hour', start, end)]
+
+    ranges = []
+    if start is not None and start < first_day:
+        ranges.append(('hour', start, first_day))
+    ranges.append(('day', first_day, last_day))
+    if end is not None and last_day < end:
+        ranges.append(('hour', last_day, end))
+    return ranges
+
+
+def get_tag_distribution(model: str, role: str = 'winner', start: datetime = None,
+                         end: datetime = None):
+    parts = []
+    params = []
+    for granularity, range_start, range_end in rollup_ranges(start, end):
+        table = TAG_ROLLUP_TABLES[granularity][0]
+        sql = f"SELECT tag_name, tag_count FROM {table} WHERE model_name = %s AND role = %s"
+        params += [model, role]
+        if range_start is not None:
+            sql += " AND bucket_start >= %s"
+            params.append(range_start)
+        if range_end is not None:
+            sql += " AND bucket_start < %s"
+            params.append(range_end)
+        parts.append(sql)
+
+    rows = yield fetch_all(f"""
+        SELECT tag_name, SUM(tag_count) as count
+        FROM ({" UNION ALL ".join(parts)}) buckets
+        GROUP BY tag_name
+        ORDER BY count DESC
+    """, params)
+
+    total = sum(int(row['count']) for row in rows)
+    if total == 0:
+        return {}
+
+    return {
+        row['tag_name']: int(row['count']) / total
+        for row in rows
+    }
+
+
+def get_tag_time_series(model: str, role: str = 'winner', start: datetime = None,
+                        end: datetime = None, granularity: str = 'day',
+                        tag_name: str = None):
+    table = TAG_ROLLUP_TABLES[granularity][0]
+    sql = f"""
+        SELECT bucket_start, tag_name, tag_count
+        FROM {table}
+        WHERE model_name = %s AND role = %s
+    """
+    params = [model, role]
+    if start is not None:
+        sql += " AND bucket_start >= %s"
+        params.append(bucket_start(start, granularity))
+    if end is not None:
+        sql += " AND bucket_start < %s"
+        params.append(_to_utc_naive(end))
+    if tag_name:
+        sql += " AND tag_name = %s"
+        params.append(tag_name)
+    sql += " ORDER BY bucket_start"
+
+    rows = yield fetch_all(sql, params)
+
+    series = []
+    for row in rows:
+        if not series or series[-1]['bucket_start'] != row['bucket_start']:
+            series.append({'bucket_start': row['bucket_start'], 'total': 0, 'tags': {}})
+        series[-1]['tags'][row['tag_name']] = int(row['tag_count'])
+        series[-1]['total'] += int(row['tag_count'])
+    return series
+
+
+# ---------- dimension scores ----------
+
+def ensure_vote_dimension_scores_table():
+    exists = yield table_exists('vote_dimension_scores')
+    if not exists:
+        print("⚠️  vote_dimension_scores table not found, creating...")
+        yield execute("""
+            CREATE TABLE vote_dimension_scores (
+                id SERIAL PRIMARY KEY,
+                winner_model VARCHAR(255) NOT NULL,
+                loser_model VARCHAR(255) NOT NULL,
+                winner_empathy FLOAT DEFAULT 0.5,
+                winner_aggressiveness FLOAT DEFAULT 0.5,
+                winner_evidence_use FLOAT DEFAULT 0.5,
+                winner_political_economic FLOAT DEFAULT 0.0,
+                winner_political_social FLOAT DEFAULT 0.0,
+                loser_empathy FLOAT DEFAULT 0.5,
+                loser_aggressiveness FLOAT DEFAULT 0.5,
+                loser_evidence_use FLOAT DEFAULT 0.5,
+                loser_political_economic FLOAT DEFAULT 0.0,
+                loser_political_social FLOAT DEFAULT 0.0,
+                weight_version INTEGER NOT NULL DEFAULT 1,
+                vote_uid VARCHAR(32),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        yield execute("CREATE INDEX idx_vote_dim_winner ON vote_dimension_scores(winner_model);")
+        yield execute("CREATE INDEX idx_vote_dim_loser ON vote_dimension_scores(loser_model);")
+        print("✅ vote_dimension_scores table created successfully")
+    # Scores written before weight versions existed were computed under version 1
+    yield from add_column('vote_dimension_scores', 'weight_version', 'INTEGER NOT NULL DEFAULT 1')
+    yield from add_column('vote_dimension_scores', 'vote_uid', 'VARCHAR(32)')
+    yield execute("CREATE INDEX IF NOT EXISTS idx_vote_dim_uid ON vote_dimension_scores(vote_uid);")
+
+
+def ensure_dimension_weight_versions_table():
+    """Create dimension_weight_versions, seeded with the built-in weights as version 1."""
+    exists = yield table_exists('dimension_weight_versions')
+    if exists:
+        return
+
+    print("⚠️  dimension_weight_versions table not found, creating...")
+    yield execute("""
+        CREATE TABLE dimension_weight_versions (
+            version INTEGER PRIMARY KEY,
+            weights TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            activated_at TIMESTAMP
+        );
+    """)
+    yield execute("""
+        INSERT INTO dimension_weight_versions (version, weights, activated_at)
+        VALUES (%s, %s, CURRENT_TIMESTAMP)
+    """, (DEFAULT_WEIGHT_VERSION, json.dumps(DIMENSION_WEIGHTS, sort_keys=True)))
+    print("✅ dimension_weight_versions table created successfully")
+
+
+def _weight_version_row(row) -> Optional[Dict]:
+    if row is None:
+        return None
+    return {
+        'version': int(row['version']),
+        'weights': json.loads(row['weights']),
+        'created_at': row['created_at'],
+        'activated_at': row['activated_at'],
+    }
+
+
+def get_active_weight_version():
+    """The most recently activated weight version ({version, weights, ...})."""
+    row = yield fetch_one("""
+        SELECT version, weights, created_at, activated_at
+        FROM dimension_weight_versions
+        WHERE activated_at IS NOT NULL
+        ORDER BY activated_at DESC, version DESC
+        LIMIT 1
+    """)
+    return _weight_version_row(row)
+
+
+def get_weight_version(version: int):
+    row = yield fetch_one("""
+        SELECT version, weights, created_at, activated_at
+        FROM dimension_weight_versions
+        WHERE version = %s
+    """, (version,))
+    return _weight_version_row(row)
+
+
+def list_weight_versions():
+    rows = yield fetch_all("""
+        SELECT version, weights, created_at, activated_at
+        FROM dimension_weight_versions
+        ORDER BY version
+    """)
+    return [_weight_version_row(row) for row in rows]
+
+
+def add_weight_version(weights: Dict[str, Dict[str, float]]):
+    """Register a (not yet active) weight set under the next version number. Returns the version."""
+    row = yield fetch_one("SELECT MAX(version) as version FROM dimension_weight_versions")
+    version = int(row['version'] or 0) + 1
+    yield execute("""
+        INSERT INTO dimension_weight_versions (version, weights) VALUES (%s, %s)
+    """, (version, json.dumps(weights, sort_keys=True)))
+    return version
+
+
+def activate_weight_version(version: int):
+    yield execute("""
+        UPDATE dimension_weight_versions SET activated_at = CURRENT_TIMESTAMP WHERE version = %s
+    """, (version,))
+
+
+def ensure_dimension_rollups_table():
+    """
+    Create model_dimension_rollups and model_dimension_histograms, backfilling
+    them from vote_dimension_scores.
+
+    The rollup holds Welford accumulators (count, mean, M2) and the histogram
+    holds vote counts per score bin for each (model, dimension), so reads
+    never scan vote_dimension_scores (see backend/dimension_stats.py).
+    """
+    exists = yield table_exists('model_dimension_rollups')
+    if exists:
+        # Rollups from before Welford accumulators held running sums instead
+        added = yield from add_column('model_dimension_rollups', 'score_mean',
+                                      'DOUBLE PRECISION NOT NULL DEFAULT 0')
+        yield from add_column('model_dimension_rollups', 'score_m2', 'DOUBLE PRECISION NOT NULL DEFAULT 0')
+        histograms = yield table_exists('model_dimension_histograms')
+        if not histograms:
+            yield from _create_dimension_histograms_table()
+        if added or not histograms:
+            yield from rebuild_dimension_rollups()
+        return
+
+    print("⚠️  model_dimension_rollups table not found, creating...")
+    yield execute("""
+        CREATE TABLE model_dimension_rollups (
+            model_name VARCHAR(255) NOT NULL,
+            dimension VARCHAR(50) NOT NULL,
+            vote_count BIGINT NOT NULL DEFAULT 0,
+            score_mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+            score_m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (model_name, dimension)
+        );
+    """)
+    yield from _create_dimension_histograms_table()
+
+    # Backfill from historical votes
+    yield from rebuild_dimension_rollups()
+
+    print("✅ model_dimension_rollups table created successfully")
+
+
+def _create_dimension_histograms_table():
+    yield execute("""
+        CREATE TABLE model_dimension_histograms (
+            model_name VARCHAR(255) NOT NULL,
+            dimension VARCHAR(50) NOT NULL,
+            score_bin INTEGER NOT NULL,
+            vote_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (model_name, dimension, score_bin)
+        );
+    """)
+
+
+def score_bin_sql(dimension: str, column: str) -> str:
+    """SQL for dimension_stats.score_bin(dimension, column)."""
+    lo, hi = DIMENSIONS[dimension]['min'], DIMENSIONS[dimension]['max']
+    return f"""CASE
+        WHEN {column} >= {hi!r} THEN {HISTOGRAM_BINS - 1}
+        WHEN {column} <= {lo!r} THEN 0
+        ELSE CAST(FLOOR(({column} - {lo!r}) * {HISTOGRAM_BINS} / {hi - lo!r}) AS INTEGER)
+    END"""
+
+
+# Folds (vote_count, score_mean, score_m2) of a batch into the stored
+# accumulators with Chan et al.'s parallel Welford merge
+_MERGE_DIMENSION_ROLLUP = """
+    ON CONFLICT (model_name, dimension) DO UPDATE
+    SET vote_count = model_dimension_rollups.vote_count + EXCLUDED.vote_count,
+        score_mean = model_dimension_rollups.score_mean
+            + (EXCLUDED.score_mean - model_dimension_rollups.score_mean)
+              * EXCLUDED.vote_count / (model_dimension_rollups.vote_count + EXCLUDED.vote_count),
+        score_m2 = model_dimension_rollups.score_m2 + EXCLUDED.score_m2
+            + (EXCLUDED.score_mean - model_dimension_rollups.score_mean)
+              * (EXCLUDED.score_mean - model_dimension_rollups.score_mean)
+              * model_dimension_rollups.vote_count * EXCLUDED.vote_count
+              / (model_dimension_rollups.vote_count + EXCLUDED.vote_count),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+_MERGE_DIMENSION_HISTOGRAM = """
+    ON CONFLICT (model_name, dimension, score_bin) DO UPDATE
+    SET vote_count = model_dimension_histograms.vote_count + EXCLUDED.vote_count
+"""
+
+
+def merge_dimension_stats(source: str):
+    """
+    Add every score row in a table shaped like vote_dimension_scores to the
+    rollups and histograms (one pass per dimension).
+    """
+    for dimension in DIMENSIONS:
+        scores = f"""(
+            SELECT winner_model as model_name, winner_{dimension} as score FROM {source}
+            UNION ALL
+            SELECT loser_model as model_name, loser_{dimension} as score FROM {source}
+        )"""
+        # Two passes (mean, then squared deviations) keep M2 exact for large batches
+        yield execute(f"""
+            INSERT INTO model_dimension_rollups
+            (model_name, dimension, vote_count, score_mean, score_m2)
+            SELECT s.model_name, %s, g.vote_count, g.score_mean,
+                   SUM((s.score - g.score_mean) * (s.score - g.score_mean))
+            FROM {scores} s
+            JOIN (
+                SELECT model_name, COUNT(*) as vote_count, AVG(score) as score_mean
+                FROM {scores} batch
+                GROUP BY model_name
+            ) g ON g.model_name = s.model_name
+            WHERE true
+            GROUP BY s.model_name, g.vote_count, g.score_mean
+            {_MERGE_DIMENSION_ROLLUP}
+        """, (dimension,))
+        yield execute(f"""
+            INSERT INTO model_dimension_histograms (model_name, dimension, score_bin, vote_count)
+            SELECT model_name, %s, score_bin, COUNT(*)
+            FROM (
+                SELECT model_name, {score_bin_sql(dimension, 'score')} as score_bin
+                FROM {scores} s
+            ) binned
+            WHERE true
+            GROUP BY model_name, score_bin
+            {_MERGE_DIMENSION_HISTOGRAM}
+        """, (dimension,))
+
+
+def rebuild_dimension_rollups():
+    """Recompute the rollups and histograms from vote_dimension_scores."""
+    yield execute("DELETE FROM model_dimension_rollups")
+    yield execute("DELETE FROM model_dimension_histograms")
+    yield from merge_dimension_stats('vote_dimension_scores')
+
+
+def dimension_values(scores: Dict[str, float]) -> Dict[str, float]:
+    """Fill in missing dimensions with their defaults."""
+    return {dim: scores.get(dim, cfg['default']) for dim, cfg in DIMENSIONS.items()}
+
+
+SCORE_COLUMNS = [f"{role}_{dim}" for role in TAG_ROLES for dim in DIMENSIONS]
+
+
+def store_dimension_scores(winner_model: str, loser_model: str,
+                           winner_values: Dict[str, float],
+                           loser_values: Dict[str, float],
+                           weight_version: int = DEFAULT_WEIGHT_VERSION,
+                           vote_uid: str = None, now: datetime = None):
+    """Insert one vote's scores and add them to the rollups (values must be complete)."""
+    now = _to_utc_naive(now or datetime.now(timezone.utc))
+    yield execute(f"""
+        INSERT INTO vote_dimension_scores
+        (winner_model, loser_model, {", ".join(SCORE_COLUMNS)}, weight_version, vote_uid, created_at)
+        VALUES ({", ".join(["%s"] * (len(SCORE_COLUMNS) + 5))})
+    """, (
+        winner_model, loser_model,
+        *[winner_values[dim] for dim in DIMENSIONS],
+        *[loser_values[dim] for dim in DIMENSIONS],
+        weight_version, vote_uid, now,
+    ))
+
+    scores = [
+        (model, dimension, score)
+        for model, values in ((winner_model, winner_values), (loser_model, loser_values))
+        for dimension, score in values.items()
+    ]
+    # A single score is a batch with count 1 and M2 0
+    yield execute_many(f"""
+        INSERT INTO model_dimension_rollups
+        (model_name, dimension, vote_count, score_mean, score_m2)
+        VALUES (%s, %s, 1, %s, 0)
+        {_MERGE_DIMENSION_ROLLUP}
+    """, scores)
+    yield execute_many(f"""
+        INSERT INTO model_dimension_histograms (model_name, dimension, score_bin, vote_count)
+        VALUES (%s, %s, %s, 1)
+        {_MERGE_DIMENSION_HISTOGRAM}
+    """, [(model, dimension, score_bin(dimension, score)) for model, dimension, score in scores])
+    return True
+
+
+def get_aggregated_dimension_scores(model_name: str = None, confidence: float = 0.95):
+    where, params = "WHERE vote_count > 0", ()
+    if model_name:
+        where += " AND model_name = %s"
+        params = (model_name,)
+
+    rows = yield fetch_all(f"""
+        SELECT model_name, dimension, vote_count, score_mean, score_m2
+        FROM model_dimension_rollups
+        {where}
+    """, params)
+    bin_rows = yield fetch_all(f"""
+        SELECT model_name, dimension, score_bin, vote_count
+        FROM model_dimension_histograms
+        {where}
+    """, params)
+
+    histograms = {}
+    for row in bin_rows:
+        bins = histograms.setdefault((row['model_name'], row['dimension']), [0] * HISTOGRAM_BINS)
+        if 0 <= row['score_bin'] < HISTOGRAM_BINS:
+            bins[row['score_bin']] = int(row['vote_count'])
+
+    aggregated = {}
+    for row in rows:
+        if row['dimension'] not in DIMENSIONS:
+            continue
+        model = row['model_name']
+        if model not in aggregated:
+            aggregated[model] = {'vote_count': 0, 'stats': {}}
+
+        vote_count = int(row['vote_count'])
+        stats = summarize(row['dimension'], vote_count, float(row['score_mean']), float(row['score_m2']),
+                          histograms.get((model, row['dimension'])), confidence)
+        aggregated[model]['vote_count'] = max(aggregated[model]['vote_count'], vote_count)
+        aggregated[model][row['dimension']] = round(stats['mean'], 3)
+        aggregated[model]['stats'][row['dimension']] = {
+            k: ({q: round(x, 4) for q, x in v.items()} if isinstance(v, dict)
+                else None if v is None else round(v, 4))
+            for k, v in stats.items()
+        }
+
+    # Most-voted models first
+    return dict(sorted(aggregated.items(), key=lambda item: item[1]['vote_count'], reverse=True))
+
+
+def record_vote(winner_model: str, loser_model: str, k_factor: int = 32, segments: List[str] = ()):
+    """
+    Global and per-segment rating updates for one vote, as a single transaction.
+
+    Returns:
+        ((new_winner_rating, new_loser_rating), post-update segment rows)
+    """
+    ratings = yield from update_ratings(winner_model, loser_model, k_factor)
+    segment_rows = yield from update_segment_ratings(segments, winner_model, loser_model, k_factor)
+    return ratings, segment_rows
+
+
+def record_vote_with_tags(winner_model: str, loser_model: str, tags: List[str],
+                          tag_categories: Dict[str, str],
+                          winner_values: Dict[str, float], loser_values: Dict[str, float],
+                          k_factor: int = 32, segments: List[str] = (),
+                          weight_version: int = DEFAULT_WEIGHT_VERSION):
+    """
+    Rating updates, tags and dimension scores for one vote, as a single transaction.
+
+    The tag rows and the score row share a vote_uid, so the scores can be
+    recomputed from the tags under other weights (tools/reweight_dimensions.py).
+
+    Returns:
+        Same as record_vote
+    """
+    result = yield from record_vote(winner_model, loser_model, k_factor, segments)
+    vote_uid = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    yield from store_vote_tags(winner_model, loser_model, tags, tag_categories, now, vote_uid)
+    yield from store_dimension_scores(winner_model, loser_model, winner_values, loser_values,
+                                      weight_version, vote_uid, now)
+    return result
+
+
+def get_dimension_rollup_rows():
+    rows = yield fetch_all("""
+        SELECT model_name, dimension, vote_count, score_mean * vote_count as score_sum
+        FROM model_dimension_rollups
+    """)
+    return rows
+
+
+# ---------- dimension weight backfill ----------
+
+# Temporary table tools/reweight_dimensions.py stages recomputed scores in
+REWEIGHT_STAGING_COLUMNS = ['id'] + SCORE_COLUMNS + ['weight_version']
+
+
+def reweight_source_sql(catch_up: bool = False) -> str:
+    """
+    Linked score rows after an id, joined to their tags, in id order (one row
+    per tag; tagless votes yield a single row with tag_name NULL).
+    Params: (after_id,) or, with catch_up, (after_id, version) to skip rows
+    already scored under version.
+    """
+    return f"""
+        SELECT s.id, t.tag_name
+        FROM vote_dimension_scores s
+        LEFT JOIN vote_tags t ON t.vote_uid = s.vote_uid
+        WHERE s.vote_uid IS NOT NULL AND s.id > %s
+        {"AND s.weight_version <> %s" if catch_up else ""}
+        ORDER BY s.id
+    """
+
+
+def create_reweight_staging():
+    yield from drop_reweight_staging()
+    score_columns = ",\n".join(f"{column} FLOAT NOT NULL" for column in SCORE_COLUMNS)
+    yield execute(f"""
+        CREATE TEMP TABLE reweight_scores (
+            id BIGINT PRIMARY KEY,
+            {score_columns},
+            weight_version INTEGER NOT NULL
+        );
+    """)
+
+
+def drop_reweight_staging():
+    yield execute("DROP TABLE IF EXISTS reweight_scores;")
+
+
+def get_max_dimension_score_id():
+    row = yield fetch_one("SELECT MAX(id) as max_id FROM vote_dimension_scores")
+    return int(row['max_id'] or 0)
+
+
+def apply_reweight_staging():
+    """
+    Swap the staged scores into vote_dimension_scores and rebuild the rollups.
+
+    Returns:
+        Number of score rows updated
+    """
+    assignments = ", ".join(f"{column} = r.{column}" for column in SCORE_COLUMNS + ['weight_version'])
+    updated = yield execute(f"""
+        UPDATE vote_dimension_scores
+        SET {assignments}
+        FROM reweight_scores r
+        WHERE vote_dimension_scores.id = r.id
+    """)
+    yield from rebuild_dimension_rollups()
+    return updated
+
+
+def get_unlinked_dimension_scores():
+    """Score rows written before votes had a vote_uid."""
+    rows = yield fetch_all(f"""
+        SELECT id, winner_model, loser_model, weight_version, created_at, {", ".join(SCORE_COLUMNS)}
+        FROM vote_dimension_scores
+        WHERE vote_uid IS NULL
+        ORDER BY id
+    """)
+    return rows
+
+
+def get_unlinked_vote_tags():
+    """Tag rows written before votes had a vote_uid."""
+    rows = yield fetch_all("""
+        SELECT id, winner_model, loser_model, tag_name, created_at
+        FROM vote_tags
+        WHERE vote_uid IS NULL
+        ORDER BY id
+    """)
+    return rows
+
+
+def link_vote_uids(score_links: List[tuple], tag_links: List[tuple]):
+    """Set vote_uid on legacy rows from (vote_uid, id) pairs."""
+    if score_links:
+        yield execute_many("UPDATE vote_dimension_scores SET vote_uid = %s WHERE id = %s", score_links)
+    if tag_links:
+        yield execute_many("UPDATE vote_tags SET vote_uid = %s WHERE id = %s", tag_links)
+
+
+# ---------- bulk import ----------
+
+# Staging tables for tools/import_votes.py: table -> columns
+# Held exclusively by tools/import_votes for its whole transaction: its
+# vote ids are drawn long before they commit, so jobs that advance an id
+# watermark (tools/export --incremental, tools/update_glicko) take it
+# shared first and never read past ids that are still uncommitted
+VOTE_IMPORT_LOCK = 7242001
+
+IMPORT_STAGING_TABLES = {
+    'import_votes': ['seq', 'winner_model', 'loser_model', 'created_at', 'bucket_day'],
+    'import_vote_tags': (
+        ['winner_model', 'loser_model', 'tag_name', 'tag_category', 'vote_uid', 'created_at']
+        + [f"bucket_{granularity}" for granularity in TAG_ROLLUP_TABLES]
+    ),
+    'import_dimension_scores': (
+        ['winner_model', 'loser_model']
+        + [f"winner_{dim}" for dim in DIMENSIONS]
+        + [f"loser_{dim}" for dim in DIMENSIONS]
+        + ['weight_version', 'vote_uid', 'created_at']
+    ),
+}
+
+
+def create_import_staging():
+    """(Re)create the temporary staging tables for a bulk import."""
+    yield from drop_import_staging()
+    yield execute("""
+        CREATE TEMP TABLE import_votes (
+            seq BIGINT NOT NULL,
+            winner_model VARCHAR(255) NOT NULL,
+            loser_model VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            bucket_day TIMESTAMP NOT NULL
+        );
+    """)
+    # Rollup buckets are computed while staging, so the merge is a plain GROUP BY
+    bucket_columns = ",\n".join(f"bucket_{granularity} TIMESTAMP NOT NULL" for granularity in TAG_ROLLUP_TABLES)
+    yield execute(f"""
+        CREATE TEMP TABLE import_vote_tags (
+            winner_model VARCHAR(255) NOT NULL,
+            loser_model VARCHAR(255) NOT NULL,
+            tag_name VARCHAR(100) NOT NULL,
+            tag_category VARCHAR(50),
+            vote_uid VARCHAR(32),
+            created_at TIMESTAMP NOT NULL,
+            {bucket_columns}
+        );
+    """)
+    score_columns = ",\n".join(
+        f"{role}_{dim} FLOAT" for role in TAG_ROLES for dim in DIMENSIONS
+    )
+    yield execute(f"""
+        CREATE TEMP TABLE import_dimension_scores (
+            winner_model VARCHAR(255) NOT NULL,
+            loser_model VARCHAR(255) NOT NULL,
+            {score_columns},
+            weight_version INTEGER NOT NULL,
+            vote_uid VARCHAR(32),
+            created_at TIMESTAMP NOT NULL
+        );
+    """)
+
+
+def drop_import_staging():
+    for table in IMPORT_STAGING_TABLES:
+        yield execute(f"DROP TABLE IF EXISTS {table};")
+
+
+def merge_import_staging():
+    """
+    Move staged votes, tags and dimension scores into the live tables and
+    add them to the rollups with set-based statements (one pass per rollup
+    table).
+
+    Returns:
+        Dict with the number of vote, tag and dimension score rows merged
+    """
+    vote_rows = yield execute("""
+        INSERT INTO votes (winner_model, loser_model, created_at)
+        SELECT winner_model, loser_model, created_at
+        FROM import_votes
+        ORDER BY created_at, seq
+    """)
+
+    yield execute("""
+        INSERT INTO vote_pair_daily (day, winner_model, loser_model, votes)
+        SELECT bucket_day, winner_model, loser_model, COUNT(*)
+        FROM import_votes
+        WHERE true
+        GROUP BY bucket_day, winner_model, loser_model
+        ON CONFLICT (day, winner_model, loser_model) DO UPDATE
+        SET votes = vote_pair_daily.votes + EXCLUDED.votes
+    """)
+
+    tag_rows = yield execute("""
+        INSERT INTO vote_tags (winner_model, loser_model, tag_name, tag_category, vote_uid, created_at)
+        SELECT winner_model, loser_model, tag_name, tag_category, vote_uid, created_at
+        FROM import_vote_tags
+        ORDER BY created_at
+    """)
+
+    for granularity, (table, _) in TAG_ROLLUP_TABLES.items():
+        yield execute(f"""
+            INSERT INTO {table}
+            (bucket_start, model_name, role, tag_name, tag_category, tag_count)
+            SELECT bucket, model_name, role, tag_name, MAX(tag_category), COUNT(*)
+            FROM (
+                SELECT bucket_{granularity} as bucket, winner_model as model_name, 'winner' as role,
+                       tag_name, tag_category
+                FROM import_vote_tags
+                UNION ALL
+                SELECT bucket_{granularity} as bucket, loser_model as model_name, 'loser' as role,
+                       tag_name, tag_category
+                FROM import_vote_tags
+            ) staged
+            WHERE true
+            GROUP BY bucket, model_name, role, tag_name
+            ON CONFLICT (model_name, role, bucket_start, tag_name) DO UPDATE
+            SET tag_count = {table}.tag_count + EXCLUDED.tag_count
+        """)
+
+    yield from merge_tag_cooccurrence('import_vote_tags')
+
+    columns = IMPORT_STAGING_TABLES['import_dimension_scores']
+    score_rows = yield execute(f"""
+        INSERT INTO vote_dimension_scores ({", ".join(columns)})
+        SELECT {", ".join(columns)}
+        FROM import_dimension_scores
+        ORDER BY created_at
+    """)
+
+    yield from merge_dimension_stats('import_dimension_scores')
+
+    return {'vote_rows': vote_rows, 'tag_rows': tag_rows, 'dimension_score_rows': score_rows}
+
+
+# Staged votes in the order their rating updates are replayed
+IMPORT_VOTES_IN_ORDER_SQL = "SELECT winner_model, loser_model FROM import_votes ORDER BY created_at, seq"
+
+
+def upsert_ratings(rows: List[tuple]):
+    """Write final (model_name, rating, wins_added, losses_added) rows after a bulk replay."""
+    yield execute_many("""
+        INSERT INTO elo_ratings (model_name, rating, wins, losses)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (model_name) DO UPDATE
+        SET rating = EXCLUDED.rating,
+            wins = elo_ratings.wins + EXCLUDED.wins,
+            losses = elo_ratings.losses + EXCLUDED.losses,
+            updated_at = CURRENT_TIMESTAMP
+    """, rows)
+    return len(rows)
+
+
+# ---------- Bradley-Terry ratings ----------
+
+def get_pair_counts():
+    """Aggregate the vote log to (winner_model, loser_model, wins) rows."""
+    rows = yield fetch_all("""
+        SELECT winner_model, loser_model, COUNT(*) as wins
+        FROM votes
+        GROUP BY winner_model, loser_model
+    """)
+    return [(row['winner_model'], row['loser_model'], int(row['wins'])) for row in rows]
+
+
+def ensure_bt_ratings_table():
+    exists = yield table_exists('bt_ratings')
+    if not exists:
+        print("⚠️  bt_ratings table not found, creating...")
+        yield execute("""
+            CREATE TABLE bt_ratings (
+                model_name VARCHAR(255) PRIMARY KEY,
+                rating DOUBLE PRECISION NOT NULL,
+                ci_lower DOUBLE PRECISION,
+                ci_upper DOUBLE PRECISION,
+                wins BIGINT NOT NULL DEFAULT 0,
+                losses BIGINT NOT NULL DEFAULT 0,
+                fitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        print("✅ bt_ratings table created successfully")
+
+
+def replace_bt_ratings(rows: List[tuple]):
+    """Swap in a new fit: rows of (model_name, rating, ci_lower, ci_upper, wins, losses)."""
+    yield execute("DELETE FROM bt_ratings")
+    yield execute_many("""
+        INSERT INTO bt_ratings (model_name, rating, ci_lower, ci_upper, wins, losses, fitted_at)
+        VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+    """, rows)
+    return len(rows)
+
+
+def get_bt_ratings():
+    rows = yield fetch_all("""
+        SELECT model_name, rating, ci_lower, ci_upper, wins, losses, fitted_at
+        FROM bt_ratings
+        ORDER BY rating DESC
+    """)
+    return {
+        row['model_name']: {
+            'rating': round(float(row['rating']), 2),
+            'ci_lower': round(float(row['ci_lower']), 2) if row['ci_lower'] is not None else None,
+            'ci_upper': round(float(row['ci_upper']), 2) if row['ci_upper'] is not None else None,
+            'wins': int(row['wins']),
+            'losses': int(row['losses']),
+            'fitted_at': str(row['fitted_at']),
+        }
+        for row in rows
+    }
+
+
+# ---------- Glicko-2 ratings ----------
+
+def ensure_rating_job_state_table():
+    exists = yield table_exists('rating_job_state')
+    if not exists:
+        print("⚠️  rating_job_state table not found, creating...")
+        yield execute("""
+            CREATE TABLE rating_job_state (
+                job VARCHAR(50) PRIMARY KEY,
+                last_vote_id BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        print("✅ rating_job_state table created successfully")
+    # Start of the last rating period applied (NULL before the first run)
+    yield from add_column('rating_job_state', 'last_period', 'TIMESTAMP')
+
+
+def get_job_state(job: str):
+    """
+    Returns:
+        (last_vote_id, last_period): 0 and None if the job never ran
+    """
+    row = yield fetch_one("SELECT last_vote_id, last_period FROM rating_job_state WHERE job = %s", (job,))
+    if not row:
+        return 0, None
+    return int(row['last_vote_id']), row['last_period']
+
+
+def set_job_state(job: str, last_vote_id: int, last_period: Optional[datetime]):
+    yield execute("""
+        INSERT INTO rating_job_state (job, last_vote_id, last_period, updated_at)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (job) DO UPDATE
+        SET last_vote_id = EXCLUDED.last_vote_id, last_period = EXCLUDED.last_period,
+            updated_at = CURRENT_TIMESTAMP
+    """, (job, last_vote_id, last_period))
+
+
+def get_closed_period_vote_id(after_id: int, granularity: str = 'day'):
+    """
+    Last vote id that can be rated: every vote with after_id < id <= the
+    returned id was cast before the current (still open) period began.
+    """
+    row = yield fetch_one(f"""
+        SELECT COALESCE(MIN(id) - 1, (SELECT COALESCE(MAX(id), 0) FROM votes)) as through_id
+        FROM votes
+        WHERE id > %s AND created_at >= date_trunc('{granularity}', CURRENT_TIMESTAMP)
+    """, (after_id,))
+    return int(row['through_id'])
+
+
+def get_period_pair_counts(after_id: int, through_id: int, granularity: str = 'day'):
+    """
+    Aggregate votes with after_id < id <= through_id into per-period pair counts.
+
+    Returns:
+        List of (period_start, winner_model, loser_model, count) in period order
+    """
+    rows = yield fetch_all(f"""
+        SELECT date_trunc('{granularity}', created_at) as period,
+               winner_model, loser_model, COUNT(*) as games
+        FROM votes
+        WHERE id > %s AND id <= %s
+        GROUP BY date_trunc('{granularity}', created_at), winner_model, loser_model
+        ORDER BY period
+    """, (after_id, through_id))
+    return [(row['period'], row['winner_model'], row['loser_model'], int(row['games'])) for row in rows]
+
+
+def ensure_glicko_ratings_table():
+    exists = yield table_exists('glicko_ratings')
+    if not exists:
+        print("⚠️  glicko_ratings table not found, creating...")
+        yield execute("""
+            CREATE TABLE glicko_ratings (
+                model_name VARCHAR(255) PRIMARY KEY,
+                rating DOUBLE PRECISION NOT NULL,
+                rd DOUBLE PRECISION NOT NULL,
+                volatility DOUBLE PRECISION NOT NULL,
+                wins BIGINT NOT NULL DEFAULT 0,
+                losses BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        print("✅ glicko_ratings table created successfully")
+
+
+def get_glicko_state():
+    rows = yield fetch_all("""
+        SELECT model_name, rating, rd, volatility, wins, losses FROM glicko_ratings
+    """)
+    return {
+        row['model_name']: {
+            'rating': float(row['rating']),
+            'rd': float(row['rd']),
+            'volatility': float(row['volatility']),
+            'wins': int(row['wins']),
+            'losses': int(row['losses']),
+        }
+        for row in rows
+    }
+
+
+def save_glicko_state(rows: List[tuple]):
+    """Upsert (model_name, rating, rd, volatility, wins, losses) rows."""
+    yield execute_many("""
+        INSERT INTO glicko_ratings (model_name, rating, rd, volatility, wins, losses, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (model_name) DO UPDATE
+        SET rating = EXCLUDED.rating, rd = EXCLUDED.rd, volatility = EXCLUDED.volatility,
+            wins = EXCLUDED.wins, losses = EXCLUDED.losses, updated_at = CURRENT_TIMESTAMP
+    """, rows)
+    return len(rows)
+
+
+def get_glicko_ratings():
+    rows = yield fetch_all("""
+        SELECT model_name, rating, rd, volatility, wins, losses
+        FROM glicko_ratings
+        ORDER BY rating DESC
+    """)
+    return {
+        row['model_name']: {
+            'rating': round(float(row['rating']), 2),
+            'rd': round(float(row['rd']), 2),
+            'volatility': round(float(row['volatility']), 5),
+            'wins': int(row['wins']),
+            'losses': int(row['losses']),
+        }
+        for row in rows
+    }
+
+
+# ---------- windowed and decayed leaderboards ----------
+
+def get_window_pair_counts(since: datetime):
+    """(winner_model, loser_model, votes) summed over days >= since."""
+    rows = yield fetch_all("""
+        SELECT winner_model, loser_model, SUM(votes) as votes
+        FROM vote_pair_daily
+        WHERE day >= %s
+        GROUP BY winner_model, loser_model
+    """, (since,))
+    return [(row['winner_model'], row['loser_model'], int(row['votes'])) for row in rows]
+
+
+def get_daily_pair_counts(since: datetime):
+    """(day, winner_model, loser_model, votes) rows for days >= since."""
+    rows = yield fetch_all("""
+        SELECT day, winner_model, loser_model, votes
+        FROM vote_pair_daily
+        WHERE day >= %s
+    """, (since,))
+    return [(row['day'], row['winner_model'], row['loser_model'], int(row['votes'])) for row in rows]
+
+
+# ---------- per-segment Elo ----------
+
+def ensure_segment_ratings_table():
+    exists = yield table_exists('segment_elo_ratings')
+    if not exists:
+        print("⚠️  segment_elo_ratings table not found, creating...")
+        yield execute("""
+            CREATE TABLE segment_elo_ratings (
+                segment VARCHAR(100) NOT NULL,
+                model_name VARCHAR(255) NOT NULL,
+                rating DOUBLE PRECISION NOT NULL DEFAULT 1500.0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (segment, model_name)
+            );
+        """)
+        print("✅ segment_elo_ratings table created successfully")
+
+
+def update_segment_ratings(segments: List[str], winner_model: str, loser_model: str,
+                           k_factor: int = 32):
+    """
+    Elo update for one vote in every segment, as a single statement: the
+    current ratings are read, the update computed and both rows upserted
+    server-side (same formula as backend.elo.update_elo).
+
+    Returns:
+        Post-update rows (segment, model_name, rating, wins, losses)
+    """
+    if not segments or winner_model == loser_model:
+        return []
+    # As in update_ratings: create missing rows, then lock them (in key
+    # order) so the ratings the statement below reads can't go stale
+    keys = sorted({(segment, model) for segment in segments for model in (winner_model, loser_model)})
+    yield execute_many("""
+        INSERT INTO segment_elo_ratings (segment, model_name, rating, wins, losses)
+        VALUES (%s, %s, 1500.0, 0, 0)
+        ON CONFLICT (segment, model_name) DO NOTHING
+    """, keys)
+    yield fetch_all(f"""
+        SELECT segment, model_name FROM segment_elo_ratings
+        WHERE segment IN ({", ".join(["%s"] * len(segments))}) AND model_name IN (%s, %s)
+        ORDER BY segment, model_name
+        FOR UPDATE
+    """, (*segments, winner_model, loser_model))
+    values = ", ".join(["(%s, %s, %s)"] * len(segments))
+    params = [p for segment in segments for p in (segment, winner_model, loser_model)]
+    rows = yield fetch_all(f"""
+        WITH vote (segment, winner_model, loser_model) AS (VALUES {values}),
+        delta AS (
+            SELECT v.segment, v.winner_model, v.loser_model,
+                   COALESCE(w.rating, 1500.0) as winner_rating,
+                   COALESCE(l.rating, 1500.0) as loser_rating,
+                   %s / (1.0 + POWER(10.0, (COALESCE(w.rating, 1500.0) - COALESCE(l.rating, 1500.0)) / 400.0)) as points
+            FROM vote v
+            LEFT JOIN segment_elo_ratings w ON w.segment = v.segment AND w.model_name = v.winner_model
+            LEFT JOIN segment_elo_ratings l ON l.segment = v.segment AND l.model_name = v.loser_model
+        )
+        INSERT INTO segment_elo_ratings (segment, model_name, rating, wins, losses, updated_at)
+        SELECT * FROM (
+            SELECT segment, winner_model, winner_rating + points, 1, 0, CURRENT_TIMESTAMP FROM delta
+            UNION ALL
+            SELECT segment, loser_model, loser_rating - points, 0, 1, CURRENT_TIMESTAMP FROM delta
+        ) updates
+        WHERE true
+        ON CONFLICT (segment, model_name) DO UPDATE
+        SET rating = EXCLUDED.rating,
+            wins = segment_elo_ratings.wins + EXCLUDED.wins,
+            losses = segment_elo_ratings.losses + EXCLUDED.losses,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING segment, model_name, rating, wins, losses
+    """, (*params, float(k_factor)))
+    return rows
+
+
+def get_segment_ratings(segment: str):
+    rows = yield fetch_all("""
+        SELECT model_name, rating, wins, losses
+        FROM segment_elo_ratings
+        WHERE segment = %s
+        ORDER BY rating DESC
+    """, (segment,))
+    return {
+        row['model_name']: {
+            'rating': round(float(row['rating']), 2),
+            'wins': int(row['wins']),
+            'losses': int(row['losses']),
+        }
+        for row in rows
+    }
+
+
+def get_segment_summary():
+    """Models and votes per segment (each vote adds one win to its segment)."""
+    rows = yield fetch_all("""
+        SELECT segment, COUNT(*) as models, SUM(wins) as votes
+        FROM segment_elo_ratings
+        GROUP BY segment
+        ORDER BY segment
+    """)
+    return {row['segment']: {'models': int(row['models']), 'votes': int(row['votes'])} for row in rows}
+
+
+# ---------- matchmaking ----------
+
+def get_matchmaking_state():
+    """
+    Current Elo ratings and games per pair, read in one transaction.
+
+    Returns:
+        ({model_name: rating}, [(winner_model, loser_model, games)])
+    """
+    ratings = yield from get_all_ratings()
+    # vote_pair_daily holds the same counts as the vote log in far fewer rows
+    pair_counts = yield from get_window_pair_counts(datetime(1970, 1, 1))
+    return {model: r['rating'] for model, r in ratings.items()}, pair_counts
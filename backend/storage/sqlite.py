@@ -0,0 +1,122 @@
+"""
+Embedded SQLite storage backend.
+
+Zero-network storage for single-node deployments, CI and local benchmarks.
+File databases run in WAL mode so readers never block the writer, and each
+thread keeps its own connection open. Write plans take the write lock up
+front (BEGIN IMMEDIATE) so concurrent read-modify-write votes serialize
+instead of losing updates.
+
+URLs:
+  - sqlite:///data/nnn.db      relative path
+  - sqlite:////var/lib/nnn.db  absolute path
+  - sqlite:///:memory:         private in-memory database
+"""
+
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from . import queries
+from .base import SQLStorage
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def date_trunc(granularity: str, value):
+    """SQLite stand-in for Postgres date_trunc('hour' | 'day', ts)."""
+    if value is None:
+        return None
+    ts = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return queries.bucket_start(ts, granularity).isoformat(" ")
+
+
+def prepare_sql(sql: str) -> str:
+    """Translate the Postgres-flavoured SQL in queries.py for SQLite."""
+    # Row locks: BEGIN IMMEDIATE already holds the database write lock
+    return (sql.replace("%s", "?")
+               .replace("SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT")
+               .replace("FOR UPDATE", ""))
+
+
+def table_exists_sql(table: str) -> queries.Statement:
+    return queries.fetch_one("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s
+    """, (table,))
+
+
+def column_exists_sql(table: str, column: str) -> queries.Statement:
+    return queries.fetch_one("""
+        SELECT 1 FROM pragma_table_info(%s) WHERE name = %s
+    """, (table, column))
+
+
+def sqlite_path(url: str) -> str:
+    """Extract the database path from a sqlite:// URL."""
+    rest = url.split("://", 1)[1] if "://" in url else url
+    if rest in ("", "/", ":memory:", "/:memory:"):
+        return ":memory:"
+    return rest[1:] if rest.startswith("/") else rest
+
+
+class SQLiteStorage(SQLStorage):
+    """Storage in a local SQLite file (WAL mode) or in memory."""
+
+    def __init__(self, url: str):
+        super().__init__(url)
+        self.path = sqlite_path(url)
+        self._local = threading.local()
+        # An in-memory database only exists on one connection, so share it
+        self._shared = None
+        self._shared_lock = threading.RLock()
+        if self.path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,  # transactions are started explicitly in begin()
+            timeout=30,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.create_function("date_trunc", 2, date_trunc, deterministic=True)
+        # Math functions are only built into newer SQLite releases
+        conn.create_function("power", 2, math.pow, deterministic=True)
+        conn.create_function("floor", 1, math.floor, deterministic=True)
+        return conn
+
+    def connect(self):
+        if self.path == ":memory:":
+            self._shared_lock.acquire()
+            if self._shared is None:
+                self._shared = self._open()
+            return self._shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    def release(self, conn):
+        # Connections stay open for the life of the thread
+        if self.path == ":memory:":
+            self._shared_lock.release()
+
+    def begin(self, cursor, write: bool):
+        cursor.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+
+    def prepare(self, sql: str) -> str:
+        return prepare_sql(sql)
+
+    def table_exists_statement(self, table: str) -> queries.Statement:
+        return table_exists_sql(table)
+
+    def column_exists_statement(self, table: str, column: str) -> queries.Statement:
+        return column_exists_sql(table, column)
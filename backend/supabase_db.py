@@ -1,569 +1,347 @@
 """
-Supabase PostgreSQL database connection and utilities.
+Database access for ratings, vote tags and dimension scores.
+
+The storage backend is picked from the scheme of DATABASE_URL (see
+backend/storage):
+  - postgresql://...     Supabase / Postgres via psycopg2 (production)
+  - sqlite:///path.db    embedded SQLite in WAL mode (single node, CI, benchmarks)
 
 Requires environment variables:
-  - SUPABASE_URL: Your Supabase project URL
-  - SUPABASE_KEY: Your Supabase anon/public key
-  - DATABASE_URL: PostgreSQL connection string (optional, for direct psycopg2 connection)
+  - DATABASE_URL: Database URL. If unset, a local SQLite file at
+    data/nnn.db is used.
 """
 
 import os
+from datetime import datetime
 from typing import Optional, Dict, List
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import json
 from dotenv import load_dotenv
+from .elo import calc_prob, update_elo
+from .storage import open_storage, SQLStorage
+from . import tags as tag_weights
 
 # Load environment variables from .env (for local development)
 load_dotenv()
 
+DEFAULT_DATABASE_URL = "sqlite:///" + os.path.join(os.path.dirname(__file__), "..", "data", "nnn.db")
+
 # Get connection details from environment variable
 # This should be set in Render environment variables for production
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
-    raise ValueError(
-        "❌ DATABASE_URL environment variable not set!\n"
-        "Local: Add DATABASE_URL to .env file\n"
+    DATABASE_URL = DEFAULT_DATABASE_URL
+    print(
+        "⚠️  DATABASE_URL environment variable not set, using local SQLite database.\n"
         "Production: Add DATABASE_URL to Render environment variables"
     )
 
-# Track if we've already checked/initialized the database
-_db_initialized = False
+_storage: Optional[SQLStorage] = None
 
-def get_db_connection():
-    """Create and return a database connection."""
-    try:
-        conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        raise
 
-def calc_prob(r1, r2): # From classic elo model. 
-    return 1/(1 + 10**((r2 - r1)/400))
+def get_storage() -> SQLStorage:
+    """Return the process-wide storage backend for DATABASE_URL."""
+    global _storage
+    if _storage is None:
+        _storage = open_storage(DATABASE_URL)
+    return _storage
 
-def update_elo(p1_elo, p2_elo, winner):
-    if winner == "1":
-      prob_opposite = calc_prob(p2_elo, p1_elo)
-      S_0, S_1 = 1, -1
-    else:
-      prob_opposite = calc_prob(p1_elo, p2_elo)
-      S_0, S_1 = -1, 1
-    p1_new = p1_elo + 32 * S_0 * (prob_opposite)
-    p2_new = p2_elo + 32 * S_1 * (prob_opposite)
-    return p1_new, p2_new
 
 def init_database():
     """Initialize the elo_ratings table with starter models."""
-    global _db_initialized
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        
-        # Drop existing table if it exists
-        cursor.execute("DROP TABLE IF EXISTS elo_ratings;")
-        
-        # Create table
-        cursor.execute("""
-            CREATE TABLE elo_ratings (
-                id SERIAL PRIMARY KEY,
-                model_name VARCHAR(255) UNIQUE NOT NULL,
-                rating DECIMAL(10, 2) DEFAULT 1500.0,
-                wins INTEGER DEFAULT 0,
-                losses INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        
-        # Create index on model_name for fast lookups
-        cursor.execute("""
-            CREATE INDEX idx_elo_model_name ON elo_ratings(model_name);
-        """)
-        
-        # Insert starter models
-        starter_models = [
-            "OpenAI GPT-4o Mini",
-            "OpenAI GPT-4o",
-            "OpenAI GPT-3.5 Turbo",
-            "Claude 3 Haiku",
-            "Claude 3 Sonnet",
-            "Gemini 1.5 Pro",
-            "Gemini 2.0 Flash"
-        ]
-        
-        for model in starter_models:
-            cursor.execute("""
-                INSERT INTO elo_ratings (model_name, rating, wins, losses)
-                VALUES (%s, 1500.0, 0, 0);
-            """, (model,))
-        
-        conn.commit()
-        _db_initialized = True
-        print(f"✅ Database initialized with {len(starter_models)} models")
+        count = get_storage().init_database()
+        print(f"✅ Database initialized with {count} models")
     except Exception as e:
         print(f"Database initialization error: {e}")
-        conn.rollback()
         raise
-    finally:
-        cursor.close()
-        conn.close()
+
 
 def ensure_table_exists():
     """Check if table exists, initialize if not."""
-    global _db_initialized
-    
-    if _db_initialized:
-        return
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        # Check if table exists
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'elo_ratings'
-            );
-        """)
-        exists = cursor.fetchone()[0]
-        
-        if not exists:
-            print("⚠️  Table not found, initializing database...")
-            # Create the table in the same connection
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS elo_ratings (
-                    id SERIAL PRIMARY KEY,
-                    model_name VARCHAR(255) UNIQUE NOT NULL,
-                    rating DECIMAL(10, 2) DEFAULT 1500.0,
-                    wins INTEGER DEFAULT 0,
-                    losses INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_elo_model_name ON elo_ratings(model_name);
-            """)
-            
-            conn.commit()
-            print("✅ Database table created successfully")
-        
-        _db_initialized = True
-            
+        get_storage().ensure_table_exists()
     except Exception as e:
         print(f"Error with table: {e}")
-        conn.rollback()
         raise
-    finally:
-        cursor.close()
-        conn.close()
 
 
 def get_rating(model: str) -> float:
     """Get the current Elo rating for a model."""
-    ensure_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT rating FROM elo_ratings WHERE model_name = %s", (model,))
-        result = cursor.fetchone()
-        return result['rating'] if result else 1500.0
+        return get_storage().get_rating(model)
     except Exception as e:
         print(f"Error getting rating: {e}")
         return 1500.0
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def update_ratings(winner_model: str, loser_model: str, k_factor: int = 32) -> tuple:
+def update_ratings(winner_model: str, loser_model: str, k_factor: int = 32,
+                   segments: List[str] = None) -> tuple:
     """
     Update Elo ratings after a battle result.
-    
+
     Args:
         winner_model: Model that won the vote
         loser_model: Model that lost the vote
         k_factor: Points per game (default 32)
-        
+        segments: Segments the vote also counts toward (see backend.segments.vote_segments)
+
     Returns:
-        (new_winner_rating, new_loser_rating)
+        (new_winner_rating, new_loser_rating) in the global ratings
     """
-    ensure_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get current ratings - if model doesn't exist, insert it first with default 1500
-        cursor.execute("SELECT rating FROM elo_ratings WHERE model_name = %s", (winner_model,))
-        winner_result = cursor.fetchone()
-        
-        if not winner_result:
-            # Insert new model with default rating
-            cursor.execute("""
-                INSERT INTO elo_ratings (model_name, rating, wins, losses)
-                VALUES (%s, 1500.0, 0, 0)
-            """, (winner_model,))
-            winner_rating = 1500.0
-        else:
-            winner_rating = float(winner_result['rating'])
-        
-        cursor.execute("SELECT rating FROM elo_ratings WHERE model_name = %s", (loser_model,))
-        loser_result = cursor.fetchone()
-        
-        if not loser_result:
-            # Insert new model with default rating
-            cursor.execute("""
-                INSERT INTO elo_ratings (model_name, rating, wins, losses)
-                VALUES (%s, 1500.0, 0, 0)
-            """, (loser_model,))
-            loser_rating = 1500.0
-        else:
-            loser_rating = float(loser_result['rating'])
-        
-        # Calculate new ratings (pass "1" as string for winner)
-        new_winner_rating, new_loser_rating = update_elo(winner_rating, loser_rating, "1")
-        
-        # Update winner
-        cursor.execute("""
-            UPDATE elo_ratings 
-            SET rating = %s, wins = wins + 1, updated_at = CURRENT_TIMESTAMP
-            WHERE model_name = %s
-        """, (round(new_winner_rating, 2), winner_model))
-        
-        # Update loser
-        cursor.execute("""
-            UPDATE elo_ratings 
-            SET rating = %s, losses = losses + 1, updated_at = CURRENT_TIMESTAMP
-            WHERE model_name = %s
-        """, (round(new_loser_rating, 2), loser_model))
-        
-        conn.commit()
-        return new_winner_rating, new_loser_rating
-        
+        return get_storage().update_ratings(winner_model, loser_model, k_factor, segments)
     except Exception as e:
         print(f"Error updating ratings: {e}")
-        conn.rollback()
         raise
-    finally:
-        cursor.close()
-        conn.close()
 
 
 def get_all_ratings() -> Dict[str, Dict]:
     """Get all model ratings sorted by rating (highest first)."""
-    ensure_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT model_name, rating, wins, losses
-            FROM elo_ratings
-            ORDER BY rating DESC
-        """)
-        
-        ratings = {}
-        for row in cursor.fetchall():
-            ratings[row['model_name']] = {
-                'rating': float(row['rating']),
-                'wins': int(row['wins']),
-                'losses': int(row['losses'])
-            }
-        return ratings
-        
+        return get_storage().get_all_ratings()
     except Exception as e:
         print(f"Error fetching ratings: {e}")
         return {}
-    finally:
-        cursor.close()
-        conn.close()
 
 
 def reset_ratings():
     """Reset all ratings to default 1500."""
-    ensure_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE elo_ratings
-            SET rating = 1500.0, wins = 0, losses = 0, updated_at = CURRENT_TIMESTAMP
-        """)
-        conn.commit()
+        get_storage().reset_ratings()
         print("✅ Ratings reset successfully")
     except Exception as e:
         print(f"Error resetting ratings: {e}")
-        conn.rollback()
         raise
-    finally:
-        cursor.close()
-        conn.close()
 
 
 def ensure_tags_table_exists():
     """Check if vote_tags table exists, create if not."""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        # Check if table exists
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'vote_tags'
-            );
-        """)
-        exists = cursor.fetchone()[0]
-        
-        if not exists:
-            print("⚠️  vote_tags table not found, creating...")
-            cursor.execute("""
-                CREATE TABLE vote_tags (
-                    id SERIAL PRIMARY KEY,
-                    winner_model VARCHAR(255) NOT NULL,
-                    loser_model VARCHAR(255) NOT NULL,
-                    tag_name VARCHAR(100) NOT NULL,
-                    tag_category VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX idx_vote_tags_models ON vote_tags(winner_model, loser_model);
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX idx_vote_tags_name ON vote_tags(tag_name);
-            """)
-            
-            conn.commit()
-            print("✅ vote_tags table created successfully")
-        
+        get_storage().ensure_tags_table_exists()
     except Exception as e:
         print(f"Error with vote_tags table: {e}")
-        conn.rollback()
         raise
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def store_vote_tags(winner_model: str, loser_model: str, tags: List[str], 
+def ensure_tag_rollup_tables_exist():
+    """
+    Create the hourly and daily tag rollup tables if they don't exist.
+
+    Each row counts how often a tag was attached to a model in one role
+    (winner or loser) during one bucket. New tables are backfilled from
+    vote_tags.
+    """
+    try:
+        get_storage().ensure_tag_rollup_tables_exist()
+    except Exception as e:
+        print(f"Error with tag rollup tables: {e}")
+        raise
+
+
+def store_vote_tags(winner_model: str, loser_model: str, tags: List[str],
                     tag_categories: Dict[str, str] = None) -> bool:
     """
     Store tags for a vote.
-    
+
+    The hourly and daily tag rollups are updated in the same transaction.
+
     Args:
         winner_model: Model that won
         loser_model: Model that lost
         tags: List of tag names
         tag_categories: Optional dict mapping tag names to categories
-        
+
     Returns:
         True if successful
     """
-    ensure_tags_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        
-        for tag in tags:
-            category = tag_categories.get(tag, "unknown") if tag_categories else "unknown"
-            cursor.execute("""
-                INSERT INTO vote_tags (winner_model, loser_model, tag_name, tag_category)
-                VALUES (%s, %s, %s, %s)
-            """, (winner_model, loser_model, tag, category))
-        
-        conn.commit()
-        return True
-        
+        return get_storage().store_vote_tags(winner_model, loser_model, tags, tag_categories)
     except Exception as e:
         print(f"Error storing tags: {e}")
-        conn.rollback()
         raise
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_model_tag_distribution(model: str, as_winner: bool = True) -> Dict[str, float]:
+def get_tag_distribution(model: str, role: str = 'winner', start: datetime = None,
+                         end: datetime = None) -> Dict[str, float]:
     """
-    Get distribution of tags for a model's arguments.
-    
+    Get distribution of tags for a model over a time range.
+
+    Whole days are read from the daily rollup and only the ragged edges
+    from the hourly rollup. Bounds are resolved to whole hours.
+
     Args:
         model: Model name
-        as_winner: If True, get tags where model won. If False, tags where it lost.
-        
+        role: 'winner' for tags on votes the model won, 'loser' for votes it lost
+        start: Inclusive range start (None = beginning of time)
+        end: Exclusive range end (None = now)
+
     Returns:
-        Dict mapping tag names to their frequency (0.0-1.0)
+        Dict mapping tag names to their frequency (0.0-1.0), most frequent first
     """
-    ensure_tags_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if as_winner:
-            cursor.execute("""
-                SELECT tag_name, COUNT(*) as count
-                FROM vote_tags
-                WHERE winner_model = %s
-                GROUP BY tag_name
-                ORDER BY count DESC
-            """, (model,))
-        else:
-            cursor.execute("""
-                SELECT tag_name, COUNT(*) as count
-                FROM vote_tags
-                WHERE loser_model = %s
-                GROUP BY tag_name
-                ORDER BY count DESC
-            """, (model,))
-        
-        results = cursor.fetchall()
-        total = sum(r['count'] for r in results)
-        
-        if total == 0:
-            return {}
-        
-        return {
-            r['tag_name']: r['count'] / total
-            for r in results
-        }
-        
+        return get_storage().get_tag_distribution(model, role=role, start=start, end=end)
+    except ValueError:
+        raise
     except Exception as e:
         print(f"Error fetching tag distribution: {e}")
         return {}
-    finally:
-        cursor.close()
-        conn.close()
+
+
+def get_tag_time_series(model: str, role: str = 'winner', start: datetime = None,
+                        end: datetime = None, granularity: str = 'day',
+                        tag_name: str = None) -> List[Dict]:
+    """
+    Get per-bucket tag counts for a model.
+
+    Args:
+        model: Model name
+        role: 'winner' or 'loser'
+        start: Inclusive range start (None = beginning of time)
+        end: Exclusive range end (None = now)
+        granularity: 'hour' or 'day'
+        tag_name: Optional single tag to restrict the series to
+
+    Returns:
+        List of {"bucket_start", "total", "tags": {tag_name: count}} in time order
+    """
+    try:
+        return get_storage().get_tag_time_series(
+            model, role=role, start=start, end=end,
+            granularity=granularity, tag_name=tag_name
+        )
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching tag time series: {e}")
+        return []
+
+
+def get_tag_cooccurrence(tag: str = None, model: str = None, role: str = 'winner',
+                         sort: str = 'count', limit: int = 10, min_count: int = 1) -> Dict:
+    """
+    Slice the tag co-occurrence cube (see backend/tag_cube.py).
+
+    Args:
+        tag: Tag whose co-tags to list; None for the top tag pairs overall
+        model: Restrict to one model (None = all models)
+        role: 'winner' or 'loser'
+        sort: 'count' or 'lift'
+        limit: Number of co-tags / pairs to return
+        min_count: Skip co-tags / pairs seen together fewer times
+
+    Returns:
+        {tag, tag_votes, tagged_votes, co_tags: [{tag, category, count, conditional, lift}]}
+        or, without a tag, {tagged_votes, pairs: [{tags, count, lift}]}
+    """
+    try:
+        return get_storage().get_tag_cooccurrence(tag, model, role, sort, limit, min_count)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching tag co-occurrence: {e}")
+        raise
+
+
+def get_tag_heatmap(role: str = 'winner', metric: str = 'rate', min_votes: int = 1) -> Dict:
+    """
+    Model x tag matrix from the co-occurrence cube.
+
+    Args:
+        role: 'winner' or 'loser'
+        metric: 'count', 'rate' (share of the model's tagged votes) or 'lift'
+            (rate relative to all models)
+        min_votes: Skip models with fewer tagged votes
+
+    Returns:
+        {models, tags, tagged_votes, values} with values[i][j] for models[i], tags[j]
+    """
+    try:
+        return get_storage().get_tag_heatmap(role, metric, min_votes)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching tag heatmap: {e}")
+        raise
+
+
+def get_model_tag_distribution(model: str, as_winner: bool = True) -> Dict[str, float]:
+    """
+    Get distribution of tags for a model's arguments.
+
+    Args:
+        model: Model name
+        as_winner: If True, get tags where model won. If False, tags where it lost.
+
+    Returns:
+        Dict mapping tag names to their frequency (0.0-1.0)
+    """
+    return get_tag_distribution(model, role='winner' if as_winner else 'loser')
 
 
 def ensure_vote_dimension_scores_table_exists():
     """Create vote_dimension_scores table if it doesn't exist."""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        
-        # Check if table exists
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'vote_dimension_scores'
-            );
-        """)
-        exists = cursor.fetchone()[0]
-        
-        if not exists:
-            print("⚠️  vote_dimension_scores table not found, creating...")
-            cursor.execute("""
-                CREATE TABLE vote_dimension_scores (
-                    id SERIAL PRIMARY KEY,
-                    winner_model VARCHAR(255) NOT NULL,
-                    loser_model VARCHAR(255) NOT NULL,
-                    winner_empathy FLOAT DEFAULT 0.5,
-                    winner_aggressiveness FLOAT DEFAULT 0.5,
-                    winner_evidence_use FLOAT DEFAULT 0.5,
-                    winner_political_economic FLOAT DEFAULT 0.0,
-                    winner_political_social FLOAT DEFAULT 0.0,
-                    loser_empathy FLOAT DEFAULT 0.5,
-                    loser_aggressiveness FLOAT DEFAULT 0.5,
-                    loser_evidence_use FLOAT DEFAULT 0.5,
-                    loser_political_economic FLOAT DEFAULT 0.0,
-                    loser_political_social FLOAT DEFAULT 0.0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX idx_vote_dim_winner ON vote_dimension_scores(winner_model);
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX idx_vote_dim_loser ON vote_dimension_scores(loser_model);
-            """)
-            
-            conn.commit()
-            print("✅ vote_dimension_scores table created successfully")
-        
+        get_storage().ensure_vote_dimension_scores_table_exists()
     except Exception as e:
         print(f"Error with vote_dimension_scores table: {e}")
-        conn.rollback()
         raise
-    finally:
-        cursor.close()
-        conn.close()
+
+
+def ensure_dimension_rollups_table_exists():
+    """
+    Create model_dimension_rollups table if it doesn't exist.
+
+    The rollup holds Welford accumulators (count, mean and M2) per
+    (model, dimension) so reads never scan vote_dimension_scores. When the
+    table is first created it is backfilled from the existing vote rows.
+    """
+    try:
+        get_storage().ensure_dimension_rollups_table_exists()
+    except Exception as e:
+        print(f"Error with model_dimension_rollups table: {e}")
+        raise
 
 
 def store_dimension_scores(winner_model: str, loser_model: str,
                           winner_scores: Dict[str, float],
-                          loser_scores: Dict[str, float]) -> bool:
+                          loser_scores: Dict[str, float],
+                          weight_version: int = tag_weights.DEFAULT_WEIGHT_VERSION) -> bool:
     """
     Store dimension scores for both models in a vote.
-    
+
+    The per-model rollups are updated in the same transaction, so
+    aggregated reads always agree with the raw rows.
+
     Args:
         winner_model: Name of winning model
         loser_model: Name of losing model
         winner_scores: Dict of dimension scores for winner
         loser_scores: Dict of dimension scores for loser
-        
+        weight_version: Weight version the scores were computed with
+
     Returns:
         True if successful, False otherwise
     """
-    ensure_vote_dimension_scores_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO vote_dimension_scores 
-            (winner_model, loser_model, 
-             winner_empathy, winner_aggressiveness, winner_evidence_use,
-             winner_political_economic, winner_political_social,
-             loser_empathy, loser_aggressiveness, loser_evidence_use,
-             loser_political_economic, loser_political_social)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            winner_model, loser_model,
-            winner_scores.get('empathy', 0.5),
-            winner_scores.get('aggressiveness', 0.5),
-            winner_scores.get('evidence_use', 0.5),
-            winner_scores.get('political_economic', 0.0),
-            winner_scores.get('political_social', 0.0),
-            loser_scores.get('empathy', 0.5),
-            loser_scores.get('aggressiveness', 0.5),
-            loser_scores.get('evidence_use', 0.5),
-            loser_scores.get('political_economic', 0.0),
-            loser_scores.get('political_social', 0.0)
-        ))
-        
-        conn.commit()
-        return True
-        
+        return get_storage().store_dimension_scores(winner_model, loser_model, winner_scores, loser_scores,
+                                                    weight_version)
     except Exception as e:
         print(f"❌ Error storing dimension scores: {e}")
-        conn.rollback()
         return False
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_aggregated_dimension_scores(model_name: str = None) -> Dict:
+def get_aggregated_dimension_scores(model_name: str = None, confidence: float = 0.95) -> Dict:
     """
     Get aggregated dimension scores for models.
-    
+
+    Reads the per-model Welford accumulators and score histograms, so the
+    cost is O(models) regardless of how many votes have been recorded.
+    Quantiles are approximate (see backend/dimension_stats.py).
+
     Args:
         model_name: Optional specific model to get scores for.
                    If None, returns scores for all models.
-        
+        confidence: Coverage of the confidence intervals
+
     Returns:
         Dict mapping model names to averaged dimension scores
         Example:
@@ -574,176 +352,194 @@ def get_aggregated_dimension_scores(model_name: str = None) -> Dict:
                 "evidence_use": 0.81,
                 "political_economic": 0.05,
                 "political_social": -0.08,
-                "vote_count": 24
+                "vote_count": 24,
+                "stats": {
+                    "empathy": {"mean": 0.72, "variance": 0.031, "std_error": 0.036,
+                                "ci_low": 0.65, "ci_high": 0.79,
+                                "quantiles": {"p05": 0.41, "p25": 0.6, "p50": 0.74, "p75": 0.86, "p95": 0.97}},
+                    ...
+                }
             },
             ...
         }
     """
-    ensure_vote_dimension_scores_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Query for winner scores
-        if model_name:
-            cursor.execute("""
-                SELECT 
-                    winner_model as model_name,
-                    COUNT(*) as vote_count,
-                    AVG(winner_empathy) as empathy,
-                    AVG(winner_aggressiveness) as aggressiveness,
-                    AVG(winner_evidence_use) as evidence_use,
-                    AVG(winner_political_economic) as political_economic,
-                    AVG(winner_political_social) as political_social
-                FROM vote_dimension_scores
-                WHERE winner_model = %s
-                GROUP BY winner_model
-                UNION ALL
-                SELECT 
-                    loser_model as model_name,
-                    COUNT(*) as vote_count,
-                    AVG(loser_empathy) as empathy,
-                    AVG(loser_aggressiveness) as aggressiveness,
-                    AVG(loser_evidence_use) as evidence_use,
-                    AVG(loser_political_economic) as political_economic,
-                    AVG(loser_political_social) as political_social
-                FROM vote_dimension_scores
-                WHERE loser_model = %s
-                GROUP BY loser_model
-            """, (model_name, model_name))
-        else:
-            cursor.execute("""
-                SELECT 
-                    winner_model as model_name,
-                    COUNT(*) as vote_count,
-                    AVG(winner_empathy) as empathy,
-                    AVG(winner_aggressiveness) as aggressiveness,
-                    AVG(winner_evidence_use) as evidence_use,
-                    AVG(winner_political_economic) as political_economic,
-                    AVG(winner_political_social) as political_social
-                FROM vote_dimension_scores
-                GROUP BY winner_model
-                UNION ALL
-                SELECT 
-                    loser_model as model_name,
-                    COUNT(*) as vote_count,
-                    AVG(loser_empathy) as empathy,
-                    AVG(loser_aggressiveness) as aggressiveness,
-                    AVG(loser_evidence_use) as evidence_use,
-                    AVG(loser_political_economic) as political_economic,
-                    AVG(loser_political_social) as political_social
-                FROM vote_dimension_scores
-                GROUP BY loser_model
-                ORDER BY vote_count DESC
-            """)
-        
-        results = cursor.fetchall()
-        
-        # Aggregate winner and loser scores for each model
-        aggregated = {}
-        for row in results:
-            model = row['model_name']
-            if model not in aggregated:
-                aggregated[model] = {
-                    'vote_count': 0,
-                    'scores': {'empathy': [], 'aggressiveness': [], 'evidence_use': [],
-                              'political_economic': [], 'political_social': []}
-                }
-            
-            aggregated[model]['vote_count'] += row['vote_count']
-            aggregated[model]['scores']['empathy'].append(row['empathy'])
-            aggregated[model]['scores']['aggressiveness'].append(row['aggressiveness'])
-            aggregated[model]['scores']['evidence_use'].append(row['evidence_use'])
-            aggregated[model]['scores']['political_economic'].append(row['political_economic'])
-            aggregated[model]['scores']['political_social'].append(row['political_social'])
-        
-        # Average the scores
-        final_result = {}
-        for model, data in aggregated.items():
-            scores = data['scores']
-            final_result[model] = {
-                'empathy': round(sum(scores['empathy']) / len(scores['empathy']), 3),
-                'aggressiveness': round(sum(scores['aggressiveness']) / len(scores['aggressiveness']), 3),
-                'evidence_use': round(sum(scores['evidence_use']) / len(scores['evidence_use']), 3),
-                'political_economic': round(sum(scores['political_economic']) / len(scores['political_economic']), 3),
-                'political_social': round(sum(scores['political_social']) / len(scores['political_social']), 3),
-                'vote_count': data['vote_count']
-            }
-        
-        return final_result
-        
+        return get_storage().get_aggregated_dimension_scores(model_name, confidence)
     except Exception as e:
         print(f"❌ Error getting aggregated dimension scores: {e}")
         return {}
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_dimension_leaderboard(dimension: str, limit: int = 10) -> List[Dict]:
+def refresh_dimension_weights() -> tag_weights.WeightSet:
+    """
+    Make sure new votes are scored with the latest activated weight version.
+
+    The active version is re-read from dimension_weight_versions at most
+    every DIMENSION_WEIGHTS_MAX_STALENESS seconds; if that fails, the
+    weights in use are kept.
+
+    Returns:
+        The active tags.WeightSet
+    """
+    try:
+        return get_storage().refresh_dimension_weights()
+    except Exception as e:
+        print(f"⚠️  Could not refresh dimension weights: {e}")
+        return tag_weights.active_weights()
+
+
+def list_weight_versions() -> List[Dict]:
+    """All dimension weight versions ({version, weights, created_at, activated_at}), oldest first."""
+    try:
+        return get_storage().list_weight_versions()
+    except Exception as e:
+        print(f"❌ Error listing dimension weight versions: {e}")
+        raise
+
+
+def refresh_dimension_leaderboards():
+    """Reload the in-memory dimension leaderboards from the rollup table."""
+    get_storage().refresh_dimension_leaderboards()
+
+
+def get_dimension_leaderboard(dimension: str, limit: int = 10, min_votes: int = 1) -> List[Dict]:
     """
     Get leaderboard for a specific dimension.
-    
+
+    Served from the in-memory leaderboards, which are updated as votes are
+    stored and reloaded once older than DIMENSION_LEADERBOARD_MAX_STALENESS.
+    Ties are broken by vote count, then model name.
+
     Args:
         dimension: Name of dimension (empathy, aggressiveness, evidence_use, etc.)
         limit: Number of top models to return
-        
+        min_votes: Only rank models with at least this many votes
+
     Returns:
         List of dicts with model_name, score, and rank
     """
-    ensure_vote_dimension_scores_table_exists()
-    
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Map dimension name to column names
-        dim_columns = {
-            'empathy': ('winner_empathy', 'loser_empathy'),
-            'aggressiveness': ('winner_aggressiveness', 'loser_aggressiveness'),
-            'evidence_use': ('winner_evidence_use', 'loser_evidence_use'),
-            'political_economic': ('winner_political_economic', 'loser_political_economic'),
-            'political_social': ('winner_political_social', 'loser_political_social')
-        }
-        
-        if dimension not in dim_columns:
-            return []
-        
-        winner_col, loser_col = dim_columns[dimension]
-        
-        cursor.execute(f"""
-            SELECT 
-                model_name,
-                AVG(score) as avg_score,
-                COUNT(*) as vote_count,
-                ROW_NUMBER() OVER (ORDER BY AVG(score) DESC) as rank
-            FROM (
-                SELECT winner_model as model_name, {winner_col} as score FROM vote_dimension_scores
-                UNION ALL
-                SELECT loser_model as model_name, {loser_col} as score FROM vote_dimension_scores
-            ) combined
-            GROUP BY model_name
-            ORDER BY avg_score DESC
-            LIMIT %s
-        """, (limit,))
-        
-        results = cursor.fetchall()
-        return [
-            {
-                'rank': row['rank'],
-                'model_name': row['model_name'],
-                'score': round(float(row['avg_score']), 3),
-                'vote_count': row['vote_count']
-            }
-            for row in results
-        ]
+        return get_storage().get_dimension_leaderboard(dimension, limit=limit, min_votes=min_votes)
     except Exception as e:
         print(f"❌ Error getting dimension leaderboard: {e}")
         return []
-    finally:
-        cursor.close()
-        conn.close()
+
+
+def get_pair_counts() -> List[tuple]:
+    """Get (winner_model, loser_model, wins) counts aggregated from the vote log."""
+    try:
+        return get_storage().get_pair_counts()
+    except Exception as e:
+        print(f"Error fetching pair counts: {e}")
+        raise
+
+
+def publish_bt_ratings(results: Dict[str, Dict]) -> int:
+    """
+    Replace the published Bradley-Terry ratings with a new fit.
+
+    Args:
+        results: Output of backend.bradley_terry.fit_with_intervals
+
+    Returns:
+        Number of models written
+    """
+    rows = [
+        (model, r['rating'], r['ci_lower'], r['ci_upper'], r['wins'], r['losses'])
+        for model, r in results.items()
+    ]
+    try:
+        return get_storage().replace_bt_ratings(rows)
+    except Exception as e:
+        print(f"❌ Error publishing Bradley-Terry ratings: {e}")
+        raise
+
+
+def get_bt_ratings() -> Dict[str, Dict]:
+    """Get the latest published Bradley-Terry ratings, highest first."""
+    try:
+        return get_storage().get_bt_ratings()
+    except Exception as e:
+        print(f"Error fetching Bradley-Terry ratings: {e}")
+        return {}
+
+
+def get_glicko_ratings() -> Dict[str, Dict]:
+    """Get Glicko-2 ratings (rating, rd, volatility), highest first."""
+    try:
+        return get_storage().get_glicko_ratings()
+    except Exception as e:
+        print(f"Error fetching Glicko-2 ratings: {e}")
+        return {}
+
+
+def get_windowed_ratings(days: int) -> Dict[str, Dict]:
+    """
+    Get Bradley-Terry ratings fitted on the last `days` days of votes.
+
+    Args:
+        days: Window length; one of backend.windowed.WINDOWS_DAYS (7, 30, 90)
+
+    Returns:
+        Dict mapping model names to {rating, wins, losses}, highest first
+    """
+    try:
+        return get_storage().get_windowed_ratings(days)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching windowed ratings: {e}")
+        return {}
+
+
+def get_decayed_ratings(half_life_days: float) -> Dict[str, Dict]:
+    """
+    Get Bradley-Terry ratings with each vote weighted by 0.5 ** (age / half_life_days).
+
+    Returns:
+        Dict mapping model names to {rating, wins, losses} (effective counts), highest first
+    """
+    try:
+        return get_storage().get_decayed_ratings(half_life_days)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching decayed ratings: {e}")
+        return {}
+
+
+def get_segment_ratings(segment: str) -> Dict[str, Dict]:
+    """
+    Get Elo ratings within one segment.
+
+    Args:
+        segment: A mode ("battle", "debate"), optionally with a topic category ("debate:economy")
+
+    Returns:
+        Dict mapping model names to {rating, wins, losses}, highest first
+    """
+    try:
+        return get_storage().get_segment_ratings(segment)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error fetching segment ratings: {e}")
+        return {}
+
+
+def get_matchmaking_pair() -> Optional[Dict]:
+    """
+    Propose the battle pair whose outcome is expected to tell the most about the ranking.
+
+    Returns:
+        {model_a, model_b, win_probability, expected_information, rating_a,
+        rating_b, rd_a, rd_b}, or None with fewer than two rated models
+    """
+    try:
+        return get_storage().get_matchmaking_pair()
+    except Exception as e:
+        print(f"Error proposing a battle pair: {e}")
+        return None
 
 
 # Note: Do NOT define FastAPI app here. This is a utility module only.
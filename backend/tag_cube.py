@@ -0,0 +1,225 @@
+"""
+Tag co-occurrence cube for tag analytics.
+
+Counts of (model, role, tag, co_tag) over tagged votes are maintained in the
+tag_cooccurrence table with every store_vote_tags write: a vote with k
+distinct tags adds k * k cells for the winner and for the loser (the
+diagonal, tag == co_tag, counts the votes carrying the tag). tag_vote_totals
+holds the number of tagged votes per (model, role). Computing the same from
+vote_tags on the fly is a self-join that grows quadratically with tags per
+vote.
+
+Each process keeps the whole cube as one NumPy array
+(models x roles x tags x tags), so slices are array reductions:
+
+  - cooccurrence(): co-tags of one tag, with P(co_tag | tag) and
+    lift = N * n(tag, co_tag) / (n(tag) * n(co_tag))
+  - top_pairs(): the most co-occurring tag pairs
+  - heatmap(): model x tag counts, rates (share of the model's tagged
+    votes) or lift against all models
+
+Votes stored by this process are applied in place; the cube is reloaded from
+the database after a max-staleness timer to pick up other workers' votes.
+
+Environment variables:
+  - TAG_CUBE_MAX_STALENESS: seconds before the cube is reloaded (default 60)
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .tags import TAG_CATEGORY, TAG_IDS, TAG_NAMES
+
+ROLES = ('winner', 'loser')
+SORTS = ('count', 'lift')
+HEATMAP_METRICS = ('count', 'rate', 'lift')
+
+MAX_STALENESS_SECONDS = float(os.getenv("TAG_CUBE_MAX_STALENESS", "60"))
+
+_lock = threading.Lock()
+
+_models: List[str] = []
+_index: Dict[str, int] = {}
+# models x roles x tags x tags
+_pairs = np.zeros((0, len(ROLES), len(TAG_NAMES), len(TAG_NAMES)), dtype=np.int64)
+# models x roles
+_totals = np.zeros((0, len(ROLES)), dtype=np.int64)
+
+_loaded_at: Optional[float] = None
+
+
+def is_stale(max_staleness: float = None) -> bool:
+    """True if the cube was never loaded or is older than max_staleness seconds."""
+    if max_staleness is None:
+        max_staleness = MAX_STALENESS_SECONDS
+    return _loaded_at is None or (time.monotonic() - _loaded_at) > max_staleness
+
+
+def load(pair_rows: List[Dict], total_rows: List[Dict]):
+    """
+    Replace the cube.
+
+    Args:
+        pair_rows: Dicts with model_name, role, tag_name, co_tag, pair_count
+        total_rows: Dicts with model_name, role, tagged_votes
+    """
+    global _models, _index, _pairs, _totals, _loaded_at
+    models = sorted({row['model_name'] for row in pair_rows} | {row['model_name'] for row in total_rows})
+    index = {m: i for i, m in enumerate(models)}
+    pairs = np.zeros((len(models), len(ROLES), len(TAG_NAMES), len(TAG_NAMES)), dtype=np.int64)
+    totals = np.zeros((len(models), len(ROLES)), dtype=np.int64)
+
+    # Tags no longer in the vocabulary are dropped
+    known = [row for row in pair_rows
+             if row['role'] in ROLES and row['tag_name'] in TAG_IDS and row['co_tag'] in TAG_IDS]
+    if known:
+        cells = np.array([
+            (index[row['model_name']], ROLES.index(row['role']), TAG_IDS[row['tag_name']], TAG_IDS[row['co_tag']])
+            for row in known
+        ])
+        np.add.at(pairs, tuple(cells.T), np.array([int(row['pair_count']) for row in known]))
+    for row in total_rows:
+        if row['role'] in ROLES:
+            totals[index[row['model_name']], ROLES.index(row['role'])] += int(row['tagged_votes'])
+
+    with _lock:
+        _models, _index, _pairs, _totals = models, index, pairs, totals
+        _loaded_at = time.monotonic()
+
+
+def apply_vote(winner_model: str, loser_model: str, tags: List[str]):
+    """Add one tagged vote stored by this process to the cube."""
+    global _models, _pairs, _totals
+    ids = sorted({TAG_IDS[tag] for tag in tags if tag in TAG_IDS})
+    if _loaded_at is None or not ids:
+        return
+    with _lock:
+        for model in (winner_model, loser_model):
+            if model not in _index:
+                _index[model] = len(_models)
+                _models = _models + [model]
+                _pairs = np.concatenate([_pairs, np.zeros((1,) + _pairs.shape[1:], dtype=np.int64)])
+                _totals = np.concatenate([_totals, np.zeros((1, len(ROLES)), dtype=np.int64)])
+        cells = np.ix_(ids, ids)
+        for role, model in enumerate((winner_model, loser_model)):
+            _pairs[_index[model], role][cells] += 1
+            _totals[_index[model], role] += 1
+
+
+def _slice(model: Optional[str], role: str):
+    """(tags x tags counts, tagged votes) for one model, or summed over models."""
+    r = ROLES.index(role)
+    if model is None:
+        return _pairs[:, r].sum(axis=0), int(_totals[:, r].sum())
+    i = _index.get(model)
+    if i is None:
+        return np.zeros(_pairs.shape[2:], dtype=np.int64), 0
+    return _pairs[i, r], int(_totals[i, r])
+
+
+def _lift(pairs: np.ndarray, total: int) -> np.ndarray:
+    counts = np.diag(pairs).astype(float)
+    expected = np.outer(counts, counts)
+    return np.divide(total * pairs, expected, out=np.zeros(pairs.shape), where=expected > 0)
+
+
+def _order(values: np.ndarray, counts: np.ndarray, keep: np.ndarray, sort: str, limit: int) -> np.ndarray:
+    candidates = np.flatnonzero(keep)
+    primary = values[candidates] if sort == 'lift' else counts[candidates]
+    # Ties on the primary key go to the more frequent pair
+    order = np.lexsort((-counts[candidates], -primary))
+    return candidates[order[:limit]]
+
+
+def cooccurrence(tag: str, model: str = None, role: str = 'winner', sort: str = 'count',
+                 limit: int = 10, min_count: int = 1) -> Dict:
+    """
+    Tags most often selected together with tag.
+
+    Returns:
+        {tag, tag_votes, tagged_votes, co_tags: [{tag, count, conditional, lift}]}
+    """
+    t = TAG_IDS[tag]
+    with _lock:
+        pairs, total = _slice(model, role)
+        lift = _lift(pairs, total)[t]
+        row = pairs[t].copy()
+    tag_votes = int(row[t])
+    keep = (row >= max(min_count, 1)) & (np.arange(len(row)) != t)
+    co_tags = [
+        {
+            'tag': TAG_NAMES[j],
+            'category': TAG_CATEGORY[TAG_NAMES[j]],
+            'count': int(row[j]),
+            'conditional': round(row[j] / tag_votes, 4) if tag_votes else 0.0,
+            'lift': round(float(lift[j]), 4),
+        }
+        for j in _order(lift, row, keep, sort, limit)
+    ]
+    return {'tag': tag, 'tag_votes': tag_votes, 'tagged_votes': total, 'co_tags': co_tags}
+
+
+def top_pairs(model: str = None, role: str = 'winner', sort: str = 'count',
+              limit: int = 10, min_count: int = 1) -> Dict:
+    """
+    Most co-occurring tag pairs (each unordered pair once).
+
+    Returns:
+        {tagged_votes, pairs: [{tags: [a, b], count, lift}]}
+    """
+    with _lock:
+        pairs, total = _slice(model, role)
+        lift = _lift(pairs, total)
+        counts = pairs.copy()
+    upper = np.triu(np.ones(counts.shape, dtype=bool), k=1)
+    keep = upper & (counts >= max(min_count, 1))
+    n = counts.shape[1]
+    results = []
+    for k in _order(lift.ravel(), counts.ravel(), keep.ravel(), sort, limit):
+        a, b = divmod(int(k), n)
+        results.append({
+            'tags': [TAG_NAMES[a], TAG_NAMES[b]],
+            'count': int(counts[a, b]),
+            'lift': round(float(lift[a, b]), 4),
+        })
+    return {'tagged_votes': total, 'pairs': results}
+
+
+def heatmap(role: str = 'winner', metric: str = 'rate', min_votes: int = 1) -> Dict:
+    """
+    Model x tag matrix.
+
+    Args:
+        metric: 'count' (votes with the tag), 'rate' (share of the model's
+            tagged votes) or 'lift' (rate relative to the rate over all models)
+        min_votes: Skip models with fewer tagged votes
+
+    Returns:
+        {models, tags, tagged_votes, values} with values[i][j] for models[i], tags[j]
+    """
+    r = ROLES.index(role)
+    with _lock:
+        models = list(_models)
+        counts = np.diagonal(_pairs[:, r], axis1=1, axis2=2).astype(float)
+        totals = _totals[:, r].astype(float)
+    keep = totals >= max(min_votes, 1)
+    counts, totals = counts[keep], totals[keep]
+    models = [m for m, k in zip(models, keep) if k]
+
+    if metric == 'count':
+        values = counts
+    else:
+        values = counts / totals[:, None] if len(totals) else counts
+        if metric == 'lift':
+            overall = counts.sum(axis=0) / max(totals.sum(), 1.0)
+            values = np.divide(values, overall, out=np.zeros_like(values), where=overall > 0)
+    return {
+        'models': models,
+        'tags': list(TAG_NAMES),
+        'tagged_votes': [int(t) for t in totals],
+        'values': np.round(values, 4).tolist(),
+    }
@@ -6,9 +6,13 @@ Collects voter perspective through tags explaining why an argument won,
 and maps those tags to numerical dimensions for analysis.
 """
 
-from typing import List, Dict
+import os
+import time
+from typing import Iterable, List, Dict, NamedTuple, Optional
 from enum import Enum
 
+import numpy as np
+
 
 class TagCategory(str, Enum):
     TONE = "tone"
@@ -108,6 +112,99 @@ DIMENSIONS = {
 }
 
 
+# ---------- compiled index ----------
+# Built once at import so per-vote work is array lookups instead of dict scans.
+
+# Tag ID table: every categorized tag, then any weighted tag without a category
+TAG_NAMES = tuple(dict.fromkeys(
+    [tag for tags in TAGS_BY_CATEGORY.values() for tag in tags] + list(DIMENSION_WEIGHTS)
+))
+TAG_IDS = {tag: i for i, tag in enumerate(TAG_NAMES)}
+
+# Tags accepted in votes, and the category stored with each
+VALID_TAGS = frozenset(tag for tags in TAGS_BY_CATEGORY.values() for tag in tags)
+TAG_CATEGORY = {tag: category.value for category, tags in TAGS_BY_CATEGORY.items() for tag in tags}
+TAG_DESCRIPTIONS = {tag: text for tags in TAGS_BY_CATEGORY.values() for tag, text in tags.items()}
+
+DIMENSION_NAMES = tuple(DIMENSIONS)
+DIMENSION_INDEX = {dim: j for j, dim in enumerate(DIMENSION_NAMES)}
+
+
+# Version number of DIMENSION_WEIGHTS above; later versions live in the database
+DEFAULT_WEIGHT_VERSION = 1
+
+_DIM_MIN = np.array([DIMENSIONS[d]["min"] for d in DIMENSION_NAMES])
+_DIM_MAX = np.array([DIMENSIONS[d]["max"] for d in DIMENSION_NAMES])
+_DIM_DEFAULT = np.array([DIMENSIONS[d]["default"] for d in DIMENSION_NAMES])
+_DIM_BOUNDS = tuple((d, DIMENSIONS[d]["min"], DIMENSIONS[d]["max"], DIMENSIONS[d]["default"])
+                    for d in DIMENSION_NAMES)
+
+
+class WeightSet(NamedTuple):
+    """One version of the tag -> dimension weights, compiled for scoring."""
+    version: int
+    weights: Dict[str, Dict[str, float]]
+    matrix: np.ndarray  # tags x dimensions
+    mask: np.ndarray    # 1.0 where a tag has a weight for a dimension (counts toward its average)
+    rows: Dict[str, tuple]  # tag -> ((dimension index, weight), ...) for single-vote scoring
+
+
+def validate_weights(weights: Dict[str, Dict[str, float]]):
+    """Raise ValueError unless weights maps known tags to known dimensions with weights in [-1, 1]."""
+    for tag, dims in weights.items():
+        if tag not in TAG_IDS:
+            raise ValueError(f"Unknown tag in weights: {tag}")
+        for dim, weight in dims.items():
+            if dim not in DIMENSION_INDEX:
+                raise ValueError(f"Unknown dimension for {tag}: {dim}")
+            if not -1.0 <= float(weight) <= 1.0:
+                raise ValueError(f"Weight for {tag}.{dim} must be in [-1, 1], got {weight}")
+
+
+def compile_weights(weights: Dict[str, Dict[str, float]],
+                    version: int = DEFAULT_WEIGHT_VERSION) -> WeightSet:
+    """Compile tag -> {dimension: weight} into a WeightSet."""
+    validate_weights(weights)
+    matrix = np.zeros((len(TAG_NAMES), len(DIMENSION_NAMES)))
+    mask = np.zeros_like(matrix)
+    for tag, dims in weights.items():
+        for dim, weight in dims.items():
+            matrix[TAG_IDS[tag], DIMENSION_INDEX[dim]] = weight
+            mask[TAG_IDS[tag], DIMENSION_INDEX[dim]] = 1.0
+    rows = {
+        tag: tuple((DIMENSION_INDEX[dim], float(weight)) for dim, weight in dims.items())
+        for tag, dims in weights.items()
+    }
+    return WeightSet(version, weights, matrix, mask, rows)
+
+
+# The weight set new votes are scored with. Replaced as a whole, so readers
+# always see a consistent version.
+_active = compile_weights(DIMENSION_WEIGHTS)
+_active_checked_at: Optional[float] = None
+
+WEIGHTS_MAX_STALENESS_SECONDS = float(os.getenv("DIMENSION_WEIGHTS_MAX_STALENESS", "60"))
+
+
+def active_weights() -> WeightSet:
+    return _active
+
+
+def set_active_weights(version: int, weights: Dict[str, Dict[str, float]]):
+    """Switch to another weight version (as read from dimension_weight_versions)."""
+    global _active, _active_checked_at
+    if version != _active.version:
+        _active = compile_weights(weights, version)
+    _active_checked_at = time.monotonic()
+
+
+def weights_stale(max_staleness: float = None) -> bool:
+    """True if the active version was never checked against the database, or not recently."""
+    if max_staleness is None:
+        max_staleness = WEIGHTS_MAX_STALENESS_SECONDS
+    return _active_checked_at is None or (time.monotonic() - _active_checked_at) > max_staleness
+
+
 def validate_tag(tag_name: str) -> bool:
     """
     Check if a tag name is valid.
@@ -118,10 +215,7 @@ def validate_tag(tag_name: str) -> bool:
     Returns:
         True if tag exists, False otherwise
     """
-    for category_tags in TAGS_BY_CATEGORY.values():
-        if tag_name in category_tags:
-            return True
-    return False
+    return tag_name in VALID_TAGS
 
 
 def get_all_tags() -> Dict[str, Dict[str, str]]:
@@ -136,13 +230,67 @@ def get_all_tags() -> Dict[str, Dict[str, str]]:
 
 def get_tag_description(tag_name: str) -> str:
     """Get description for a specific tag."""
-    for category_tags in TAGS_BY_CATEGORY.values():
-        if tag_name in category_tags:
-            return category_tags[tag_name]
-    return ""
+    return TAG_DESCRIPTIONS.get(tag_name, "")
+
+
+def scores_from_counts(counts: np.ndarray, weight_set: WeightSet = None) -> np.ndarray:
+    """
+    Dimension scores for rows of tag counts.
+
+    Args:
+        counts: (n, len(TAG_NAMES)) array; counts[i, t] is how often tag t
+            was selected in tag set i
+        weight_set: Weights to score with (default: the active version)
+
+    Returns:
+        (n, len(DIMENSION_NAMES)) array of scores in each dimension's range
+    """
+    weight_set = weight_set or _active
+    totals = counts @ weight_set.matrix
+    weighted = counts @ weight_set.mask
+    avg_weight = np.divide(totals, weighted, out=np.zeros_like(totals), where=weighted > 0)
+
+    # Map from weight space [-1, 1] to dimension range:
+    # positive weights map [0, 1] to [default, max], negative [-1, 0] to [min, default]
+    span = np.where(avg_weight >= 0, _DIM_MAX - _DIM_DEFAULT, _DIM_DEFAULT - _DIM_MIN)
+    return np.clip(_DIM_DEFAULT + avg_weight * span, _DIM_MIN, _DIM_MAX)
+
+
+def tag_counts(tag_sets: Iterable[Iterable[str]]) -> np.ndarray:
+    """
+    Count matrix (n tag sets x len(TAG_NAMES)) for a batch of tag lists.
+    Unknown tags are ignored; repeated tags count once per occurrence.
+    """
+    rows, ids = [], []
+    n = 0
+    for i, tags in enumerate(tag_sets):
+        n = i + 1
+        for tag in tags:
+            tag_id = TAG_IDS.get(tag)
+            if tag_id is not None:
+                rows.append(i)
+                ids.append(tag_id)
+    flat = np.bincount(np.asarray(rows, dtype=np.int64) * len(TAG_NAMES) + np.asarray(ids, dtype=np.int64),
+                       minlength=n * len(TAG_NAMES))
+    return flat.reshape(n, len(TAG_NAMES)).astype(float)
+
+
+def calculate_dimension_scores_batch(tag_sets: Iterable[Iterable[str]],
+                                     weight_set: WeightSet = None) -> np.ndarray:
+    """
+    Score many tag sets at once (bulk imports, recomputation).
 
+    Args:
+        tag_sets: Iterable of tag-name lists
+        weight_set: Weights to score with (default: the active version)
 
-def calculate_dimension_scores(tags: List[str]) -> Dict[str, float]:
+    Returns:
+        (n, len(DIMENSION_NAMES)) array; row i matches calculate_dimension_scores(tag_sets[i])
+    """
+    return scores_from_counts(tag_counts(tag_sets), weight_set)
+
+
+def calculate_dimension_scores(tags: List[str], weight_set: WeightSet = None) -> Dict[str, float]:
     """
     Calculate dimension scores from selected tags.
     
@@ -153,6 +301,7 @@ def calculate_dimension_scores(tags: List[str]) -> Dict[str, float]:
     
     Args:
         tags: List of tag names (e.g., ["empathetic", "cites_evidence"])
+        weight_set: Weights to score with (default: the active version)
         
     Returns:
         Dict mapping dimension names to scores in their valid ranges
@@ -162,46 +311,24 @@ def calculate_dimension_scores(tags: List[str]) -> Dict[str, float]:
         >>> scores["empathy"]  # Will be high (0.8-1.0 range)
         >>> scores["evidence_use"]  # Will be high (0.8-1.0 range)
     """
-    # Initialize accumulation for each dimension
-    dimension_totals = {dim: 0.0 for dim in DIMENSIONS}
-    dimension_counts = {dim: 0 for dim in DIMENSIONS}
-    
-    # Aggregate weights from all selected tags
+    # A handful of tags is faster in plain Python over the compiled rows than
+    # through NumPy; the arithmetic matches scores_from_counts
+    rows = (weight_set or _active).rows
+    totals = [0.0] * len(DIMENSION_NAMES)
+    weighted = [0] * len(DIMENSION_NAMES)
     for tag in tags:
-        if tag in DIMENSION_WEIGHTS:
-            for dimension, weight in DIMENSION_WEIGHTS[tag].items():
-                dimension_totals[dimension] += weight
-                dimension_counts[dimension] += 1
-    
-    # Calculate averages and normalize to dimension ranges
+        for j, weight in rows.get(tag, ()):
+            totals[j] += weight
+            weighted[j] += 1
+
     scores = {}
-    for dimension, config in DIMENSIONS.items():
-        if dimension_counts[dimension] > 0:
-            avg_weight = dimension_totals[dimension] / dimension_counts[dimension]
-        else:
-            avg_weight = 0.0
-        
-        # Map from weight space [-1, 1] to dimension range
-        min_val = config["min"]
-        max_val = config["max"]
-        default = config["default"]
-        
-        # If weight is positive, map from [0, 1] to [default, max]
-        # If weight is negative, map from [-1, 0] to [min, default]
-        if avg_weight >= 0:
-            score = default + (avg_weight * (max_val - default))
-        else:
-            score = default + (avg_weight * (default - min_val))
-        
-        # Clamp to valid range (just to be safe)
-        scores[dimension] = max(min_val, min(max_val, score))
-    
+    for j, (dimension, low, high, default) in enumerate(_DIM_BOUNDS):
+        avg_weight = totals[j] / weighted[j] if weighted[j] else 0.0
+        score = default + avg_weight * ((high - default) if avg_weight >= 0 else (default - low))
+        scores[dimension] = max(low, min(high, score))
     return scores
 
 
 def get_tag_category(tag_name: str) -> str:
     """Get the category of a tag."""
-    for category, tags in TAGS_BY_CATEGORY.items():
-        if tag_name in tags:
-            return category.value
-    return ""
+    return TAG_CATEGORY.get(tag_name, "")
@@ -0,0 +1,128 @@
+"""
+Windowed and time-decayed leaderboards.
+
+Providers update models behind stable names, so an all-time Elo mixes the
+model of last year with today's. These leaderboards only look at recent
+votes:
+  - windowed: Bradley-Terry fit over the last 7, 30 or 90 days
+  - decayed:  Bradley-Terry fit where each vote is weighted by
+              0.5 ** (age_in_days / half_life_days)
+
+Both read the vote_pair_daily buckets (votes per day per winner/loser pair,
+maintained with every vote), so a fit touches at most days x pairs rows no
+matter how many votes were cast. Fitted boards are cached per process;
+half-lives are rounded to HALF_LIFE_STEP_DAYS first, so the cache has a
+bounded number of keys whatever clients ask for.
+
+Environment variables:
+  - WINDOWED_RATINGS_MAX_STALENESS: seconds a fitted board is served before
+    it is refit (default 60)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import bradley_terry
+
+WINDOWS_DAYS = (7, 30, 90)
+
+# Votes older than this many half-lives weigh < 0.1% and are skipped
+DECAY_HORIZON_HALF_LIVES = 10
+MAX_HALF_LIFE_DAYS = 365.0
+# Decayed boards are fitted (and cached) for multiples of this
+HALF_LIFE_STEP_DAYS = 0.5
+
+MAX_STALENESS_SECONDS = float(os.getenv("WINDOWED_RATINGS_MAX_STALENESS", "60"))
+
+_lock = threading.Lock()
+
+# (kind, parameter) -> (fitted_at, board)
+_cache: Dict[Tuple[str, float], Tuple[float, Dict[str, Dict]]] = {}
+
+
+def today() -> datetime:
+    """Start of the current UTC day (naive, like the stored buckets)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+
+
+def window_start(days: int) -> datetime:
+    """First day bucket included in a window of `days` days (today counts as one)."""
+    return today() - timedelta(days=days - 1)
+
+
+def quantize_half_life(half_life_days: float) -> float:
+    """Round a half-life to the nearest HALF_LIFE_STEP_DAYS (at least one step)."""
+    steps = max(1, round(half_life_days / HALF_LIFE_STEP_DAYS))
+    return steps * HALF_LIFE_STEP_DAYS
+
+
+def decay_start(half_life_days: float) -> datetime:
+    return today() - timedelta(days=int(np.ceil(half_life_days * DECAY_HORIZON_HALF_LIVES)))
+
+
+def _board(models: List[str], wins: np.ndarray) -> Dict[str, Dict]:
+    ratings = bradley_terry.fit(wins)
+    board = {
+        model: {
+            'rating': round(float(ratings[i]), 2),
+            'wins': round(float(wins[i].sum()), 2),
+            'losses': round(float(wins[:, i].sum()), 2),
+        }
+        for i, model in enumerate(models)
+    }
+    return dict(sorted(board.items(), key=lambda item: item[1]['rating'], reverse=True))
+
+
+def windowed_board(pair_counts: List[Tuple[str, str, int]]) -> Dict[str, Dict]:
+    """Fit a board from (winner_model, loser_model, votes) summed over the window."""
+    models, wins = bradley_terry.win_matrix(pair_counts)
+    return _board(models, wins)
+
+
+def decayed_board(daily_counts: List[Tuple[datetime, str, str, int]], half_life_days: float,
+                  now: datetime = None) -> Dict[str, Dict]:
+    """
+    Fit a board from (day, winner_model, loser_model, votes) rows with
+    exponentially decayed weights. Wins and losses are effective (weighted) counts.
+    """
+    now = now or today()
+    if not daily_counts:
+        return {}
+    days = np.array([
+        (now - (d if isinstance(d, datetime) else datetime.fromisoformat(str(d)))).days
+        for d, _, _, _ in daily_counts
+    ], dtype=float)
+    weights = 0.5 ** (np.maximum(days, 0.0) / half_life_days)
+    votes = np.array([v for _, _, _, v in daily_counts], dtype=float) * weights
+
+    models, wins = bradley_terry.win_matrix(
+        [(w, l, weight) for (_, w, l, _), weight in zip(daily_counts, votes)]
+    )
+    return _board(models, wins)
+
+
+def get_cached(kind: str, parameter: float, max_staleness: float = None) -> Optional[Dict[str, Dict]]:
+    """Return a cached board if it is fresher than max_staleness seconds."""
+    if max_staleness is None:
+        max_staleness = MAX_STALENESS_SECONDS
+    with _lock:
+        entry = _cache.get((kind, parameter))
+    if entry is None or (time.monotonic() - entry[0]) > max_staleness:
+        return None
+    return entry[1]
+
+
+def store(kind: str, parameter: float, board: Dict[str, Dict], max_staleness: float = None):
+    """Cache a fitted board, dropping boards that have gone stale."""
+    if max_staleness is None:
+        max_staleness = MAX_STALENESS_SECONDS
+    now = time.monotonic()
+    with _lock:
+        for key in [key for key, (fitted_at, _) in _cache.items() if now - fitted_at > max_staleness]:
+            del _cache[key]
+        _cache[(kind, parameter)] = (now, board)
@@ -131,7 +131,7 @@ def main():
     print()
     print("Results:")
     print(f"  - Run ID: {run_id}")
-    print(f"  - Per-run data: data/runs/{run_id}__*")
+    print(f"  - Per-run data: data/runs/answers/date=*/model=*/{run_id}.parquet")
     print(f"  - Aggregates: data/summary/aggregates.csv")
     print(f"  - Latest compass: assets/compass_latest.png")
     print()
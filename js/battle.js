@@ -69,6 +69,28 @@ document.addEventListener("DOMContentLoaded", () => {
     updateModelLabel(modelBSelect, modelBLabel);
   });
 
+  // Preselect the pair the server expects to learn the most from (the user can still change it)
+  function selectByDisplayName(selectElement, displayName) {
+    const option = Array.from(selectElement.options).find(o => o.text === displayName);
+    if (option) selectElement.value = option.value;
+    return Boolean(option);
+  }
+
+  fetch(`${API_CONFIG.BACKEND_URL}/api/matchmake`)
+    .then(res => (res.ok ? res.json() : null))
+    .then(pair => {
+      if (!pair) return;
+      const known = Array.from(modelASelect.options).map(o => o.text);
+      if (!known.includes(pair.model_a) || !known.includes(pair.model_b)) return;
+      selectByDisplayName(modelASelect, pair.model_a);
+      selectByDisplayName(modelBSelect, pair.model_b);
+      currentModelA = modelASelect.value;
+      currentModelB = modelBSelect.value;
+      updateModelLabel(modelASelect, modelALabel);
+      updateModelLabel(modelBSelect, modelBLabel);
+    })
+    .catch(err => console.warn("Matchmaking unavailable:", err));
+
   // --- Load and display 3 random questions from TSV ---
   fetch("./questions.tsv")
     .then(res => res.text())
@@ -224,6 +224,7 @@ document.addEventListener("DOMContentLoaded", () => {
           loser_model: loserModel,
           tags: tags,
           topic: currentTopic,
+          mode: "debate",
         }),
       });
 
@@ -303,6 +304,7 @@ document.addEventListener("DOMContentLoaded", () => {
           winner_model: winnerModel,
           loser_model: loserModel,
           prompt: currentTopic,
+          mode: "debate",
         }),
       });
 
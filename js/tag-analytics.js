@@ -12,6 +12,7 @@ document.addEventListener("DOMContentLoaded", async () => {
   let allModels = [];
   let allTags = {};
   let allDimensions = {};
+  let tagHeatmap = { models: [], tags: [], values: [] };
 
   // Show loading state
   loadingState.classList.remove("hidden");
@@ -37,12 +38,14 @@ document.addEventListener("DOMContentLoaded", async () => {
 
     // Display initial charts
     displayDimensions(allModels);
+    await loadTagHeatmap();
     displayTagFrequency();
 
     // Add event listeners
     modelFilter.addEventListener("change", () => {
       const filtered = modelFilter.value ? [modelFilter.value] : allModels;
       displayDimensions(filtered);
+      displayTagFrequency(modelFilter.value);
     });
 
     compareModel1.addEventListener("change", updateComparison);
@@ -159,7 +162,14 @@ document.addEventListener("DOMContentLoaded", async () => {
     });
   }
 
-  function displayTagFrequency() {
+  async function loadTagHeatmap() {
+    // Model x tag vote counts (winner role) from the tag co-occurrence cube
+    const resp = await fetch(`${API_CONFIG.BACKEND_URL}/api/tag-heatmap?metric=count`);
+    if (!resp.ok) throw new Error("Failed to fetch tag heatmap");
+    tagHeatmap = await resp.json();
+  }
+
+  function displayTagFrequency(model = "") {
     const tagCategories = {
       tone: document.getElementById("tone-tags"),
       reasoning: document.getElementById("reasoning-tags"),
@@ -167,11 +177,12 @@ document.addEventListener("DOMContentLoaded", async () => {
       content: document.getElementById("content-tags")
     };
 
-    // Generate sample tag frequencies (in production, query backend)
+    // Votes each tag was selected in, for one model or summed over all models
     const tagFrequencies = {};
-    Object.values(allTags).forEach((categoryTags, idx) => {
-      Object.keys(categoryTags).forEach(tag => {
-        tagFrequencies[tag] = Math.floor(Math.random() * 100) + 10;
+    tagHeatmap.models.forEach((name, i) => {
+      if (model && name !== model) return;
+      tagHeatmap.tags.forEach((tag, j) => {
+        tagFrequencies[tag] = (tagFrequencies[tag] || 0) + tagHeatmap.values[i][j];
       });
     });
 
@@ -2,95 +2,183 @@
 """
 tools/aggregate.py
 
-Compute per-run aggregates (economic and social) from CSV run outputs and save a summary CSV for plotting.
+Compute per-run aggregates (economic and social) from the run store
+(backend/run_store.py) and save a summary CSV for plotting.
+
+All runs are read in one columnar scan into a models x runs x questions tensor and scored in a
+single pass (see backend/compass.py). Each run also gets a bootstrap
+confidence region: --resamples question-level resamples are scored per
+model, with models spread over a process pool, and the per-axis intervals
+and ellipse parameters are written next to the point estimate. Runs that
+parsed less than --min-parsed of the bank get empty (NaN) regions.
 
 Usage:
   python tools/aggregate.py --indir data/runs --out summary/aggregates.csv
+  python tools/aggregate.py --normalization answered --out /tmp/aggregates_answered.csv
+  python tools/aggregate.py --resamples 0          # point estimates only
+  python tools/aggregate.py --min-parsed 0.8
 """
 
 import os
 import csv
 import argparse
-import json
-from collections import defaultdict
-from backend.utils import compute_axis_score
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from backend import run_store
+
+from backend.compass import (
+    DEFAULT_CONFIDENCE, DEFAULT_MIN_PARSED_FRACTION, DEFAULT_QUESTIONS_PATH, DEFAULT_RESAMPLES, NORMALIZATIONS,
+    REGION_COLUMNS,
+    bootstrap_positions, compass_positions, confidence_regions, load_question_bank,
+)
+
+# Fixed so that re-aggregating unchanged runs reproduces the same regions
+DEFAULT_SEED = 0
+# Runs bootstrapped at once per model (bounds memory to chunk x resamples x 2)
+BOOTSTRAP_CHUNK_RUNS = 512
+
+
+def load_run_scores(indir, bank):
+    """
+    Read every run in the store at indir into one score tensor.
+
+    One columnar scan of the answers dataset (plus the small runs table);
+    answers are placed into the tensor with array indexing, no per-row loop.
+
+    Args:
+        bank: backend.compass.QuestionBank the question axis is aligned with
+
+    Returns:
+        (files, models, run_ids, scores): files is a list of dicts with
+        run_id, model, parsed_fraction, run_timestamp and the tensor indices
+        m, r; scores is a models x runs x questions float array, NaN where a
+        run has no parsed answer (or doesn't exist for that model)
+    """
+    runs = run_store.read_runs(indir, columns=['run_id', 'model', 'parsed_fraction', 'run_timestamp'])
+    answers = run_store.read_answers(indir, columns=['run_id', 'model', 'question_id', 'parsed_score'])
+
+    run_rows = sorted(zip(runs.column('run_id').to_pylist(), runs.column('model').to_pylist(),
+                          runs.column('parsed_fraction').to_pylist(), runs.column('run_timestamp').to_pylist()))
+    models = sorted({model for _, model, _, _ in run_rows})
+    run_ids = sorted({run_id for run_id, _, _, _ in run_rows})
+    model_index = {m: i for i, m in enumerate(models)}
+    run_index = {r: i for i, r in enumerate(run_ids)}
+    files = [
+        {'run_id': run_id, 'model': model, 'parsed_fraction': fraction,
+         'run_timestamp': ts.isoformat() if ts is not None else None,
+         'm': model_index[model], 'r': run_index[run_id]}
+        for run_id, model, fraction, ts in run_rows
+    ]
+
+    def positions(column, values):
+        # Index of each row's value in values; -1 if absent (or null)
+        index = pc.index_in(pc.cast(answers.column(column), pa.string()), value_set=pa.array(values, pa.string()))
+        return pc.fill_null(index, -1).to_numpy(zero_copy_only=False)
 
+    m, r, q = positions('model', models), positions('run_id', run_ids), positions('question_id', bank.ids)
+    values = pc.cast(answers.column('parsed_score'), pa.float64()).to_numpy(zero_copy_only=False)
+    # Answers of runs without a runs row (an interrupted write) and of
+    # questions outside the bank are dropped
+    keep = (m >= 0) & (r >= 0) & (q >= 0) & np.isfinite(values)
 
-def aggregate_runs(indir, outpath):
+    scores = np.full((len(models), len(run_ids), len(bank.ids)), np.nan)
+    scores[m[keep], r[keep], q[keep]] = values[keep]
+
+    # Fallback for runs whose meta lacked parsed_fraction
+    missing = [f for f in files if f['parsed_fraction'] is None]
+    if missing:
+        total = np.zeros((len(models), len(run_ids)))
+        parsed = np.zeros((len(models), len(run_ids)))
+        known = (m >= 0) & (r >= 0)
+        np.add.at(total, (m[known], r[known]), 1)
+        np.add.at(parsed, (m[known], r[known]), np.isfinite(values[known]))
+        for f in missing:
+            f['parsed_fraction'] = parsed[f['m'], f['r']] / max(1, total[f['m'], f['r']])
+    return files, models, run_ids, scores
+
+
+def _bootstrap_model(task):
+    """Confidence regions of one model's runs (process pool worker)."""
+    scores, axis, sign, n_resamples, seed, normalization, confidence = task
+    rng = np.random.default_rng(seed)
+    regions = {column: [] for column in REGION_COLUMNS}
+    for start in range(0, len(scores), BOOTSTRAP_CHUNK_RUNS):
+        samples = bootstrap_positions(scores[start:start + BOOTSTRAP_CHUNK_RUNS], axis, sign,
+                                      n_resamples, rng, normalization)
+        for column, values in confidence_regions(samples, confidence).items():
+            regions[column].append(values)
+    return {column: np.concatenate(values) for column, values in regions.items()}
+
+
+def bootstrap_regions(files, models, scores, bank, n_resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE,
+                      normalization='bank', seed=DEFAULT_SEED, workers=None,
+                      min_parsed_fraction=DEFAULT_MIN_PARSED_FRACTION):
+    """
+    Bootstrap confidence regions for every run file.
+
+    Args:
+        files, models, scores: Output of load_run_scores
+        workers: Processes for the per-model bootstraps (default: one per
+            model up to the CPU count; 1 runs them in this process)
+        min_parsed_fraction: Runs below this parsed_fraction get NaN regions
+
+    Returns:
+        Dict of (m, r) -> {column: value} for REGION_COLUMNS
+    """
+    runs_of = {m: sorted({f['r'] for f in files if f['m'] == m}) for m in range(len(models))}
+    # One independent stream per model, whatever the worker count
+    seeds = np.random.SeedSequence(seed).spawn(len(models))
+    tasks = [
+        (scores[m, runs_of[m]], bank.axis, bank.sign, n_resamples, seeds[m], normalization, confidence)
+        for m in range(len(models))
+    ]
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_bootstrap_model, tasks))
+    else:
+        results = [_bootstrap_model(task) for task in tasks]
+
+    regions = {}
+    for m, result in enumerate(results):
+        for i, r in enumerate(runs_of[m]):
+            regions[(m, r)] = {column: float(result[column][i]) for column in REGION_COLUMNS}
+    for f in files:
+        if (f['parsed_fraction'] or 0.0) < min_parsed_fraction:
+            regions[(f['m'], f['r'])] = {column: float('nan') for column in REGION_COLUMNS}
+    return regions
+
+
+def aggregate_runs(indir, outpath, questions_path=DEFAULT_QUESTIONS_PATH, normalization='bank',
+                   n_resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, seed=DEFAULT_SEED, workers=None,
+                   min_parsed_fraction=DEFAULT_MIN_PARSED_FRACTION):
     os.makedirs(os.path.dirname(outpath), exist_ok=True)
-    # find CSV files
-    files = [f for f in os.listdir(indir) if f.endswith('.csv')]
+    bank = load_question_bank(questions_path)
+    files, models, _, scores = load_run_scores(indir, bank)
+    # models x runs x (economic, social), every run scored at once
+    positions = compass_positions(scores, bank.axis, bank.sign, normalization=normalization)
+    regions = {}
+    if n_resamples > 0 and files:
+        regions = bootstrap_regions(files, models, scores, bank, n_resamples, confidence, normalization, seed, workers,
+                                    min_parsed_fraction)
+
     summaries = []
-    for fn in files:
-        path = os.path.join(indir, fn)
-        # model is part of filename after __
-        parts = fn.split('__')
-        run_id = parts[0]
-        model = parts[1].rsplit('.csv', 1)[0] if len(parts) > 1 else 'unknown'
-        rows = []
-        with open(path, 'r', encoding='utf-8') as fh:
-            reader = csv.DictReader(fh)
-            for r in reader:
-                rows.append(r)
-        # group scores by axis using question bank mapping
-        # load question bank
-        import json
-        qbank = json.load(open('data/questions.json'))
-        qmap = {q['id']: q for q in qbank['questions']}
-        econ_scores = []
-        soc_scores = []
-        for r in rows:
-            qid = r['question_id']
-            score = r['parsed_score']
-            try:
-                s = float(score)
-            except Exception:
-                continue
-            q = qmap.get(qid)
-            if not q:
-                continue
-            # apply reverse
-            if q.get('reverse'):
-                s = -s
-            if q['axis'] == 'economic':
-                econ_scores.append(s)
-            else:
-                soc_scores.append(s)
-
-        econ_norm = compute_axis_score(econ_scores, max(1, sum(1 for q in qbank['questions'] if q['axis']=='economic')))
-        soc_norm = compute_axis_score(soc_scores, max(1, sum(1 for q in qbank['questions'] if q['axis']=='social')))
-
-        # try to find run-level meta (written by run_models)
-        meta_path = os.path.join(indir, f"{run_id}__{model}_meta.json")
-        parsed_fraction = None
-        run_timestamp = None
-        if os.path.exists(meta_path):
-            try:
-                meta = json.load(open(meta_path))
-                parsed_fraction = meta.get('parsed_fraction')
-                run_timestamp = meta.get('run_timestamp') or meta.get('created_at')
-            except Exception:
-                parsed_fraction = None
-
-        # fallback: compute parsed_fraction from CSV rows if meta missing
-        if parsed_fraction is None:
-            total = 0
-            parsed = 0
-            for r in rows:
-                total += 1
-                if r.get('parsed_score') not in (None, '', 'None'):
-                    parsed += 1
-            parsed_fraction = parsed / max(1, total)
-
-        # fallback timestamp from first row
-        if not run_timestamp and rows:
-            run_timestamp = rows[0].get('timestamp')
-
-        summaries.append({'run_id': run_id, 'model': model, 'economic': econ_norm, 'social': soc_norm, 'parsed_fraction': parsed_fraction, 'run_timestamp': run_timestamp})
+    for f in files:
+        econ_norm, soc_norm = (float(v) for v in positions[f['m'], f['r']])
+        summary = {'run_id': f['run_id'], 'model': f['model'], 'economic': econ_norm, 'social': soc_norm, 'parsed_fraction': f['parsed_fraction'], 'run_timestamp': f['run_timestamp']}
+        summary.update(regions.get((f['m'], f['r']), {}))
+        summaries.append(summary)
 
     # write out
     with open(outpath, 'w', newline='', encoding='utf-8') as fh:
         fieldnames = ['run_id', 'model', 'economic', 'social', 'parsed_fraction', 'run_timestamp']
+        if regions:
+            fieldnames += list(REGION_COLUMNS)
         writer = csv.DictWriter(fh, fieldnames=fieldnames)
         writer.writeheader()
         for s in summaries:
@@ -102,5 +190,16 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--indir', default='data/runs')
     parser.add_argument('--out', default='data/summary/aggregates.csv')
+    parser.add_argument('--questions', default=DEFAULT_QUESTIONS_PATH)
+    parser.add_argument('--normalization', choices=NORMALIZATIONS, default='bank',
+                        help='bank: as compute_axis_score; answered: ignore unparsed answers; likert: mean answer')
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES,
+                        help='Bootstrap resamples per run for confidence regions (0 = skip)')
+    parser.add_argument('--confidence', type=float, default=DEFAULT_CONFIDENCE)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--workers', type=int, default=None, help='Bootstrap processes (default: one per model, up to CPUs)')
+    parser.add_argument('--min-parsed', type=float, default=DEFAULT_MIN_PARSED_FRACTION,
+                        help='Leave the confidence region empty for runs with a lower parsed_fraction')
     args = parser.parse_args()
-    aggregate_runs(args.indir, args.out)
+    aggregate_runs(args.indir, args.out, args.questions, args.normalization,
+                   args.resamples, args.confidence, args.seed, args.workers, args.min_parsed)
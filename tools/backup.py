@@ -9,44 +9,19 @@ Usage:
   python -m tools.backup
   python -m tools.backup --backup-dir /backups/neural-net-neutrality
   python -m tools.backup --compress  # Create tar.gz instead of directory
+  python -m tools.backup --export-db --export-format parquet
 """
 
 import os
 import sys
 import argparse
 import shutil
-import glob
 from datetime import datetime
 import json
 
-# main.py
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from supabase_db import get_all_ratings
 
-app = FastAPI()
-
-# Enable CORS so frontend can access
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # or restrict to your domain
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.get("/api/ratings")
-def fetch_ratings():
-    """Return all model ratings as JSON."""
-    try:
-        ratings = get_all_ratings()
-        return {"success": True, "data": ratings}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-
-
-
-def backup_data(backup_dir='backups', compress=False, retention_days=None):
+def backup_data(backup_dir='backups', compress=False, retention_days=None,
+                export_db=False, export_format='csv'):
     """
     Create timestamped backup of critical data.
     
@@ -54,6 +29,8 @@ def backup_data(backup_dir='backups', compress=False, retention_days=None):
         backup_dir: Where to store backups
         compress: If True, create tar.gz; if False, create directory
         retention_days: Auto-remove backups older than this many days
+        export_db: If True, also export ratings and vote history (see tools/export.py)
+        export_format: 'csv' or 'parquet' for the database export
     """
     os.makedirs(backup_dir, exist_ok=True)
     
@@ -84,14 +61,14 @@ def backup_data(backup_dir='backups', compress=False, retention_days=None):
         print(f"✓ Backed up: {src}")
         files_backed_up += 1
     
-    # Backup latest run metadata
-    latest_meta = sorted(glob.glob('data/runs/*_meta_common.json'))
-    if latest_meta:
-        src = latest_meta[-1]
-        dst = os.path.join(backup_path, os.path.basename(src))
-        shutil.copy2(src, dst)
+    # Backup the run store (answers, run meta and question side table)
+    src = 'data/runs'
+    if os.path.isdir(src):
+        dst = os.path.join(backup_path, 'runs')
+        # Skip writers' in-progress temporary files
+        shutil.copytree(src, dst, ignore=shutil.ignore_patterns('.*.tmp'))
         print(f"✓ Backed up: {src}")
-        files_backed_up += 1
+        files_backed_up += sum(len(files) for _, _, files in os.walk(dst))
     
     # Backup questions.json
     src = 'data/questions.json'
@@ -101,6 +78,12 @@ def backup_data(backup_dir='backups', compress=False, retention_days=None):
         print(f"✓ Backed up: {src}")
         files_backed_up += 1
     
+    # Export ratings, vote tags and dimension scores from the database
+    if export_db:
+        from tools.export import export_tables
+        results = export_tables(outdir=os.path.join(backup_path, 'db'), fmt=export_format)
+        files_backed_up += sum(1 for r in results if r['path'])
+    
     # Create manifest
     manifest = {
         'timestamp': datetime.now().isoformat(),
@@ -202,6 +185,10 @@ def main():
                         help='Compress backups as tar.gz')
     parser.add_argument('--retention-days', type=int, default=None,
                         help='Auto-remove backups older than this many days')
+    parser.add_argument('--export-db', action='store_true',
+                        help='Also export ratings and vote history from the database')
+    parser.add_argument('--export-format', choices=['csv', 'parquet'], default='csv',
+                        help='Format for --export-db')
     parser.add_argument('--list', action='store_true',
                         help='List all available backups')
     
@@ -214,7 +201,9 @@ def main():
     backup_data(
         backup_dir=args.backup_dir,
         compress=args.compress,
-        retention_days=args.retention_days
+        retention_days=args.retention_days,
+        export_db=args.export_db,
+        export_format=args.export_format
     )
     return 0
 
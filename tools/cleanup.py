@@ -3,7 +3,9 @@
 tools/cleanup.py
 
 Cleanup old run data and maintain retention policy.
-Runs as part of post-run cleanup or separate cron job.
+Runs as part of post-run cleanup or separate cron job. Journals of complete
+runs are deleted whatever their age; an interrupted run keeps its journal
+(for run_models --resume) until it falls out of the retention window.
 
 Usage:
   python -m tools.cleanup --keep-days 90
@@ -14,49 +16,29 @@ import os
 import sys
 import argparse
 import glob
-from datetime import datetime, timedelta
-import json
+from datetime import datetime, timedelta, timezone
 
+from backend import run_journal, run_store
 
-def cleanup_old_runs(runs_dir='data/runs', keep_days=90):
-    """Remove runs older than keep_days."""
+
+def cleanup_old_runs(runs_dir='data/runs', keep_days=90, dry_run=False):
+    """Remove runs older than keep_days (whole date partitions of the run store) and finished journals."""
     if not os.path.exists(runs_dir):
         print(f"Runs directory not found: {runs_dir}")
         return 0
     
-    cutoff = datetime.now() - timedelta(days=keep_days)
-    removed_count = 0
-    
-    # Find all run files
-    for run_file in sorted(glob.glob(f"{runs_dir}/run_*.csv")):
-        try:
-            # Extract timestamp from filename: run_20251025T234436Z_...
-            filename = os.path.basename(run_file)
-            ts_str = filename.split('__')[0].split('_')[1]
-            run_date = datetime.strptime(ts_str, "%Y%m%dT%H%M%SZ")
-            
-            if run_date < cutoff:
-                print(f"[REMOVE] {run_file} (age: {(datetime.now() - run_date).days} days)")
-                os.remove(run_file)
-                removed_count += 1
-                
-                # Also remove associated meta files
-                base = run_file.rsplit('.', 1)[0]
-                for suffix in ['_meta.json', '.json']:
-                    meta_file = base + suffix
-                    if os.path.exists(meta_file):
-                        print(f"[REMOVE] {meta_file}")
-                        os.remove(meta_file)
-                        removed_count += 1
-        except Exception as e:
-            print(f"[ERROR] Processing {run_file}: {e}")
+    cutoff = datetime.now(timezone.utc) - timedelta(days=keep_days)
+    removed = run_store.remove_before(runs_dir, cutoff.date(), dry_run=dry_run)
+    removed += run_journal.remove_complete(runs_dir, dry_run=dry_run)
+    for path in removed:
+        print(f"[REMOVE] {path}")
     
-    print(f"\nCleanup complete: removed {removed_count} files")
-    print(f"Retention policy: keep {keep_days} days (cutoff: {cutoff.isoformat()})")
-    return removed_count
+    print(f"\nCleanup complete: removed {len(removed)} partitions and files")
+    print(f"Retention policy: keep {keep_days} days (cutoff: {cutoff.date().isoformat()})")
+    return len(removed)
 
 
-def cleanup_old_plots(plots_dir='data/plots', keep_days=90):
+def cleanup_old_plots(plots_dir='data/plots', keep_days=90, dry_run=False):
     """Remove old plot files."""
     if not os.path.exists(plots_dir):
         print(f"Plots directory not found: {plots_dir}")
@@ -70,7 +52,8 @@ def cleanup_old_plots(plots_dir='data/plots', keep_days=90):
             mtime = datetime.fromtimestamp(os.path.getmtime(plot_file))
             if mtime < cutoff:
                 print(f"[REMOVE] {plot_file}")
-                os.remove(plot_file)
+                if not dry_run:
+                    os.remove(plot_file)
                 removed_count += 1
         except Exception as e:
             print(f"[ERROR] Processing {plot_file}: {e}")
@@ -104,7 +87,7 @@ def main():
     parser.add_argument('--keep-days', type=int, default=90,
                         help='Number of days to retain (default: 90)')
     parser.add_argument('--runs-dir', default='data/runs',
-                        help='Directory containing run files')
+                        help='Run store root')
     parser.add_argument('--plots-dir', default='data/plots',
                         help='Directory containing plot files')
     parser.add_argument('--storage-report', action='store_true',
@@ -122,11 +105,11 @@ def main():
     
     # Cleanup runs
     print(f"Cleaning up runs older than {args.keep_days} days...")
-    removed = cleanup_old_runs(args.runs_dir, args.keep_days)
+    removed = cleanup_old_runs(args.runs_dir, args.keep_days, dry_run=args.dry_run)
     
     # Cleanup plots
     print(f"\nCleaning up plots older than {args.keep_days} days...")
-    removed += cleanup_old_plots(args.plots_dir, args.keep_days)
+    removed += cleanup_old_plots(args.plots_dir, args.keep_days, dry_run=args.dry_run)
     
     if args.storage_report:
         print(f"\nNew storage usage: {get_storage_usage()}")
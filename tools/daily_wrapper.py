@@ -8,6 +8,16 @@ Supports multi-provider models: OpenAI GPT, Anthropic Claude, Google Gemini.
 This script is suitable for local scheduling (cron) or CI (GitHub Actions). It requires the
 appropriate API keys to be available in the environment (OPENAI_API_KEY, ANTHROPIC_API_KEY, GEMINI_API_KEY).
 
+A run that ends incomplete (failed calls, e.g. a provider outage) is resumed from its journal
+up to --resume-attempts times, waiting RESUME_BACKOFF_SECONDS, then twice as long, and so on,
+so only the failed calls are made again. In CI the journal of a run that is still incomplete
+is uploaded as the run-journals artifact, to be resumed by hand with
+python -m tools.run_models --resume <run_id>.
+
+Environment variables:
+  - DAILY_RESUME_ATTEMPTS: default for --resume-attempts (default 3)
+  - DAILY_RESUME_BACKOFF_SECONDS: wait before the first resume (default 60)
+
 Usage:
   python -m tools.daily_wrapper --models gpt-4o-mini,claude-3-sonnet-20240229,gemini-2.0-flash
   python -m tools.daily_wrapper  # uses env $MODELS or default list
@@ -15,21 +25,52 @@ Usage:
 
 import os
 import sys
+import time
 import argparse
 import shutil
+from backend import run_store
 from backend.providers import infer_provider
 
+RESUME_ATTEMPTS = int(os.getenv("DAILY_RESUME_ATTEMPTS", "3"))
+RESUME_BACKOFF_SECONDS = float(os.getenv("DAILY_RESUME_BACKOFF_SECONDS", "60"))
+
+
+def run_until_complete(run_models, models, api_keys, runs_dir, attempts=RESUME_ATTEMPTS,
+                       backoff=RESUME_BACKOFF_SECONDS):
+    """
+    Run the models, then resume the run while its summary says it is incomplete.
+
+    Returns:
+        The run id (of a complete run, unless every resume attempt also failed)
+    """
+    run_id = run_models.run_models(models, api_keys=api_keys, outdir=runs_dir)
+    for attempt in range(attempts):
+        summary = run_store.read_summary(runs_dir, run_id) or {}
+        if summary.get('complete'):
+            break
+        wait = backoff * 2 ** attempt
+        print(f"Run {run_id} is incomplete; resuming in {wait:.0f}s (attempt {attempt + 1}/{attempts})")
+        time.sleep(wait)
+        run_models.run_models(models, api_keys=api_keys, outdir=runs_dir, resume=run_id)
+    else:
+        if not (run_store.read_summary(runs_dir, run_id) or {}).get('complete'):
+            print(f"WARNING: run {run_id} still incomplete; aggregating what was written")
+    return run_id
+
 
-def main(models, api_keys=None, runs_dir='data/runs', summary_out='data/summary/aggregates.csv', plots_out='data/plots'):
+def main(models, api_keys=None, runs_dir='data/runs', summary_out='data/summary/aggregates.csv', plots_out='data/plots',
+         resume_attempts=RESUME_ATTEMPTS):
     """
     Args:
         models: list of model names (e.g., ['gpt-4o-mini', 'claude-3-sonnet-20240229', 'gemini-2.0-flash'])
         api_keys: dict of provider -> api_key or None (will read from env)
         runs_dir, summary_out, plots_out: paths for outputs
+        resume_attempts: times to resume a run that ended incomplete
     """
     # lazy imports so module can be inspected without heavy deps
     from tools import run_models
     from tools import aggregate
+    from tools import fit_irt
     from tools import plot_runs
 
     api_keys = api_keys or {}
@@ -54,10 +95,16 @@ def main(models, api_keys=None, runs_dir='data/runs', summary_out='data/summary/
     print('Providers:', ', '.join(providers_needed))
     
     # Pass the api_keys dict or None; run_models will read from env as needed
-    run_id = run_models.run_models(models, api_keys=api_keys, outdir=runs_dir)
+    run_id = run_until_complete(run_models, models, api_keys, runs_dir, attempts=resume_attempts)
     
     print('Aggregation...')
     aggregate.aggregate_runs(runs_dir, summary_out)
+    # refit question / model IRT parameters, warm-started from last night's fit
+    try:
+        saved = fit_irt.refit(runs_dir, os.path.join(os.path.dirname(summary_out), 'irt_params.json'))
+        print(f"IRT refit: {saved['iterations']} iterations on {saved['observations']} answers")
+    except Exception as e:
+        print('IRT refit failed:', e)
     print('Plotting...')
     plot_runs.main(summary_out, plots_out)
     # copy latest compass image into root assets for the landing page
@@ -101,6 +148,8 @@ if __name__ == '__main__':
     parser.add_argument('--runs-dir', default='data/runs')
     parser.add_argument('--summary-out', default='data/summary/aggregates.csv')
     parser.add_argument('--plots-out', default='data/plots')
+    parser.add_argument('--resume-attempts', type=int, default=RESUME_ATTEMPTS,
+                        help='Times to resume a run that ended with failed calls (0 = never)')
     args = parser.parse_args()
     
     # Determine models list: CLI > env MODELS > sensible default
@@ -133,4 +182,5 @@ if __name__ == '__main__':
     if args.api_key_gemini:
         api_keys['gemini'] = args.api_key_gemini
     
-    main(models, api_keys=api_keys or None, runs_dir=args.runs_dir, summary_out=args.summary_out, plots_out=args.plots_out)
+    main(models, api_keys=api_keys or None, runs_dir=args.runs_dir, summary_out=args.summary_out, plots_out=args.plots_out,
+         resume_attempts=args.resume_attempts)
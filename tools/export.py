@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+tools/export.py
+
+Stream vote history out of the database into compressed CSV or Parquet.
+
+Exports votes, vote_tags, vote_dimension_scores and elo_ratings without
+loading a table into memory:
+  - Postgres: COPY (...) TO STDOUT straight into a gzip stream (CSV), or a
+    server-side cursor read in chunks (Parquet)
+  - SQLite: cursor.fetchmany() in chunks
+
+With --incremental only rows added since the previous export are written;
+the last exported id per table is kept in <outdir>/export_state.json.
+Ids are handed out before a transaction commits, so an export must not
+save a last id past a row that is still uncommitted:
+  - votes cast live commit within moments, so an export stops short of the
+    first row created within the last --safety-lag seconds
+  - tools/import_votes draws ids at the start of one long transaction and
+    writes historical created_at, so the lag can't cover it; an export
+    waits on its lock (queries.VOTE_IMPORT_LOCK) until the import ends elo_ratings is a small snapshot table and is always exported
+in full.
+
+Usage:
+  python -m tools.export
+  python -m tools.export --format parquet --outdir data/exports
+  python -m tools.export --incremental
+  python -m tools.export --tables vote_tags --chunk-size 50000
+  python -m tools.export --incremental --safety-lag 600
+"""
+
+import os
+import sys
+import csv
+import gzip
+import io
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from backend.storage import queries
+from backend.supabase_db import get_storage
+
+# table -> monotonically increasing id column used for incremental exports
+EXPORT_TABLES = {
+    'votes': 'id',
+    'vote_tags': 'id',
+    'vote_dimension_scores': 'id',
+    'elo_ratings': None,
+}
+
+STATE_FILE = 'export_state.json'
+DEFAULT_CHUNK_SIZE = 10000
+# Seconds a write transaction may take before its rows could be missed
+DEFAULT_SAFETY_LAG = 300
+
+
+def load_state(outdir):
+    """Read the last exported id per table (empty if no previous export)."""
+    path = os.path.join(outdir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(outdir, state):
+    """Write the export state atomically."""
+    path = os.path.join(outdir, STATE_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _ensure_tables(storage):
+    storage.ensure_table_exists()
+    storage.ensure_tags_table_exists()
+    storage.ensure_vote_dimension_scores_table_exists()
+
+
+def _settled_id(storage, cursor, table, id_col, since_id, safety_lag):
+    """Highest id below which every row was created at least safety_lag seconds ago."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=safety_lag)
+    cursor.execute(storage.prepare(f"""
+        SELECT COALESCE(MIN({id_col}) - 1, (SELECT COALESCE(MAX({id_col}), 0) FROM {table}))
+        FROM {table}
+        WHERE {id_col} > %s AND created_at >= %s
+    """), (since_id, cutoff))
+    return int(cursor.fetchone()[0])
+
+
+def _select_sql(table, id_col, low, high):
+    if id_col is None:
+        return f"SELECT * FROM {table}"
+    # Bounds are ints read from the database, so inlining them is safe (COPY takes no parameters)
+    return f"SELECT * FROM {table} WHERE {id_col} > {int(low)} AND {id_col} <= {int(high)} ORDER BY {id_col}"
+
+
+def _write_csv_chunks(cursor, fileobj, chunk_size):
+    rows_written = 0
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow([col[0] for col in cursor.description])
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        writer.writerows(rows)
+        rows_written += len(rows)
+    text.flush()
+    text.detach()
+    return rows_written
+
+
+def _write_parquet_chunks(cursor, path, chunk_size):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    rows_written = 0
+    writer = None
+    columns = None
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if columns is None:
+                columns = [col[0] for col in cursor.description]
+            if not rows:
+                break
+            batch = pa.Table.from_pydict({name: [row[i] for row in rows] for i, name in enumerate(columns)})
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema, compression='zstd')
+            else:
+                batch = batch.cast(writer.schema)
+            writer.write_table(batch)
+            rows_written += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows_written
+
+
+def export_table(storage, table, outdir, fmt='csv', since_id=0, chunk_size=DEFAULT_CHUNK_SIZE,
+                 safety_lag=DEFAULT_SAFETY_LAG):
+    """
+    Stream one table to outdir.
+
+    Args:
+        storage: Storage backend from backend.supabase_db.get_storage()
+        table: Table name (key of EXPORT_TABLES)
+        outdir: Output directory
+        fmt: 'csv' (gzip-compressed) or 'parquet'
+        since_id: Only export rows with id greater than this (ignored for snapshot tables)
+        chunk_size: Rows held in memory at a time on the cursor path
+        safety_lag: Leave rows created within this many seconds for the next export
+
+    Returns:
+        Dict with table, path (None if there was nothing new), rows, last_id
+    """
+    id_col = EXPORT_TABLES[table]
+    conn = storage.connect()
+    cursor = conn.cursor()
+    try:
+        storage.begin(cursor, False)
+
+        high = None
+        if id_col is not None:
+            # Statements from here on see a finished import's rows (READ COMMITTED)
+            storage.advisory_lock(cursor, queries.VOTE_IMPORT_LOCK, shared=True)
+            if safety_lag:
+                high = _settled_id(storage, cursor, table, id_col, since_id, safety_lag)
+            else:
+                cursor.execute(f"SELECT COALESCE(MAX({id_col}), 0) FROM {table}")
+                high = int(cursor.fetchone()[0])
+            if high <= since_id:
+                conn.rollback()
+                return {'table': table, 'path': None, 'rows': 0, 'last_id': since_id}
+
+        ts = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        suffix = f"_since{since_id}" if since_id else ""
+        ext = 'csv.gz' if fmt == 'csv' else 'parquet'
+        # ts has one-second resolution; the random part keeps back-to-back exports apart
+        path = os.path.join(outdir, f"{table}_{ts}{suffix}_{uuid.uuid4().hex[:8]}.{ext}")
+        sql = _select_sql(table, id_col, since_id, high)
+
+        if fmt == 'csv':
+            with gzip.open(path, 'wb') as f:
+                if storage.copy_to_csv(cursor, sql, f):
+                    rows = cursor.rowcount
+                else:
+                    stream = storage.stream_cursor(conn)
+                    try:
+                        stream.execute(storage.prepare(sql))
+                        rows = _write_csv_chunks(stream, f, chunk_size)
+                    finally:
+                        stream.close()
+        else:
+            stream = storage.stream_cursor(conn)
+            try:
+                stream.execute(storage.prepare(sql))
+                rows = _write_parquet_chunks(stream, path, chunk_size)
+            finally:
+                stream.close()
+
+        conn.rollback()
+        if not os.path.exists(path):
+            path = None  # the Parquet writer only creates a file once it has rows
+        return {'table': table, 'path': path, 'rows': rows, 'last_id': high}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        storage.release(conn)
+
+
+def export_tables(outdir='data/exports', fmt='csv', tables=None, incremental=False,
+                  chunk_size=DEFAULT_CHUNK_SIZE, safety_lag=DEFAULT_SAFETY_LAG):
+    """
+    Export vote history tables.
+
+    Args:
+        outdir: Output directory
+        fmt: 'csv' or 'parquet'
+        tables: Table names to export (default: all of EXPORT_TABLES)
+        incremental: Only export rows added since the last incremental export
+        chunk_size: Rows per fetch on the cursor path
+        safety_lag: Seconds an incremental export stays behind the newest rows
+
+    Returns:
+        List of per-table result dicts (see export_table)
+    """
+    os.makedirs(outdir, exist_ok=True)
+    storage = get_storage()
+    _ensure_tables(storage)
+
+    state = load_state(outdir) if incremental else {}
+    results = []
+    for table in tables or list(EXPORT_TABLES):
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unknown table: {table}. Must be one of: {', '.join(EXPORT_TABLES)}")
+        since_id = int(state.get(table, {}).get('last_id', 0)) if incremental else 0
+
+        started = time.perf_counter()
+        result = export_table(storage, table, outdir, fmt=fmt, since_id=since_id, chunk_size=chunk_size,
+                              safety_lag=safety_lag if incremental else 0)
+        elapsed = time.perf_counter() - started
+        results.append(result)
+
+        if result['path']:
+            print(f"✓ {table}: {result['rows']} rows -> {result['path']} ({elapsed:.2f}s)")
+        else:
+            print(f"✓ {table}: no new rows since id {since_id}")
+
+        if incremental and result['last_id'] is not None:
+            state[table] = {
+                'last_id': result['last_id'],
+                'exported_at': datetime.now(timezone.utc).isoformat(),
+            }
+
+    if incremental:
+        save_state(outdir, state)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream vote history to compressed CSV or Parquet.')
+    parser.add_argument('--outdir', default='data/exports', help='Output directory')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='Output format (csv is gzip-compressed)')
+    parser.add_argument('--tables', nargs='+', choices=list(EXPORT_TABLES), default=None,
+                        help='Tables to export (default: all)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only export rows added since the last incremental export')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Rows fetched per round trip on the cursor path')
+    parser.add_argument('--safety-lag', type=int, default=DEFAULT_SAFETY_LAG,
+                        help='Seconds to stay behind the newest rows, so rows still being committed '
+                             'are not skipped')
+    args = parser.parse_args()
+
+    try:
+        export_tables(
+            outdir=args.outdir,
+            fmt=args.format,
+            tables=args.tables,
+            incremental=args.incremental,
+            chunk_size=args.chunk_size,
+            safety_lag=args.safety_lag,
+        )
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
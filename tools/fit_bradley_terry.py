@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+tools/fit_bradley_terry.py
+
+Fit Bradley-Terry ratings over the whole vote log, bootstrap confidence
+intervals in a process pool, and publish them to the bt_ratings table
+(served at /api/ratings/bradley-terry). Suitable for cron.
+
+Usage:
+  python -m tools.fit_bradley_terry
+  python -m tools.fit_bradley_terry --bootstrap 2000 --workers 8
+  python -m tools.fit_bradley_terry --dry-run  # print without publishing
+"""
+
+import sys
+import time
+import argparse
+
+from backend import bradley_terry
+from backend.supabase_db import get_pair_counts, publish_bt_ratings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit and publish Bradley-Terry ratings.')
+    parser.add_argument('--bootstrap', type=int, default=1000,
+                        help='Bootstrap rounds for confidence intervals (0 to skip)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='Confidence interval coverage')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for the bootstrap (default: CPU count)')
+    parser.add_argument('--prior', type=float, default=bradley_terry.DEFAULT_PRIOR,
+                        help='Virtual wins/losses per model')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--dry-run', action='store_true', help='Print ratings without publishing')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    pair_counts = get_pair_counts()
+    n_votes = sum(count for _, _, count in pair_counts)
+    if not n_votes:
+        print("⚠️  No votes in the vote log; nothing to fit")
+        return 1
+    loaded = time.perf_counter()
+
+    results = bradley_terry.fit_with_intervals(
+        pair_counts,
+        rounds=args.bootstrap,
+        confidence=args.confidence,
+        workers=args.workers,
+        seed=args.seed,
+        prior=args.prior,
+    )
+    fitted = time.perf_counter()
+
+    print(f"{'Model':<40} {'Rating':>8} {'CI':>19} {'W':>7} {'L':>7}")
+    for model, r in results.items():
+        ci = f"[{r['ci_lower']:.1f}, {r['ci_upper']:.1f}]" if r['ci_lower'] is not None else "-"
+        print(f"{model:<40} {r['rating']:>8.1f} {ci:>19} {r['wins']:>7} {r['losses']:>7}")
+
+    print(f"\n{n_votes:,} votes, {len(results)} models: "
+          f"load {loaded - started:.2f}s, fit + {args.bootstrap} bootstraps {fitted - loaded:.2f}s")
+
+    if args.dry_run:
+        print("Dry run: not published")
+        return 0
+
+    count = publish_bt_ratings(results)
+    print(f"✅ Published Bradley-Terry ratings for {count} models")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+tools/fit_irt.py
+
+Fit the graded-response IRT model (backend/irt.py) on every collected answer
+in the run store and save question and model parameters to a JSON file. Each
+refit warm-starts from the previous file, so the nightly refit only moves as
+far as the new runs require.
+
+The saved file has, per question, its discrimination, thresholds, difficulty
+(mean threshold) and expected information over the theta prior (low values
+are pruning candidates), and per model its latent economic / social position
+with standard errors.
+
+Usage:
+  python -m tools.fit_irt
+  python -m tools.fit_irt --cold                 # ignore the previous fit
+  python -m tools.fit_irt --out /tmp/irt.json --show 10
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+
+from backend import irt
+from backend.compass import AXES, DEFAULT_QUESTIONS_PATH, load_question_bank
+from tools.aggregate import load_run_scores
+
+DEFAULT_PARAMS_PATH = 'data/summary/irt_params.json'
+
+
+def refit(indir='data/runs', outpath=DEFAULT_PARAMS_PATH, questions_path=DEFAULT_QUESTIONS_PATH,
+          warm=True, max_iter=200, tol=1e-5):
+    """
+    Fit on all runs in indir and write the parameters to outpath.
+
+    Args:
+        warm: Start from the parameters already in outpath, if any
+
+    Returns:
+        The saved dict (see backend.irt.to_dict) plus fit metadata
+    """
+    bank = load_question_bank(questions_path)
+    files, models, _, scores = load_run_scores(indir, bank)
+    obs = irt.observations(scores, bank.sign)
+
+    start = None
+    if warm and os.path.exists(outpath):
+        try:
+            with open(outpath, 'r', encoding='utf-8') as fh:
+                start = irt.load_start(json.load(fh), models, bank.ids)
+        except Exception as e:
+            print(f"⚠️  Could not warm-start from {outpath}: {e}")
+
+    started = time.perf_counter()
+    result = irt.fit(obs, bank.axis, len(models), start=start, max_iter=max_iter, tol=tol)
+    params = result['params']
+    saved = irt.to_dict(params, models, bank.ids, bank.axis, irt.theta_standard_errors(params, obs, bank.axis))
+    saved.update({
+        'fitted_at': datetime.now(timezone.utc).isoformat(),
+        'runs': len(files),
+        'observations': int(len(obs.category)),
+        'log_likelihood': result['log_likelihood'],
+        'iterations': result['iterations'],
+        'converged': result['converged'],
+        'warm_start': start is not None,
+        'fit_seconds': time.perf_counter() - started,
+    })
+
+    os.makedirs(os.path.dirname(outpath) or '.', exist_ok=True)
+    with open(outpath, 'w', encoding='utf-8') as fh:
+        json.dump(saved, fh, indent=2)
+    return saved
+
+
+def print_fit(saved, show=5):
+    print(f"{'Model':<32} {'Economic':>16} {'Social':>16}")
+    for name, row in sorted(saved['models'].items(), key=lambda item: item[1]['economic']):
+        cells = [f"{row[ax]:+.2f} ± {row.get(f'{ax}_se', 0):.2f}" for ax in AXES]
+        print(f"{name:<32} {cells[0]:>16} {cells[1]:>16}")
+
+    for ax in AXES:
+        items = sorted(((qid, q) for qid, q in saved['questions'].items() if q['axis'] == ax),
+                       key=lambda item: item[1]['information'])
+        print(f"\nLeast informative {ax} questions:")
+        for qid, q in items[:show]:
+            print(f"  {qid:<6} information {q['information']:.3f}  "
+                  f"discrimination {q['discrimination']:.2f}  difficulty {q['difficulty']:+.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit a graded-response IRT model over models x questions.')
+    parser.add_argument('--indir', default='data/runs')
+    parser.add_argument('--questions', default=DEFAULT_QUESTIONS_PATH)
+    parser.add_argument('--out', default=DEFAULT_PARAMS_PATH, help='Parameters file (also the warm start)')
+    parser.add_argument('--cold', action='store_true', help='Ignore the previous fit and start from defaults')
+    parser.add_argument('--max-iter', type=int, default=200)
+    parser.add_argument('--tol', type=float, default=1e-5, help='Min log-posterior gain per answer per iteration')
+    parser.add_argument('--show', type=int, default=5, help='Least informative questions to list per axis')
+    args = parser.parse_args()
+
+    saved = refit(args.indir, args.out, args.questions, warm=not args.cold,
+                  max_iter=args.max_iter, tol=args.tol)
+    if not saved['observations']:
+        print("⚠️  No parsed answers found; nothing to fit")
+        return 1
+
+    print_fit(saved, args.show)
+    start = "warm" if saved['warm_start'] else "cold"
+    print(f"\n{saved['observations']:,} answers from {saved['runs']} runs: {start} start, "
+          f"{saved['iterations']} iterations, {saved['fit_seconds']:.2f}s")
+    if not saved['converged']:
+        print(f"⚠️  Did not converge within {args.max_iter} iterations")
+    print(f"✅ Wrote IRT parameters to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
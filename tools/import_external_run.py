@@ -3,7 +3,7 @@
 tools/import_external_run.py
 
 Helper to import an external model's answers (JSON array or newline-separated file)
-and write the CSV + meta files in the same format produced by `tools/run_models.py`.
+and append them to the run store (backend/run_store.py) the same way `tools/run_models.py` does.
 
 Usage examples:
   # JSON array file with 40 answers
@@ -15,27 +15,25 @@ Usage examples:
 Arguments:
   --model        Model name to record (e.g., gemini-pro)
   --answers-file Path to file containing answers (JSON array or newline-separated)
-  --outdir       Output directory (default: data/runs)
+  --outdir       Run store root (default: data/runs)
   --questions    Path to question bank JSON (default: data/questions.json)
   --run-id       Optional run id to use (if omitted, one is generated)
   --timestamp    Optional ISO timestamp to use for rows (default: now UTC)
 
 The script writes:
-  data/runs/<run_id>__<model>.csv
-  data/runs/<run_id>__<model>_meta.json
-  data/runs/<run_id>__meta_common.json
+  data/runs/answers/date=<run date>/model=<model>/<run_id>.parquet
+  data/runs/runs/date=<run date>/model=<model>/<run_id>.parquet
 
-These files match the format used by the main runner so aggregator/plotter pick them up.
+in the same store the main runner appends to, so aggregator/plotter pick them up.
 """
 
 import argparse
-import csv
 import json
-import os
 import uuid
 from datetime import datetime, timezone
 from typing import List
 
+from backend import run_store
 from backend.utils import parse_response_to_likert
 
 
@@ -59,13 +57,9 @@ def load_answers(path: str) -> List[str]:
 
 
 def load_questions(path: str = 'data/questions.json'):
+    """The question bank dict (id, version, questions)."""
     with open(path, 'r', encoding='utf-8') as fh:
-        qb = json.load(fh)
-    return qb.get('questions', [])
-
-
-def ensure_outdir(path: str) -> None:
-    os.makedirs(path, exist_ok=True)
+        return json.load(fh)
 
 
 def make_run_id(provided: str | None = None):
@@ -74,8 +68,8 @@ def make_run_id(provided: str | None = None):
     return f"run_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}_{uuid.uuid4().hex[:6]}"
 
 
-def write_csv_and_meta(run_id: str, model: str, questions: List[dict], answers: List[str], outdir: str, ts: str):
-    ensure_outdir(outdir)
+def write_run(run_id: str, model: str, qbank: dict, answers: List[str], outdir: str, ts: str):
+    questions = qbank.get('questions', [])
     rows = []
     parsed_count = 0
     for q, ans in zip(questions, answers):
@@ -83,51 +77,24 @@ def write_csv_and_meta(run_id: str, model: str, questions: List[dict], answers:
         if parsed is not None:
             parsed_count += 1
         rows.append({
-            'run_id': run_id,
-            'model': model,
             'question_id': q.get('id'),
-            'question_text': q.get('text'),
             'raw_answer': ans,
-            'parsed_score': parsed if parsed is not None else '',
+            'parsed_score': parsed,
             'timestamp': ts,
         })
 
-    parsed_fraction = parsed_count / max(1, len(questions))
-
-    csv_path = os.path.join(outdir, f"{run_id}__{model}.csv")
-    with open(csv_path, 'w', newline='', encoding='utf-8') as fh:
-        writer = csv.DictWriter(fh, fieldnames=list(rows[0].keys()))
-        writer.writeheader()
-        writer.writerows(rows)
-
-    # meta per-model
-    per_model_meta = {
-        'run_id': run_id,
+    meta = {
         'created_at': datetime.now(timezone.utc).isoformat(),
         'models': [model],
-        'model': model,
+        'question_bank': qbank.get('id'),
+        'question_bank_version': qbank.get('version'),
+        'n_questions': len(questions),
         'run_timestamp': ts,
-        'parsed_fraction': parsed_fraction,
+        'parsed_fraction': parsed_count / max(1, len(questions)),
         'raw_response_preview': json.dumps(answers[:10])[:500],
     }
-    meta_path = os.path.join(outdir, f"{run_id}__{model}_meta.json")
-    with open(meta_path, 'w', encoding='utf-8') as fh:
-        json.dump(per_model_meta, fh, indent=2)
-
-    # top-level common meta (so aggregator can find run-level info)
-    common_meta = {
-        'run_id': run_id,
-        'created_at': datetime.now(timezone.utc).isoformat(),
-        'models': [model],
-        'n_questions': len(questions),
-    }
-    common_path = os.path.join(outdir, f"{run_id}__meta_common.json")
-    with open(common_path, 'w', encoding='utf-8') as fh:
-        json.dump(common_meta, fh, indent=2)
-
-    print('Wrote', csv_path)
-    print('Wrote', meta_path)
-    print('Wrote', common_path)
+    path = run_store.append_run(outdir, run_id, model, rows, meta, questions)
+    print('Wrote', path)
 
 
 def main():
@@ -141,7 +108,8 @@ def main():
     args = p.parse_args()
 
     answers = load_answers(args.answers_file)
-    questions = load_questions(args.questions)
+    qbank = load_questions(args.questions)
+    questions = qbank.get('questions', [])
 
     if not questions:
         print('No questions loaded from', args.questions)
@@ -157,7 +125,7 @@ def main():
     run_id = make_run_id(args.run_id)
     ts = args.timestamp or datetime.now(timezone.utc).isoformat()
 
-    write_csv_and_meta(run_id, args.model, questions, answers, args.outdir, ts)
+    write_run(run_id, args.model, qbank, answers, args.outdir, ts)
 
 
 if __name__ == '__main__':
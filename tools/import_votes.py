@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+tools/import_votes.py
+
+Bulk-load historical votes (offline sessions, other arenas) into the database.
+
+Vote files are read as a stream in chunks. Each chunk is validated against
+backend/tags with vectorized pandas operations, then bulk-loaded into
+temporary staging tables (COPY FROM STDIN on Postgres, executemany on
+SQLite). Once the whole file is staged it is merged into vote_tags,
+vote_dimension_scores and their rollups with set-based statements, and the
+affected Elo ratings are recomputed in one pass over the staged votes
+(ordered by created_at), starting from the current ratings. Everything runs
+in a single transaction: a failed import leaves the database untouched.
+The transaction holds queries.VOTE_IMPORT_LOCK, so incremental exports and
+Glicko-2 updates wait for it to finish.
+
+Input formats (chosen by extension, .gz allowed):
+  JSONL (.jsonl/.ndjson/.json):
+    {"winner_model": "GPT-4o", "loser_model": "Gemini", "tags": ["cites_evidence"],
+     "created_at": "2025-01-03T12:00:00Z"}
+  CSV (.csv): columns winner_model, loser_model, tags (separated by ';'), created_at
+
+tags and created_at are optional. Votes without tags only update ratings;
+votes without created_at are stamped with the import time. Votes with an
+unknown tag, a missing model name or an unparseable created_at are rejected.
+
+Usage:
+  python -m tools.import_votes --input votes.jsonl
+  python -m tools.import_votes --input arena_export.csv.gz --chunk-size 100000
+  python -m tools.import_votes --input votes.jsonl --dry-run
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from backend.elo import update_elo
+from backend.storage import queries
+from backend.supabase_db import get_storage, refresh_dimension_weights
+from backend.tags import TAG_CATEGORY, active_weights, calculate_dimension_scores_batch
+
+DEFAULT_CHUNK_SIZE = 50000
+TAG_SEPARATOR = ';'
+
+# pandas frequency for each tag rollup granularity
+BUCKET_FREQ = {'hour': 'h', 'day': 'D'}
+
+def read_vote_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most chunk_size votes from a JSONL or CSV file."""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype={'tags': str})
+    elif name.endswith(('.jsonl', '.ndjson', '.json')):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        raise ValueError(f"Unsupported vote file: {path} (expected .jsonl or .csv)")
+
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def _tag_list(value):
+    if isinstance(value, list):
+        return [str(t).strip() for t in value if str(t).strip()]
+    if isinstance(value, str):
+        return [t.strip() for t in value.split(TAG_SEPARATOR) if t.strip()]
+    return []
+
+
+def validate_chunk(chunk, now):
+    """
+    Normalize and validate one chunk of votes.
+
+    Args:
+        chunk: DataFrame with winner_model, loser_model and optional tags/created_at
+        now: Naive UTC timestamp for votes without created_at
+
+    Returns:
+        (valid DataFrame with winner_model, loser_model, tags, created_at,
+         Series of rejection reasons indexed like chunk)
+    """
+    chunk = chunk.reset_index(drop=True)
+    reasons = pd.Series('', index=chunk.index, dtype=object)
+
+    for col in ('winner_model', 'loser_model'):
+        if col not in chunk:
+            chunk[col] = None
+        names = chunk[col].astype('string').str.strip()
+        chunk[col] = names
+        reasons[names.isna() | (names == '')] = f"missing {col}"
+
+    tags = chunk['tags'].map(_tag_list) if 'tags' in chunk else pd.Series([[]] * len(chunk), dtype=object)
+    exploded = tags.explode()
+    known = exploded.isna() | exploded.isin(TAG_CATEGORY.keys())
+    has_unknown = ~known.groupby(level=0).all()
+    reasons[has_unknown & (reasons == '')] = "unknown tag"
+    chunk['tags'] = tags
+
+    if 'created_at' in chunk:
+        created = pd.to_datetime(chunk['created_at'], utc=True, errors='coerce', format='mixed')
+        reasons[created.isna() & chunk['created_at'].notna() & (reasons == '')] = "bad created_at"
+        created = created.dt.tz_localize(None).fillna(now)
+    else:
+        created = pd.Series(now, index=chunk.index)
+    chunk['created_at'] = created
+
+    valid = chunk[reasons == ''][['winner_model', 'loser_model', 'tags', 'created_at']]
+    return valid, reasons[reasons != '']
+
+
+def staging_rows(valid, first_seq, weights=None):
+    """
+    Build staging rows for one validated chunk.
+
+    Dimension scores for every tagged vote in the chunk are computed in one
+    batch against the compiled tag weight matrix (the active version unless
+    weights is given). Rollup buckets are floored in bulk. Each tagged vote's
+    tag rows and score row share a fresh vote_uid.
+
+    Returns:
+        Dict mapping staging table name to a list of row tuples
+    """
+    created = list(valid['created_at'].dt.to_pydatetime())
+    buckets = {
+        granularity: list(valid['created_at'].dt.floor(BUCKET_FREQ[granularity]).dt.to_pydatetime())
+        for granularity in queries.TAG_ROLLUP_TABLES
+    }
+    winners = valid['winner_model'].tolist()
+    losers = valid['loser_model'].tolist()
+    tag_lists = valid['tags'].tolist()
+
+    votes, tag_rows, tagged = [], [], []
+    rows = zip(winners, losers, tag_lists, created, buckets['day'], *buckets.values())
+    for i, (winner, loser, tags, ts, day, *vote_buckets) in enumerate(rows):
+        votes.append((first_seq + i, winner, loser, ts, day))
+        if not tags:
+            continue
+        vote_uid = uuid.uuid4().hex
+        tagged.append((i, vote_uid))
+        for tag in tags:
+            tag_rows.append((winner, loser, tag, TAG_CATEGORY[tag], vote_uid, ts, *vote_buckets))
+
+    weights = weights or active_weights()
+    winner_scores = calculate_dimension_scores_batch((tag_lists[i] for i, _ in tagged), weights)
+    # Loser columns are 1 - winner, as in /api/vote-with-tags
+    scores = np.hstack([winner_scores, 1.0 - winner_scores]).tolist()
+    score_rows = [
+        (winners[i], losers[i], *row, weights.version, vote_uid, created[i])
+        for (i, vote_uid), row in zip(tagged, scores)
+    ]
+
+    return {
+        'import_votes': votes,
+        'import_vote_tags': tag_rows,
+        'import_dimension_scores': score_rows,
+    }
+
+
+def replay_ratings(storage, cursor, current, k_factor=32, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Apply every staged vote to the ratings in one ordered pass.
+
+    Args:
+        current: Dict of model_name -> rating to start from
+
+    Returns:
+        List of (model_name, rating, wins_added, losses_added) rows
+    """
+    ratings = dict(current)
+    wins, losses = {}, {}
+
+    stream = storage.stream_cursor(cursor.connection)
+    try:
+        stream.execute(storage.prepare(queries.IMPORT_VOTES_IN_ORDER_SQL))
+        while True:
+            rows = stream.fetchmany(chunk_size)
+            if not rows:
+                break
+            for winner, loser in rows:
+                ratings[winner], ratings[loser] = update_elo(
+                    ratings.get(winner, queries.DEFAULT_RATING),
+                    ratings.get(loser, queries.DEFAULT_RATING),
+                    "1", k_factor
+                )
+                wins[winner] = wins.get(winner, 0) + 1
+                losses[loser] = losses.get(loser, 0) + 1
+    finally:
+        stream.close()
+
+    touched = set(wins) | set(losses)
+    return [
+        (model, round(ratings[model], 2), wins.get(model, 0), losses.get(model, 0))
+        for model in sorted(touched)
+    ]
+
+
+def import_votes(path, chunk_size=DEFAULT_CHUNK_SIZE, k_factor=32, dry_run=False):
+    """
+    Import a vote file.
+
+    Args:
+        path: JSONL or CSV vote file
+        chunk_size: Votes read, validated and staged per chunk
+        k_factor: Elo K-factor for the rating replay
+        dry_run: Validate and stage everything, then roll back
+
+    Returns:
+        Dict with counts and timings
+    """
+    storage = get_storage()
+    storage.ensure_table_exists()
+    storage.ensure_tag_rollup_tables_exist()
+    storage.ensure_dimension_rollups_table_exists()
+    weights = refresh_dimension_weights()
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    stats = {'read': 0, 'imported': 0, 'rejected': 0, 'tag_rows': 0, 'dimension_score_rows': 0,
+             'ratings_updated': 0}
+    rejected_examples = []
+    started = time.perf_counter()
+
+    class _DryRun(Exception):
+        pass
+
+    try:
+        with storage.transaction(write=True) as cursor:
+            # Incremental export and the Glicko job wait for us rather than
+            # moving their id watermarks past our not yet committed votes
+            storage.advisory_lock(cursor, queries.VOTE_IMPORT_LOCK)
+            storage.drive(queries.create_import_staging(), cursor)
+
+            for chunk in read_vote_chunks(path, chunk_size):
+                valid, rejected = validate_chunk(chunk, now)
+                for offset, reason in rejected.head(5 - len(rejected_examples)).items():
+                    rejected_examples.append((stats['read'] + offset + 1, reason))
+
+                rows = staging_rows(valid, stats['imported'], weights)
+                for table, table_rows in rows.items():
+                    if table_rows:
+                        storage.copy_rows(cursor, table, queries.IMPORT_STAGING_TABLES[table], table_rows)
+
+                stats['read'] += len(chunk)
+                stats['imported'] += len(valid)
+                stats['rejected'] += len(rejected)
+                rate = stats['read'] / max(time.perf_counter() - started, 1e-9)
+                print(f"  staged {stats['imported']:,} votes ({rate:,.0f} votes/s)")
+            stats['stage_seconds'] = time.perf_counter() - started
+
+            merged = storage.drive(queries.merge_import_staging(), cursor)
+            stats.update(merged)
+
+            # Live votes would otherwise update ratings between our read and the upsert
+            storage.lock_tables(cursor, ['elo_ratings'])
+            current = storage.drive(queries.get_all_ratings(), cursor)
+            rating_rows = replay_ratings(
+                storage, cursor,
+                {model: row['rating'] for model, row in current.items()},
+                k_factor=k_factor, chunk_size=chunk_size
+            )
+            stats['ratings_updated'] = storage.drive(queries.upsert_ratings(rating_rows), cursor)
+            storage.drive(queries.drop_import_staging(), cursor)
+
+            if dry_run:
+                raise _DryRun()
+    except _DryRun:
+        print("Dry run: rolled back, nothing was written")
+
+    stats['total_seconds'] = time.perf_counter() - started
+    stats['votes_per_second'] = stats['imported'] / max(stats['total_seconds'], 1e-9)
+    stats['rejected_examples'] = rejected_examples
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-import historical votes.')
+    parser.add_argument('--input', required=True, help='Vote file (.jsonl or .csv, optionally .gz)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Votes read and staged per chunk')
+    parser.add_argument('--k-factor', type=int, default=32, help='Elo K-factor')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Validate and stage, then roll back without writing')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        return 1
+
+    try:
+        stats = import_votes(args.input, chunk_size=args.chunk_size,
+                             k_factor=args.k_factor, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Import failed (nothing was written): {e}")
+        return 1
+
+    verb = "Validated" if args.dry_run else "Imported"
+    print(f"\n✅ {verb} {stats['imported']:,} of {stats['read']:,} votes "
+          f"in {stats['total_seconds']:.2f}s ({stats['votes_per_second']:,.0f} votes/s)")
+    print(f"  Staging: {stats['stage_seconds']:.2f}s")
+    print(f"  Tag rows: {stats['tag_rows']:,}  Dimension score rows: {stats['dimension_score_rows']:,}")
+    print(f"  Ratings updated: {stats['ratings_updated']}")
+    if stats['rejected']:
+        print(f"⚠️  Rejected {stats['rejected']:,} votes, e.g.:")
+        for line, reason in stats['rejected_examples']:
+            print(f"    vote {line}: {reason}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
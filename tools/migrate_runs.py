@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+tools/migrate_runs.py
+
+Move legacy flat run files (run_<ts>_<id>__<model>.csv, ..._meta.json and
+..__meta_common.json in data/runs) into the columnar run store
+(backend/run_store.py). Each (run, model) is written with its original
+timestamps and meta, read back and row-counted before its legacy files are
+deleted (--delete). Runs already in the store are skipped, so the tool can
+be re-run safely.
+
+Usage:
+  python -m tools.migrate_runs --dry-run
+  python -m tools.migrate_runs                 # migrate, keep legacy files
+  python -m tools.migrate_runs --delete        # migrate and remove legacy files
+  python -m tools.migrate_runs --indir old_runs --root data/runs
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from collections import defaultdict
+
+from backend import run_store
+
+
+def legacy_files(indir):
+    """
+    Legacy per-model CSVs in indir.
+
+    Returns:
+        List of (run_id, model, csv_path) sorted by run
+    """
+    found = []
+    for fn in sorted(os.listdir(indir)):
+        path = os.path.join(indir, fn)
+        if not fn.endswith('.csv') or not os.path.isfile(path) or '__' not in fn:
+            continue
+        run_id, model = fn.split('__', 1)
+        found.append((run_id, model.rsplit('.csv', 1)[0], path))
+    return found
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except Exception as e:
+        print(f"⚠️  Unreadable meta {path}: {e}")
+        return {}
+
+
+def migrate(indir=run_store.DEFAULT_ROOT, root=run_store.DEFAULT_ROOT, questions_path='data/questions.json',
+            delete=False, dry_run=False):
+    """
+    Migrate every legacy run file in indir into the store at root.
+
+    Returns:
+        Dict with migrated / skipped / failed (run, model) counts and deleted files
+    """
+    with open(questions_path, 'r', encoding='utf-8') as fh:
+        default_bank = json.load(fh).get('id')
+
+    stored = run_store.read_runs(root, columns=['run_id', 'model'])
+    already = set(zip(stored.column('run_id').to_pylist(), stored.column('model').to_pylist()))
+
+    stats = {'migrated': 0, 'skipped': 0, 'failed': 0, 'deleted': 0}
+    done_by_run = defaultdict(list)
+    files = legacy_files(indir)
+    for run_id, model, csv_path in files:
+        meta_path = os.path.join(indir, f"{run_id}__{model}_meta.json")
+        legacy = [csv_path, meta_path]
+        if (run_id, model) in already:
+            stats['skipped'] += 1
+            done_by_run[run_id].append(legacy)
+            continue
+
+        with open(csv_path, 'r', encoding='utf-8') as fh:
+            rows = list(csv.DictReader(fh))
+        common = _load_json(os.path.join(indir, f"{run_id}__meta_common.json"))
+        meta = {**common, **_load_json(meta_path)}
+        meta.setdefault('question_bank', default_bank)
+        if meta.get('parsed_fraction') is None:
+            parsed = sum(1 for r in rows if r.get('parsed_score') not in (None, '', 'None'))
+            meta['parsed_fraction'] = parsed / max(1, len(rows))
+        if not meta.get('run_timestamp') and rows:
+            meta['run_timestamp'] = rows[0].get('timestamp')
+        # The text each run was actually asked, from its own rows
+        questions = [{'id': r['question_id'], 'text': r.get('question_text')} for r in rows]
+
+        if dry_run:
+            print(f"[MIGRATE] {run_id} {model}: {len(rows)} answers")
+            stats['migrated'] += 1
+            continue
+        try:
+            run_store.append_run(root, run_id, model, rows, meta, questions)
+            written = run_store.read_answers(root, columns=['question_id'], models=[model], run_ids=[run_id])
+            if written.num_rows != len(rows):
+                raise ValueError(f"wrote {written.num_rows} answers, expected {len(rows)}")
+        except Exception as e:
+            print(f"❌ {run_id} {model}: {e}")
+            stats['failed'] += 1
+            continue
+        print(f"✓ {run_id} {model}: {len(rows)} answers")
+        stats['migrated'] += 1
+        done_by_run[run_id].append(legacy)
+
+    if delete and not dry_run:
+        models_per_run = defaultdict(int)
+        for run_id, _, _ in files:
+            models_per_run[run_id] += 1
+        for run_id, legacy_sets in done_by_run.items():
+            paths = [p for paths in legacy_sets for p in paths]
+            # The shared meta goes once every model of the run is in the store
+            if len(legacy_sets) == models_per_run[run_id]:
+                paths.append(os.path.join(indir, f"{run_id}__meta_common.json"))
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+                    stats['deleted'] += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate legacy run CSV/JSON files into the columnar run store.')
+    parser.add_argument('--indir', default=run_store.DEFAULT_ROOT, help='Directory with legacy run files')
+    parser.add_argument('--root', default=run_store.DEFAULT_ROOT, help='Run store root')
+    parser.add_argument('--questions', default='data/questions.json',
+                        help='Question bank whose id is recorded for runs whose meta lacks one')
+    parser.add_argument('--delete', action='store_true', help='Remove legacy files once migrated and verified')
+    parser.add_argument('--dry-run', action='store_true', help='List what would be migrated')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.indir):
+        print(f"❌ Directory not found: {args.indir}")
+        return 1
+    stats = migrate(args.indir, args.root, args.questions, delete=args.delete, dry_run=args.dry_run)
+    verb = "Would migrate" if args.dry_run else "Migrated"
+    print(f"\n✅ {verb} {stats['migrated']} model runs "
+          f"({stats['skipped']} already in the store, {stats['deleted']} legacy files removed)")
+    if stats['failed']:
+        print(f"⚠️  {stats['failed']} model runs failed and were left in place")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
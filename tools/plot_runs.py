@@ -4,6 +4,9 @@ tools/plot_runs.py
 
 Create time-series plots per model and a combined political-compass scatter of latest runs.
 
+When the summary carries bootstrap confidence regions (see tools/aggregate.py),
+time series get per-axis confidence bands and compass points their ellipses.
+
 Outputs PNG files into `data/plots/`.
 
 Usage:
@@ -18,8 +21,11 @@ import matplotlib
 matplotlib.use("Agg")  # must be before importing pyplot
 
 import matplotlib.pyplot as plt
+from matplotlib.patches import Ellipse
 # ...rest of your imports
 
+ELLIPSE_COLUMNS = ['ellipse_width', 'ellipse_height', 'ellipse_angle']
+
 
 
 def parse_run_timestamp(run_id: str) -> datetime:
@@ -50,8 +56,11 @@ def plot_timeseries(df: pd.DataFrame, outdir: str):
         if g_sorted.empty:
             continue
         plt.figure(figsize=(10, 5))
-        plt.plot(g_sorted['ts'], g_sorted['economic'], marker='o', label='Economic')
-        plt.plot(g_sorted['ts'], g_sorted['social'], marker='o', label='Social')
+        for axis, label in (('economic', 'Economic'), ('social', 'Social')):
+            line, = plt.plot(g_sorted['ts'], g_sorted[axis], marker='o', label=label)
+            if f'{axis}_ci_low' in g_sorted:
+                plt.fill_between(g_sorted['ts'], g_sorted[f'{axis}_ci_low'], g_sorted[f'{axis}_ci_high'],
+                                 color=line.get_color(), alpha=0.15, linewidth=0)
         plt.xlabel('Timestamp')
         plt.ylabel('Normalized score')
         plt.title(f'Time series for {model}')
@@ -90,8 +99,21 @@ def plot_compass_latest(df: pd.DataFrame, outdir: str, size=6):
     for i, txt in enumerate(labels):
         ax.annotate(txt, (xs.iloc[i], ys.iloc[i]), xytext=(5, 5), textcoords='offset points', fontsize=8)
 
-    ax.set_xlim(df['economic'].min() - 1, df['economic'].max() + 1)
-    ax.set_ylim(df['social'].min() - 1, df['social'].max() + 1)
+    # bootstrap confidence ellipses, when aggregate wrote them
+    xlim = [df['economic'].min() - 1, df['economic'].max() + 1]
+    ylim = [df['social'].min() - 1, df['social'].max() + 1]
+    if all(c in latest for c in ELLIPSE_COLUMNS):
+        for _, row in latest.dropna(subset=ELLIPSE_COLUMNS).iterrows():
+            ax.add_patch(Ellipse((row['economic'], row['social']), row['ellipse_width'], row['ellipse_height'],
+                                 angle=row['ellipse_angle'], facecolor='tab:blue', edgecolor='tab:blue',
+                                 alpha=0.15))
+            # keep the whole region in view (the bounding radius is half the major axis)
+            r = max(row['ellipse_width'], row['ellipse_height']) / 2
+            xlim = [min(xlim[0], row['economic'] - r), max(xlim[1], row['economic'] + r)]
+            ylim = [min(ylim[0], row['social'] - r), max(ylim[1], row['social'] + r)]
+
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
     ax.set_xlabel('Economic')
     ax.set_ylabel('Social')
     ax.set_title('Latest model positions (economic vs social)')
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+tools/reweight_dimensions.py
+
+Recompute every vote's dimension scores from its stored tags under a new
+tag -> dimension weight version, then make that version the active one.
+
+Weight sets are versioned in dimension_weight_versions and every score row
+records the version it was computed with. Scores are joined back to their
+tags through vote_uid and streamed in id order in chunks; each chunk is
+scored in one batch against the compiled weight matrix (see
+backend/tags.scores_from_counts) and bulk-loaded into a temporary table.
+The recomputed scores are then swapped into vote_dimension_scores with a
+single UPDATE ... FROM, the rollups are rebuilt, and the version is
+activated, all in one transaction: readers see either the old scores or the
+new ones, never a mix.
+
+Votes recorded while the first pass runs are picked up by a second pass
+after other writers are locked out (SQLite write transactions already
+exclude them). API workers switch to the new version within
+DIMENSION_WEIGHTS_MAX_STALENESS seconds; run again with --version to
+rescore the few votes recorded under the old version in the meantime.
+
+Votes recorded before vote_uid existed are linked once on first run: a
+score row is matched to the tags of the same winner/loser pair recorded
+within --link-tolerance seconds whose scores under the row's version
+reproduce the stored values. Score rows with no tags and default scores are
+linked as tagless votes; anything else is left unlinked (and unchanged) and
+reported.
+
+Usage:
+  python -m tools.reweight_dimensions --list
+  python -m tools.reweight_dimensions --weights weights_v2.json
+  python -m tools.reweight_dimensions --version 2          # rescore stragglers / re-apply
+  python -m tools.reweight_dimensions --weights weights_v2.json --dry-run
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backend.storage import queries
+from backend.supabase_db import get_storage
+from backend.tags import (
+    DIMENSION_NAMES, DIMENSIONS, calculate_dimension_scores_batch, compile_weights, validate_weights,
+)
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_LINK_TOLERANCE = 5.0
+
+
+def _as_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def link_legacy_votes(storage, cursor, weight_sets, tolerance=DEFAULT_LINK_TOLERANCE):
+    """
+    Give score rows and tag rows written before vote_uid existed a shared vote_uid.
+
+    Args:
+        weight_sets: Dict of version -> WeightSet (to recompute stored scores)
+        tolerance: Max seconds between a score row and its tags
+
+    Returns:
+        Dict with linked / tagless / unlinked score rows and orphaned tag rows
+    """
+    scores = storage.drive(queries.get_unlinked_dimension_scores(), cursor)
+    tag_rows = storage.drive(queries.get_unlinked_vote_tags(), cursor)
+    stats = {'linked': 0, 'tagless': 0, 'unlinked': 0, 'orphaned_tags': 0}
+    if not scores:
+        stats['orphaned_tags'] = len(tag_rows)
+        return stats
+
+    # Tags of one vote were written with one timestamp
+    groups = {}
+    for row in tag_rows:
+        key = (row['winner_model'], row['loser_model'], _as_datetime(row['created_at']))
+        groups.setdefault(key, []).append(row)
+    keys = list(groups)
+    by_pair = {}
+    for k, (winner, loser, ts) in enumerate(keys):
+        by_pair.setdefault((winner, loser), []).append((ts, k))
+    for candidates in by_pair.values():
+        candidates.sort()
+
+    tag_sets = [[row['tag_name'] for row in groups[key]] for key in keys]
+    # Each group scored once under every version the legacy rows were written with
+    group_scores = {
+        version: calculate_dimension_scores_batch(tag_sets, weight_set)
+        for version, weight_set in weight_sets.items()
+    }
+    defaults = np.array([DIMENSIONS[d]["default"] for d in DIMENSION_NAMES])
+    winner_columns = [f"winner_{dim}" for dim in DIMENSION_NAMES]
+
+    window = timedelta(seconds=tolerance)
+    used = set()
+    score_links, tag_links = [], []
+    for row in scores:
+        stored = np.array([row[column] for column in winner_columns], dtype=float)
+        ts = _as_datetime(row['created_at'])
+        candidates = by_pair.get((row['winner_model'], row['loser_model']), [])
+        lo = bisect_left(candidates, (ts - window,))
+        hi = bisect_right(candidates, (ts + window, len(keys)))
+        computed = group_scores.get(int(row['weight_version']))
+        best, best_gap = None, None
+        for group_ts, k in candidates[lo:hi]:
+            if k in used or computed is None or not np.allclose(computed[k], stored, atol=1e-6):
+                continue
+            gap = abs(group_ts - ts)
+            if best is None or gap < best_gap:
+                best, best_gap = k, gap
+
+        vote_uid = uuid.uuid4().hex
+        if best is not None:
+            k = best
+            used.add(k)
+            score_links.append((vote_uid, row['id']))
+            tag_links.extend((vote_uid, tag['id']) for tag in groups[keys[k]])
+            stats['linked'] += 1
+        elif np.allclose(stored, defaults, atol=1e-6):
+            score_links.append((vote_uid, row['id']))
+            stats['tagless'] += 1
+        else:
+            stats['unlinked'] += 1
+
+    stats['orphaned_tags'] = sum(len(groups[key]) for k, key in enumerate(keys) if k not in used)
+    storage.drive(queries.link_vote_uids(score_links, tag_links), cursor)
+    return stats
+
+
+def stage_scores(storage, cursor, weight_set, after_id=0, catch_up=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream linked score rows with id > after_id, rescore them and stage the results.
+
+    Returns:
+        (rows staged, last id seen)
+    """
+    params = (after_id, weight_set.version) if catch_up else (after_id,)
+    staged, last_id = 0, after_id
+    pending_id, pending_tags = None, []
+
+    def flush(ids, tag_sets):
+        winner = calculate_dimension_scores_batch(tag_sets, weight_set)
+        # Loser columns are 1 - winner, as in /api/vote-with-tags
+        values = np.hstack([winner, 1.0 - winner]).tolist()
+        storage.copy_rows(cursor, 'reweight_scores', queries.REWEIGHT_STAGING_COLUMNS, [
+            (vote_id, *row, weight_set.version) for vote_id, row in zip(ids, values)
+        ])
+        return len(ids)
+
+    stream = storage.stream_cursor(cursor.connection)
+    try:
+        stream.execute(storage.prepare(queries.reweight_source_sql(catch_up)), params)
+        while True:
+            rows = stream.fetchmany(chunk_size)
+            if not rows:
+                break
+            ids, tag_sets = [], []
+            for vote_id, tag in rows:
+                if vote_id != pending_id:
+                    if pending_id is not None:
+                        ids.append(pending_id)
+                        tag_sets.append(pending_tags)
+                    pending_id, pending_tags = vote_id, []
+                if tag is not None:
+                    pending_tags.append(tag)
+            # The last vote may continue in the next chunk
+            if ids:
+                staged += flush(ids, tag_sets)
+                last_id = ids[-1]
+        if pending_id is not None:
+            staged += flush([pending_id], [pending_tags])
+            last_id = pending_id
+    finally:
+        stream.close()
+    return staged, last_id
+
+
+def reweight(weights=None, version=None, chunk_size=DEFAULT_CHUNK_SIZE,
+             link_tolerance=DEFAULT_LINK_TOLERANCE, dry_run=False):
+    """
+    Register (weights) or select (version) a weight version, rescore every
+    vote under it and activate it.
+
+    Returns:
+        Dict with the version, counts and timings
+    """
+    storage = get_storage()
+    storage.ensure_dimension_rollups_table_exists()
+    started = time.perf_counter()
+    stats = {}
+
+    class _DryRun(Exception):
+        pass
+
+    try:
+        with storage.transaction(write=True) as cursor:
+            catch_up = weights is None
+            if weights is not None:
+                validate_weights(weights)
+                version = storage.drive(queries.add_weight_version(weights), cursor)
+            else:
+                row = storage.drive(queries.get_weight_version(version), cursor)
+                if row is None:
+                    raise ValueError(f"Unknown weight version: {version}")
+                weights = row['weights']
+            weight_set = compile_weights(weights, version)
+            stats['version'] = version
+
+            versions = storage.drive(queries.list_weight_versions(), cursor)
+            weight_sets = {row['version']: compile_weights(row['weights'], row['version']) for row in versions}
+            stats['legacy'] = link_legacy_votes(storage, cursor, weight_sets, link_tolerance)
+
+            storage.drive(queries.create_reweight_staging(), cursor)
+            staged, last_id = stage_scores(storage, cursor, weight_set, 0, catch_up, chunk_size)
+            stats['stage_seconds'] = time.perf_counter() - started
+
+            # Votes recorded during the first pass
+            storage.lock_tables(cursor, ['vote_tags', 'vote_dimension_scores'])
+            more, _ = stage_scores(storage, cursor, weight_set, last_id, catch_up, chunk_size)
+            stats['late_rows'] = more
+
+            stats['rescored'] = storage.drive(queries.apply_reweight_staging(), cursor)
+            storage.drive(queries.activate_weight_version(version), cursor)
+            storage.drive(queries.drop_reweight_staging(), cursor)
+
+            if dry_run:
+                raise _DryRun()
+    except _DryRun:
+        print("Dry run: rolled back, nothing was written")
+
+    stats['total_seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = stats['rescored'] / max(stats['total_seconds'], 1e-9)
+    return stats
+
+
+def print_versions():
+    storage = get_storage()
+    versions = storage.list_weight_versions()
+    active = storage.run(queries.get_active_weight_version())
+    for row in versions:
+        marker = "*" if active and row['version'] == active['version'] else " "
+        activated = row['activated_at'] or "never"
+        print(f"{marker} v{row['version']}: {len(row['weights'])} tags, "
+              f"created {row['created_at']}, activated {activated}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rescore all votes under a dimension weight version.')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--weights', help='JSON file of {tag: {dimension: weight}} to register as a new version')
+    group.add_argument('--version', type=int, help='Existing version to (re-)apply; only rows under other versions are rescored')
+    group.add_argument('--list', action='store_true', help='List weight versions (* = active)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Score rows read and rescored per chunk')
+    parser.add_argument('--link-tolerance', type=float, default=DEFAULT_LINK_TOLERANCE,
+                        help='Seconds between a legacy score row and its tags')
+    parser.add_argument('--dry-run', action='store_true', help='Rescore, then roll back without writing')
+    args = parser.parse_args()
+
+    if args.list:
+        print_versions()
+        return 0
+
+    weights = None
+    if args.weights:
+        if not os.path.exists(args.weights):
+            print(f"❌ Weights file not found: {args.weights}")
+            return 1
+        with open(args.weights, encoding='utf-8') as f:
+            weights = json.load(f)
+
+    try:
+        stats = reweight(weights, args.version, chunk_size=args.chunk_size,
+                         link_tolerance=args.link_tolerance, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Reweighting failed (nothing was written): {e}")
+        return 1
+
+    legacy = stats['legacy']
+    verb = "Would rescore" if args.dry_run else "Rescored"
+    print(f"\n✅ {verb} {stats['rescored']:,} votes under weight version {stats['version']} "
+          f"in {stats['total_seconds']:.2f}s ({stats['rows_per_second']:,.0f} votes/s)")
+    print(f"  Streaming: {stats['stage_seconds']:.2f}s  Recorded meanwhile: {stats['late_rows']:,}")
+    if legacy['linked'] or legacy['tagless']:
+        print(f"  Linked legacy votes: {legacy['linked']:,} tagged, {legacy['tagless']:,} tagless")
+    if legacy['unlinked'] or legacy['orphaned_tags']:
+        print(f"⚠️  {legacy['unlinked']:,} legacy score rows could not be matched to their tags "
+              f"(left unchanged); {legacy['orphaned_tags']:,} tag rows have no score row")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,10 +3,35 @@
 tools/run_models.py
 
 Batched runner: send the entire question bank in one prompt per model, parse a JSON array
-of answers, and save per-question CSV rows plus a run-level meta file.
+of answers, and append per-question rows plus run meta to the columnar run store
+(backend/run_store.py).
+
+Models run concurrently: every provider gets its own bounded thread pool
+(PROVIDER_CONCURRENCY, overridable per provider via env or --concurrency), so
+a run takes about as long as its slowest model. With --shard-size the bank is
+split into shards that are called concurrently too and reassembled in
+question order. Each model is written once all its shards are back (the store
+writes every file atomically), and a summary with per-model wall times goes
+to <outdir>/summaries/<run_id>.json.
+
+Every finished call is recorded in a run journal (backend/run_journal.py).
+After a crash or a provider outage, --resume RUN_ID calls only the shards
+that failed or never finished, re-parses the rest from the journal, and
+rewrites the affected models and the summary.
+
+--samples N asks every model N times. At temperature > 0 the N calls per
+shard are independent draws, all in flight together; at temperature 0 they
+would be the identical request, which is made once and shared by the
+samples. Answers are parsed as they arrive into an int8 samples x questions
+matrix per model, stored in the run store's samples dataset; the answers
+rows hold each question's majority answer, and the run summary gets every
+question's answer distribution, entropy and majority.
 
 Run (from repo root so imports work):
   python -m tools.run_models --models gpt-4o-mini,gpt-3.5-turbo --outdir data/runs
+  python -m tools.run_models --models gpt-4o,gpt-4o-mini --shard-size 10 --concurrency openai=8
+  python -m tools.run_models --resume run_20251025T234436Z_8cebc7
+  python -m tools.run_models --models gpt-4o-mini,gemini-2.0-flash --samples 50 --temperature 0.7
 Requires OPENAI_API_KEY in env or pass --api-key.
 
 Notes:
@@ -16,16 +41,29 @@ Notes:
 
 import os
 import sys
-import csv
 import json
 import re
 import argparse
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from typing import List, Dict, Any
 
+import numpy as np
+
+from backend import run_journal, run_store
+from backend.compass import answer_distributions
 from backend.utils import parse_response_to_likert  # your Likert parser
-from backend.providers import call_model, extract_json_answers  # multi-provider support
+from backend.providers import call_model, extract_json_answers, infer_provider  # multi-provider support
+
+# Concurrent calls allowed per provider (one thread pool each)
+PROVIDER_CONCURRENCY = {
+    "openai": int(os.getenv("RUN_MODELS_OPENAI_CONCURRENCY", "4")),
+    "anthropic": int(os.getenv("RUN_MODELS_ANTHROPIC_CONCURRENCY", "4")),
+    "gemini": int(os.getenv("RUN_MODELS_GEMINI_CONCURRENCY", "4")),
+}
+DEFAULT_CONCURRENCY = int(os.getenv("RUN_MODELS_DEFAULT_CONCURRENCY", "2"))
 
 
 # ---------- I/O helpers ----------
@@ -170,125 +208,351 @@ def run_models(
     outdir: str = "data/runs",
     params: Dict[str, Any] | None = None,
     questions_path: str = "data/questions.json",
+    shard_size: int | None = None,
+    concurrency: Dict[str, int] | None = None,
+    resume: str | None = None,
+    samples: int = 1,
 ) -> str:
-    """Execute all models over the bank, write CSV + per-model meta, return run_id.
+    """Execute all models over the bank, append answers + per-model meta to the run store, return run_id.
     
     Args:
         models: list of model names (auto-detects provider from name)
         api_keys: dict mapping provider name ("openai", "anthropic", "gemini") to API key.
                   If None or missing a key, will read from environment.
-        outdir: output directory for run artifacts
+        outdir: run store root (see backend/run_store.py)
         params: optional parameters (temperature, max_tokens) for all models
         questions_path: path to questions.json
+        shard_size: questions per call (default: the whole bank in one call)
+        concurrency: provider -> max concurrent calls, overriding PROVIDER_CONCURRENCY
+        resume: run_id of an unfinished run to continue; its models, params,
+                shard size and samples come from the run journal and the
+                corresponding arguments are ignored
+        samples: answers to collect per model and question; with
+                 temperature > 0 each is a separate call, at temperature 0
+                 identical requests are made once
     """
     ensure_outdir(outdir)
     qbank = load_questions(questions_path)
     questions = qbank["questions"]
 
-    # Run identifier to group outputs
-    run_id = f"run_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}_{uuid.uuid4().hex[:6]}"
-    meta_common = {
-        "run_id": run_id,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "models": models,
-        "params": params or {},
-        "question_bank": qbank.get("id"),
-        "question_bank_version": qbank.get("version"),
-        "n_questions": len(questions),
+    if resume:
+        state = run_journal.load(outdir, resume)
+        if state is None:
+            raise ValueError(f"No journal for run {resume} in {outdir}")
+        if state["question_ids"] != [q["id"] for q in questions]:
+            raise ValueError(f"Run {resume} was started with a different question bank than {questions_path}")
+        run_id, meta_common = resume, state["meta"]
+        models, shard_size, params = state["models"], state["shard_size"], meta_common.get("params")
+        samples = state["samples"]
+        if state["complete"]:
+            print(f"✅ Run {run_id} is already complete; nothing to resume")
+            return run_id
+    else:
+        if samples < 1:
+            raise ValueError("samples must be at least 1")
+        state = None
+        models = list(dict.fromkeys(models))
+        # Run identifier to group outputs
+        run_id = f"run_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}_{uuid.uuid4().hex[:6]}"
+        meta_common = {
+            "run_id": run_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "models": models,
+            "params": params or {},
+            "question_bank": qbank.get("id"),
+            "question_bank_version": qbank.get("version"),
+            "n_questions": len(questions),
+            "n_samples": samples,
+        }
+        run_journal.start(outdir, run_id, meta_common, models, shard_size, [q["id"] for q in questions], samples)
+
+    api_keys = api_keys or {}
+    shards = shard_questions(questions, shard_size)
+    progress = {model: _new_progress(samples, len(questions), len(shards)) for model in models}
+    done = state["shards"] if state is not None else {}
+    written = state["written"] if state is not None else {}
+
+    # (model, shard, request) -> samples it answers. Samples are independent
+    # draws only at temperature > 0; otherwise they'd be the identical
+    # request, which is made once and shared.
+    stochastic = float((params or {}).get("temperature") or 0) > 0
+    requests = {}
+    for i in range(len(shards)):
+        for sample in range(samples):
+            for model in models:
+                entry = done.get((model, sample, i))
+                if entry is not None and entry["status"] == run_journal.OK:
+                    # Already answered: re-parse from the journal, don't call again
+                    _accept(progress[model], shards[i], i, sample, {
+                        "content": entry["content"], "error": None,
+                        "timestamp": entry["timestamp"], "seconds": entry["seconds"]})
+                else:
+                    requests.setdefault((model, i, sample if stochastic else 0), []).append(sample)
+    total = len(models) * len(shards) * samples
+    if resume:
+        print(f"Resuming {run_id}: {total - sum(len(s) for s in requests.values())} of {total} answers "
+              f"from the journal, {len(requests)} calls to make")
+    elif len(requests) < total:
+        print(f"Temperature 0: {total} sampled shards need only {len(requests)} distinct calls")
+
+    started = time.perf_counter()
+    summary_models = {}
+
+    def finish(model):
+        # Every sample of every shard of this model is back: write it while the rest run
+        try:
+            summary_models[model] = _write_model(outdir, run_id, model, infer_provider(model), questions,
+                                                 shards, progress[model], meta_common, started)
+            run_journal.record_written(outdir, run_id, model, summary_models[model])
+        except Exception as e:
+            # The store's writes are atomic, so nothing partial is left
+            print(f"❌ Could not write {model}: {e}")
+        progress[model] = None
+
+    for model in models:
+        if progress[model]["left"]:
+            continue
+        if written.get(model) is not None and not written[model]["errors"]:
+            summary_models[model] = written[model]
+            progress[model] = None
+        else:
+            finish(model)
+
+    limits = {**PROVIDER_CONCURRENCY, **(concurrency or {})}
+    providers = {model: infer_provider(model) for model, _, _ in requests}
+    pools = {
+        provider: ThreadPoolExecutor(max_workers=max(1, limits.get(provider, DEFAULT_CONCURRENCY)),
+                                     thread_name_prefix=f"run-{provider}")
+        for provider in set(providers.values())
+    }
+    try:
+        futures = {}
+        # Ordered by shard, then sample, so every model's first calls are queued early
+        for (model, i, _), answered in requests.items():
+            provider = providers[model]
+            future = pools[provider].submit(_call_shard, model, shards[i][1], api_keys.get(provider), params,
+                                            (outdir, run_id, i, answered))
+            futures[future] = (model, i, answered)
+
+        for future in as_completed(futures):
+            model, i, answered = futures.pop(future)
+            result = future.result()
+            for sample in answered:
+                _accept(progress[model], shards[i], i, sample, result)
+            if not progress[model]["left"]:
+                finish(model)
+    except BaseException:
+        # Interrupted (Ctrl-C, a failed write): drop the calls not yet started.
+        # Calls already in flight journal their own results, so --resume
+        # doesn't pay for them again.
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+
+    failed = sum(len(s["errors"]) for s in summary_models.values())
+    complete = not failed and len(summary_models) == len(models)
+    wall = time.perf_counter() - started
+    summary = {
+        **meta_common,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "wall_seconds": wall,
+        "shard_size": shard_size,
+        "concurrency": {p: limits.get(p, DEFAULT_CONCURRENCY) for p in pools},
+        "resumed": bool(resume),
+        "complete": complete,
+        # In the order the models were requested
+        "results": [summary_models[model] for model in models if model in summary_models],
     }
+    summary_path = run_store.write_summary(outdir, run_id, summary)
+    if complete:
+        run_journal.record_complete(outdir, run_id)
+
+    slowest = max(summary_models.values(), key=lambda m: m["wall_seconds"], default=None)
+    print(f"Run complete: {run_id} in {wall:.1f}s"
+          + (f" (slowest model {slowest['model']}: {slowest['wall_seconds']:.1f}s)" if slowest else ""))
+    print("Summary:", summary_path)
+    if not complete:
+        unwritten = len(models) - len(summary_models)
+        print(f"⚠️  {failed} failed calls, {unwritten} unwritten models; retry only those with:\n"
+              f"    python -m tools.run_models --resume {run_id}")
+    return run_id
 
-    # Write a top-level meta capturing the run (without per-model fields)
-    top_meta_path = os.path.join(outdir, f"{run_id}__meta_common.json")
-    with open(top_meta_path, "w", encoding="utf-8") as fh:
-        json.dump(meta_common, fh, indent=2)
 
-    # Build shared prompt
-    msgs = build_batched_prompt(questions)
-    system_msg, user_msg = msgs["system"], msgs["user"]
+def shard_questions(questions: list, shard_size: int | None = None) -> List[tuple]:
+    """Split the bank into (start index, questions) shards; one shard if shard_size is None."""
+    if not shard_size or shard_size >= len(questions):
+        return [(0, questions)]
+    return [(i, questions[i:i + shard_size]) for i in range(0, len(questions), shard_size)]
 
-    api_keys = api_keys or {}
 
-    # Per-model loop
-    for model in models:
-        ts = datetime.now(timezone.utc).isoformat()
-        try:
-            # Pass None for api_key so the provider adapter reads from env
-            # Or pass a provider-specific key if provided in api_keys dict
-            from backend.providers import infer_provider
-            provider = infer_provider(model)
-            provider_api_key = api_keys.get(provider) if api_keys else None
-            content = call_model_batch(model, system_msg, user_msg, api_key=provider_api_key, params=params)
-        except Exception as e:
-            # If the model call fails, record empty answers and error text
-            content = f"(error calling model: {e})"
-
-        answers = parse_answers_from_content(content, n_expected=len(questions))
-
-        # Build per-question rows and compute parsed fraction
-        rows = []
-        parsed_count = 0
-        for q, ans in zip(questions, answers):
-            # Accept both exact phrases and anything close your parser handles
-            parsed = parse_response_to_likert(ans)
-            if parsed is not None:
-                parsed_count += 1
+def _call_shard(model: str, shard: list, api_key: str | None, params: Dict[str, Any] | None,
+                journal: tuple = None) -> Dict[str, Any]:
+    """
+    One model call over a shard of the bank (runs in a provider pool thread).
+
+    journal is (outdir, run_id, shard index, samples answered): the result is
+    journaled here, as soon as the call returns, so a billed call is never
+    lost to whatever happens to the main thread afterwards.
+    """
+    msgs = build_batched_prompt(shard)
+    ts = datetime.now(timezone.utc).isoformat()
+    began = time.perf_counter()
+    error = None
+    try:
+        # api_key None: the provider adapter reads it from env
+        content = call_model_batch(model, msgs["system"], msgs["user"], api_key=api_key, params=params)
+    except Exception as e:
+        # If the model call fails, record empty answers and error text
+        error = str(e)
+        content = f"(error calling model: {e})"
+    ended = time.perf_counter()
+    if journal is not None:
+        outdir, run_id, i, answered = journal
+        run_journal.record_shard(outdir, run_id, model, i, content, error, ts, ended - began, samples=answered)
+    return {"content": content, "error": error, "timestamp": ts,
+            "seconds": ended - began, "began": began, "ended": ended}
+
+
+def _new_progress(samples: int, n_questions: int, n_shards: int) -> Dict[str, Any]:
+    """A model's answers as they arrive: parsed straight into an int8 samples x questions matrix."""
+    return {
+        "scores": np.full((samples, n_questions), run_store.MISSING_SCORE, dtype=np.int8),
+        # (question index, score) -> first raw answer text with that score
+        "raw": {},
+        "timestamps": [None] * n_shards,
+        "preview": "",
+        "left": samples * n_shards,
+        "errors": [],
+        "seconds": 0.0,
+        "began": None,
+        "ended": None,
+        "resumed": 0,
+    }
+
+
+def _accept(progress: Dict[str, Any], shard: tuple, i: int, sample: int, result: Dict[str, Any]):
+    """Parse one call's answers for one sample into the model's progress (the content isn't kept)."""
+    start, items = shard
+    # A failed call's content is our error text, not answers: its scores stay MISSING_SCORE
+    answers = [] if result["error"] else parse_answers_from_content(result["content"], n_expected=len(items))
+    for j, ans in enumerate(answers):
+        # Accept both exact phrases and anything close your parser handles
+        parsed = parse_response_to_likert(ans)
+        score = run_store.MISSING_SCORE if parsed is None else parsed
+        progress["scores"][sample, start + j] = score
+        progress["raw"].setdefault((start + j, score), ans)
+    ts = progress["timestamps"][i]
+    progress["timestamps"][i] = result["timestamp"] if ts is None else min(ts, result["timestamp"])
+    if sample == 0 and len(progress["preview"]) < 500:
+        progress["preview"] = (progress["preview"] + "\n" + result["content"]).lstrip("\n")
+    if result["error"]:
+        progress["errors"].append(result["error"])
+    progress["seconds"] += result["seconds"]
+    if "began" in result:
+        began, ended = progress["began"], progress["ended"]
+        progress["began"] = result["began"] if began is None else min(began, result["began"])
+        progress["ended"] = result["ended"] if ended is None else max(ended, result["ended"])
+    else:
+        # Replayed from the journal: took no time in this invocation
+        progress["resumed"] += 1
+    progress["left"] -= 1
+
+
+def _write_model(outdir, run_id, model, provider, questions, shards, progress, meta_common, run_started):
+    """Append one model's answers (each question's majority over the samples) and samples to the store.
+
+    Returns:
+        The model's entry of the run summary
+    """
+    scores = progress["scores"]
+    n_samples = len(scores)
+    dist = answer_distributions(scores)
+    rows = []
+    for (start, shard), ts in zip(shards, progress["timestamps"]):
+        for j, q in enumerate(shard):
+            k = start + j
+            majority = None if np.isnan(dist["majority"][k]) else int(dist["majority"][k])
+            raw_key = (k, run_store.MISSING_SCORE if majority is None else majority)
             rows.append({
-                "run_id": run_id,
-                "model": model,
                 "question_id": q["id"],
-                "question_text": q["text"],
-                "raw_answer": ans,
-                "parsed_score": parsed if parsed is not None else "",
+                "raw_answer": progress["raw"].get(raw_key, ""),
+                "parsed_score": majority,
                 "timestamp": ts,
             })
-        parsed_fraction = parsed_count / max(1, len(questions))
-
-        # Write per-question CSV
-        csv_path = os.path.join(outdir, f"{run_id}__{model}.csv")
-        with open(csv_path, "w", newline="", encoding="utf-8") as fh:
-            writer = csv.DictWriter(fh, fieldnames=list(rows[0].keys()))
-            writer.writeheader()
-            writer.writerows(rows)
-        print("Wrote", csv_path)
-
-        # Write per-model meta
-        per_model_meta = {
-            **meta_common,
-            "model": model,
-            "run_timestamp": ts,
-            "parsed_fraction": parsed_fraction,
-            "raw_response_preview": content[:500],  # small preview for debugging
+    parsed_fraction = float((scores != run_store.MISSING_SCORE).mean()) if scores.size else 0.0
+
+    # Append this model's answers and meta to the run store (question
+    # text goes to the store's side table, once per bank)
+    per_model_meta = {
+        **meta_common,
+        "run_timestamp": min(progress["timestamps"]),
+        "parsed_fraction": parsed_fraction,
+        "raw_response_preview": progress["preview"][:500],  # small preview for debugging
+    }
+    qids = [q["id"] for q in questions]
+    path = run_store.append_run(outdir, run_id, model, rows, per_model_meta, questions,
+                                samples=(qids, scores) if n_samples > 1 else None)
+
+    wall = progress["ended"] - progress["began"] if progress["began"] is not None else 0.0
+    errors = progress["errors"]
+    print(f"Wrote {path} ({wall:.1f}s{', ' + str(len(errors)) + ' failed calls' if errors else ''})")
+    entry = {
+        "model": model,
+        "provider": provider,
+        "shards": len(shards),
+        "samples": n_samples,
+        "wall_seconds": wall,
+        "call_seconds": progress["seconds"],
+        "resumed_shards": progress["resumed"],
+        "finished_after_seconds": progress["ended"] - run_started if progress["ended"] is not None else 0.0,
+        "parsed_fraction": parsed_fraction,
+        "errors": errors,
+    }
+    if n_samples > 1:
+        entry["mean_entropy"] = float(dist["entropy"].mean())
+        entry["questions"] = {
+            qid: {
+                # Counts of strongly disagree .. strongly agree
+                "distribution": [int(c) for c in dist["counts"][k]],
+                "missing": int(dist["missing"][k]),
+                "entropy": float(dist["entropy"][k]),
+                "majority": None if np.isnan(dist["majority"][k]) else int(dist["majority"][k]),
+            }
+            for k, qid in enumerate(qids)
         }
-        meta_path = os.path.join(outdir, f"{run_id}__{model}_meta.json")
-        with open(meta_path, "w", encoding="utf-8") as fh:
-            json.dump(per_model_meta, fh, indent=2)
-        print("Wrote meta", meta_path)
-
-    print("Run complete. Meta (common):", top_meta_path)
-    return run_id
+    return entry
 
 
 # ---------- CLI ----------
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run multiple models on the question bank (batched). Supports OpenAI, Anthropic Claude, and Google Gemini.")
-    parser.add_argument("--models", required=True, help="Comma-separated model names (e.g., gpt-4o-mini,claude-3-sonnet-20240229,gemini-2.0-flash)")
+    parser.add_argument("--models", default=None, help="Comma-separated model names (e.g., gpt-4o-mini,claude-3-sonnet-20240229,gemini-2.0-flash)")
+    parser.add_argument("--resume", default=None, metavar="RUN_ID", help="Continue an unfinished run: call only its failed or missing shards")
     parser.add_argument("--api-key-openai", default=None, help="OpenAI API key (or use OPENAI_API_KEY env)")
     parser.add_argument("--api-key-anthropic", default=None, help="Anthropic API key (or use ANTHROPIC_API_KEY env)")
     parser.add_argument("--api-key-gemini", default=None, help="Google Gemini API key (or use GEMINI_API_KEY env)")
-    parser.add_argument("--outdir", default="data/runs", help="Output directory for run CSVs and meta")
+    parser.add_argument("--outdir", default="data/runs", help="Run store root for answers and meta")
     parser.add_argument("--questions", default="data/questions.json", help="Path to question bank JSON")
     parser.add_argument("--temperature", default="0.0", help="Sampling temperature (default 0.0)")
     parser.add_argument("--max-tokens", dest="max_tokens", default="1200", help="Max tokens for response (default 1200)")
+    parser.add_argument("--samples", type=int, default=1, help="Answers per model and question; at temperature > 0 each is its own call (default 1)")
+    parser.add_argument("--shard-size", type=int, default=None, help="Questions per call; shards run concurrently (default: whole bank)")
+    parser.add_argument("--concurrency", default=None, help="Per-provider concurrent calls, e.g. openai=8,anthropic=4")
     parser.add_argument("--post-aggregate", dest="post_aggregate", action="store_true", help="Run aggregation and plotting after models complete (default: on)")
     parser.add_argument("--no-post-aggregate", dest="post_aggregate", action="store_false", help="Do not run aggregation and plotting after models complete")
     parser.set_defaults(post_aggregate=True)
     parser.add_argument("--summary-out", default="data/summary/aggregates.csv", help="Path to write aggregates CSV when --post-aggregate is set")
     parser.add_argument("--plots-out", default="data/plots", help="Output directory for plots when --post-aggregate is set")
     args = parser.parse_args()
+    if not args.models and not args.resume:
+        parser.error("--models is required unless --resume is given")
 
     # Model list
-    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    models = [m.strip() for m in (args.models or "").split(",") if m.strip()]
 
     # Params for model calls
     params = {
@@ -305,8 +569,16 @@ if __name__ == "__main__":
     if args.api_key_gemini:
         api_keys['gemini'] = args.api_key_gemini
 
+    concurrency = {}
+    for item in (args.concurrency or "").split(","):
+        if item.strip():
+            provider, _, n = item.partition("=")
+            concurrency[provider.strip()] = int(n)
+
     # Execute
-    run_models(models, api_keys=api_keys or None, outdir=args.outdir, params=params, questions_path=args.questions)
+    run_models(models, api_keys=api_keys or None, outdir=args.outdir, params=params, questions_path=args.questions,
+               shard_size=args.shard_size, concurrency=concurrency or None, resume=args.resume,
+               samples=args.samples)
     # Optionally run aggregation + plotting immediately after
     if args.post_aggregate:
         try:
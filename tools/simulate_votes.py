@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+tools/simulate_votes.py
+
+Synthetic vote simulator and rating-engine benchmark.
+
+Generates a vote stream from known "true" model strengths (Elo scale) and
+feeds it to the rating engines, measuring throughput, per-update latency
+and how close each engine gets to the true strengths:
+
+  elo            backend.elo.update_elo on an in-memory dict (pure math)
+  file           backend.elo.update_ratings (WAL-backed file store)
+  storage        SQLStorage.update_ratings (full DB vote path), optionally
+                 from several threads at once
+  glicko2        backend.glicko2.rate_period in batched rating periods
+  bradley-terry  one backend.bradley_terry fit over all votes
+
+The stream can be made realistic with outcome noise (a share of votes cast
+at random), skewed pairings (popular models are picked far more often,
+Zipf-like) and bursts (the same pair voted on many times in a row).
+
+Convergence error is the RMSE between the engine's ratings and the true
+strengths after centering both (ratings are only defined up to a shift),
+plus the Spearman rank correlation. Online engines are also checkpointed
+during the run to show how fast they converge.
+
+The file and storage engines run against throwaway files in a temporary
+directory unless --database-url is given. Results are written as JSON for
+regression tracking.
+
+Usage:
+  python -m tools.simulate_votes
+  python -m tools.simulate_votes --votes 100000 --models 20 --engines elo,glicko2,bradley-terry
+  python -m tools.simulate_votes --engines storage --workers 8 --burst-prob 0.05
+  python -m tools.simulate_votes --pair-skew 1.2 --noise 0.1 --output data/benchmarks/skewed.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend import bradley_terry, elo, glicko2
+
+ENGINES = ('elo', 'file', 'storage', 'glicko2', 'bradley-terry')
+
+DEFAULT_OUTPUT_DIR = 'data/benchmarks'
+
+
+# ---------- vote stream ----------
+
+def true_strengths(n_models, spread=200.0, seed=0):
+    """Draw true Elo-scale strengths ~ N(1500, spread), strongest first."""
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.normal(elo.DEFAULT_RATING, spread, n_models))[::-1]
+
+
+def generate_votes(strengths, n_votes, noise=0.0, pair_skew=0.0, burst_prob=0.0,
+                   burst_size=20, seed=0):
+    """
+    Generate a synthetic vote stream.
+
+    Args:
+        strengths: True Elo-scale strength per model
+        n_votes: Number of votes
+        noise: Share of votes decided by a coin flip instead of strength
+        pair_skew: Zipf exponent of model popularity (0 = uniform pairing)
+        burst_prob: Chance that a pairing starts a burst of repeated votes
+        burst_size: Mean length of a burst
+        seed: Random seed
+
+    Returns:
+        (winners, losers) arrays of model indices
+    """
+    rng = np.random.default_rng(seed)
+    n = len(strengths)
+    popularity = 1.0 / np.arange(1, n + 1) ** pair_skew
+    popularity = rng.permutation(popularity / popularity.sum())
+
+    # Each pairing is voted on once, or burst_size times on average in a burst
+    lengths = np.where(rng.random(n_votes) < burst_prob,
+                       1 + rng.geometric(1.0 / max(burst_size, 1), n_votes), 1)
+    n_pairings = int(np.searchsorted(np.cumsum(lengths), n_votes)) + 1
+    lengths = lengths[:n_pairings]
+
+    a = rng.choice(n, n_pairings, p=popularity)
+    b = rng.choice(n, n_pairings, p=popularity)
+    same = a == b
+    b[same] = (a[same] + rng.integers(1, n, same.sum())) % n
+    a = np.repeat(a, lengths)[:n_votes]
+    b = np.repeat(b, lengths)[:n_votes]
+
+    p_a = 1.0 / (1.0 + 10.0 ** ((strengths[b] - strengths[a]) / 400.0))
+    p_a = np.where(rng.random(n_votes) < noise, 0.5, p_a)
+    a_wins = rng.random(n_votes) < p_a
+    return np.where(a_wins, a, b), np.where(a_wins, b, a)
+
+
+# ---------- metrics ----------
+
+def convergence_error(ratings, strengths):
+    """RMSE after centering, and Spearman rank correlation, against the true strengths."""
+    ratings = np.asarray(ratings, dtype=float)
+    error = (ratings - ratings.mean()) - (strengths - strengths.mean())
+    ranks = np.argsort(np.argsort(ratings))
+    true_ranks = np.argsort(np.argsort(strengths))
+    spearman = float(np.corrcoef(ranks, true_ranks)[0, 1]) if len(ratings) > 1 else 1.0
+    return {'rmse': round(float(np.sqrt(np.mean(error ** 2))), 2), 'spearman': round(spearman, 4)}
+
+
+def latency_summary(seconds):
+    """p50 / p99 / max of per-update latencies, in milliseconds."""
+    if not len(seconds):
+        return None
+    p50, p99 = np.percentile(seconds, [50, 99]) * 1000.0
+    return {'p50': round(float(p50), 4), 'p99': round(float(p99), 4),
+            'max': round(float(np.max(seconds)) * 1000.0, 4)}
+
+
+def _checkpoints(n_votes, count):
+    return set(np.linspace(0, n_votes, count + 1, dtype=int)[1:]) if count else set()
+
+
+def _result(n_votes, elapsed, latencies, ratings, strengths, convergence=None, **extra):
+    return {
+        'votes': n_votes,
+        'seconds': round(elapsed, 4),
+        'votes_per_sec': round(n_votes / elapsed, 1) if elapsed > 0 else None,
+        'latency_ms': latency_summary(latencies),
+        'error': convergence_error(ratings, strengths),
+        'convergence': convergence or [],
+        **extra,
+    }
+
+
+# ---------- engines ----------
+
+def run_elo(names, strengths, winners, losers, checkpoints=10):
+    """backend.elo.update_elo over an in-memory dict."""
+    ratings = {name: float(elo.DEFAULT_RATING) for name in names}
+    marks = _checkpoints(len(winners), checkpoints)
+    latencies = np.empty(len(winners))
+    convergence = []
+    elapsed = 0.0
+    for i, (w, l) in enumerate(zip(winners.tolist(), losers.tolist())):
+        started = time.perf_counter()
+        ratings[names[w]], ratings[names[l]] = elo.update_elo(ratings[names[w]], ratings[names[l]], "1")
+        latencies[i] = time.perf_counter() - started
+        elapsed += latencies[i]
+        if i + 1 in marks:
+            convergence.append({'votes': i + 1, **convergence_error([ratings[n] for n in names], strengths)})
+    return _result(len(winners), elapsed, latencies, [ratings[n] for n in names], strengths, convergence)
+
+
+def run_file(names, strengths, winners, losers, workdir, checkpoints=10):
+    """backend.elo.update_ratings against a throwaway WAL-backed store."""
+    elo.ELO_FILE = os.path.join(workdir, 'elo_ratings.json')
+    elo.WAL_FILE = elo.ELO_FILE + '.wal'
+    elo.LOCK_FILE = elo.ELO_FILE + '.lock'
+    marks = _checkpoints(len(winners), checkpoints)
+    latencies = np.empty(len(winners))
+    convergence = []
+    elapsed = 0.0
+    for i, (w, l) in enumerate(zip(winners.tolist(), losers.tolist())):
+        started = time.perf_counter()
+        elo.update_ratings(names[w], names[l])
+        latencies[i] = time.perf_counter() - started
+        elapsed += latencies[i]
+        if i + 1 in marks:
+            current = elo.load_ratings()
+            convergence.append({'votes': i + 1, **convergence_error(
+                [current.get(n, {}).get('rating', elo.DEFAULT_RATING) for n in names], strengths)})
+    final = elo.load_ratings()
+    ratings = [final.get(n, {}).get('rating', elo.DEFAULT_RATING) for n in names]
+    return _result(len(winners), elapsed, latencies, ratings, strengths, convergence,
+                   wal_bytes=os.path.getsize(elo.WAL_FILE) if os.path.exists(elo.WAL_FILE) else 0)
+
+
+def run_storage(names, strengths, winners, losers, url, workers=1, checkpoints=10):
+    """SQLStorage.update_ratings (the DB vote path), from `workers` threads."""
+    from backend.storage import open_storage
+
+    storage = open_storage(url)
+    storage.ensure_table_exists()
+
+    def current_ratings():
+        board = storage.get_all_ratings()
+        return [board.get(n, {}).get('rating', elo.DEFAULT_RATING) for n in names]
+
+    # Checkpoints split the stream into rounds; each round is shared by the workers
+    bounds = sorted(_checkpoints(len(winners), checkpoints) | {len(winners)})
+    latencies = np.empty(len(winners))
+    convergence = []
+    elapsed = 0.0
+    lock = threading.Lock()
+
+    def worker(indices):
+        local = []
+        for i in indices:
+            started = time.perf_counter()
+            storage.update_ratings(names[winners[i]], names[losers[i]])
+            local.append((i, time.perf_counter() - started))
+        with lock:
+            for i, seconds in local:
+                latencies[i] = seconds
+
+    start = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for end in bounds:
+            indices = np.arange(start, end)
+            started = time.perf_counter()
+            list(pool.map(worker, [indices[k::workers] for k in range(workers)]))
+            elapsed += time.perf_counter() - started
+            convergence.append({'votes': int(end), **convergence_error(current_ratings(), strengths)})
+            start = end
+
+    return _result(len(winners), elapsed, latencies, current_ratings(), strengths,
+                   convergence if checkpoints else [], workers=workers)
+
+
+def run_glicko2(names, strengths, winners, losers, period_votes=1000):
+    """backend.glicko2.rate_period over consecutive periods of period_votes votes."""
+    n = len(names)
+    ratings = np.full(n, glicko2.DEFAULT_RATING)
+    rds = np.full(n, glicko2.DEFAULT_RD)
+    volatilities = np.full(n, glicko2.DEFAULT_VOLATILITY)
+    latencies = []
+    convergence = []
+    for start in range(0, len(winners), period_votes):
+        w, l = winners[start:start + period_votes], losers[start:start + period_votes]
+        started = time.perf_counter()
+        # Identical games within a period are rated together
+        pairs, counts = np.unique(np.stack([w, l]), axis=1, return_counts=True)
+        ratings, rds, volatilities = glicko2.rate_period(ratings, rds, volatilities,
+                                                         pairs[0], pairs[1], counts)
+        latencies.append(time.perf_counter() - started)
+        convergence.append({'votes': start + len(w), **convergence_error(ratings, strengths)})
+    return _result(len(winners), sum(latencies), latencies, ratings, strengths, convergence,
+                   period_votes=period_votes, latency_unit='period')
+
+
+def run_bradley_terry(names, strengths, winners, losers):
+    """One backend.bradley_terry fit over all votes (counts aggregation included)."""
+    started = time.perf_counter()
+    pairs, counts = np.unique(np.stack([winners, losers]), axis=1, return_counts=True)
+    _, wins = bradley_terry.win_matrix([(names[w], names[l], c) for w, l, c in zip(*pairs, counts)])
+    ratings = bradley_terry.fit(wins)
+    elapsed = time.perf_counter() - started
+    # win_matrix orders models by name; names are zero-padded so that is index order
+    return _result(len(winners), elapsed, [elapsed], ratings, strengths, latency_unit='fit')
+
+
+# ---------- driver ----------
+
+def simulate(engines=ENGINES, n_models=8, n_votes=20000, spread=200.0, noise=0.05,
+             pair_skew=0.0, burst_prob=0.0, burst_size=20, workers=1, period_votes=1000,
+             checkpoints=10, database_url=None, seed=0):
+    """
+    Run the simulation on each engine.
+
+    Returns:
+        Dict with the config, the true strengths and per-engine results
+    """
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        raise ValueError(f"Unknown engine(s): {', '.join(sorted(unknown))} (choose from {', '.join(ENGINES)})")
+    if n_models < 2:
+        raise ValueError("Need at least 2 models")
+
+    strengths = true_strengths(n_models, spread, seed)
+    names = [f"sim-model-{i:03d}" for i in range(n_models)]
+    winners, losers = generate_votes(strengths, n_votes, noise, pair_skew, burst_prob, burst_size, seed)
+
+    workdir = tempfile.mkdtemp(prefix='nnn-sim-')
+    results = {}
+    try:
+        for engine in engines:
+            print(f"Running {engine}...")
+            if engine == 'elo':
+                results[engine] = run_elo(names, strengths, winners, losers, checkpoints)
+            elif engine == 'file':
+                results[engine] = run_file(names, strengths, winners, losers, workdir, checkpoints)
+            elif engine == 'storage':
+                url = database_url or f"sqlite:///{os.path.join(workdir, 'sim.db')}"
+                results[engine] = run_storage(names, strengths, winners, losers, url, workers, checkpoints)
+            elif engine == 'glicko2':
+                results[engine] = run_glicko2(names, strengths, winners, losers, period_votes)
+            else:
+                results[engine] = run_bradley_terry(names, strengths, winners, losers)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'models': n_models, 'votes': n_votes, 'spread': spread, 'noise': noise,
+            'pair_skew': pair_skew, 'burst_prob': burst_prob, 'burst_size': burst_size,
+            'workers': workers, 'period_votes': period_votes, 'seed': seed,
+            'database': 'custom' if database_url else 'temporary sqlite',
+        },
+        'true_strengths': {name: round(float(s), 2) for name, s in zip(names, strengths)},
+        'engines': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rating engines on synthetic votes.')
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help=f'Comma-separated engines ({", ".join(ENGINES)})')
+    parser.add_argument('--models', type=int, default=8, help='Number of models')
+    parser.add_argument('--votes', type=int, default=20000, help='Number of votes')
+    parser.add_argument('--spread', type=float, default=200.0, help='SD of true strengths (Elo points)')
+    parser.add_argument('--noise', type=float, default=0.05, help='Share of votes cast at random')
+    parser.add_argument('--pair-skew', type=float, default=0.0,
+                        help='Zipf exponent of model popularity (0 = uniform pairs)')
+    parser.add_argument('--burst-prob', type=float, default=0.0,
+                        help='Chance a pairing starts a burst of repeated votes')
+    parser.add_argument('--burst-size', type=int, default=20, help='Mean burst length')
+    parser.add_argument('--workers', type=int, default=1, help='Threads voting through the storage engine')
+    parser.add_argument('--period-votes', type=int, default=1000, help='Votes per Glicko-2 rating period')
+    parser.add_argument('--checkpoints', type=int, default=10, help='Convergence checkpoints per run')
+    parser.add_argument('--database-url', default=None,
+                        help='Database for the storage engine (default: a temporary SQLite file)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--output', default=None,
+                        help=f'Results JSON (default: {DEFAULT_OUTPUT_DIR}/simulate_votes_<timestamp>.json)')
+    args = parser.parse_args()
+
+    try:
+        report = simulate(
+            engines=[e.strip() for e in args.engines.split(',') if e.strip()],
+            n_models=args.models, n_votes=args.votes, spread=args.spread, noise=args.noise,
+            pair_skew=args.pair_skew, burst_prob=args.burst_prob, burst_size=args.burst_size,
+            workers=args.workers, period_votes=args.period_votes, checkpoints=args.checkpoints,
+            database_url=args.database_url, seed=args.seed,
+        )
+    except Exception as e:
+        print(f"❌ Simulation failed: {e}")
+        return 1
+
+    print(f"\n{'Engine':<15} {'Votes/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'RMSE':>8} {'Spearman':>9}")
+    for engine, r in report['engines'].items():
+        latency = r['latency_ms'] or {}
+        print(f"{engine:<15} {r['votes_per_sec'] or 0:>12,.0f} {latency.get('p50', 0):>10.4f} "
+              f"{latency.get('p99', 0):>10.4f} {r['error']['rmse']:>8.1f} {r['error']['spearman']:>9.3f}")
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"simulate_votes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+tools/update_glicko.py
+
+Batched Glicko-2 rating-period job. Suitable for cron (e.g. hourly or daily).
+
+Reads the votes logged since the previous run, groups them into rating
+periods by created_at (--period), and applies each period to all models
+at once (see backend/glicko2.py). The current period is still open, so its
+votes wait for the first run after it ends. Results go to glicko_ratings,
+served by /api/ratings?engine=glicko2. The last processed vote id is kept
+in rating_job_state, and ratings and progress are committed together, so
+a crashed run is simply repeated. A running tools/import_votes is waited
+for (queries.VOTE_IMPORT_LOCK) so the last id never passes its votes.
+
+Every closed period since the previous run is a rating period, including
+periods without a single vote, so the RD of idle models keeps growing.
+Votes that arrive late for an already-processed period are applied in the
+run that sees them.
+
+Usage:
+  python -m tools.update_glicko
+  python -m tools.update_glicko --period hour
+  python -m tools.update_glicko --tau 0.3
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime, timezone
+from itertools import groupby
+
+import numpy as np
+
+from backend import glicko2
+from backend.storage import queries
+from backend.supabase_db import get_storage
+
+JOB_NAME = 'glicko2'
+
+
+def update_glicko(period='day', tau=glicko2.TAU):
+    """
+    Apply every pending rating period.
+
+    Args:
+        period: Rating period length, 'hour' or 'day'
+        tau: Glicko-2 system constant
+
+    Returns:
+        Dict with periods, games and models processed
+    """
+    if period not in queries.TAG_ROLLUP_TABLES:
+        raise ValueError(f"period must be one of: {', '.join(queries.TAG_ROLLUP_TABLES)}")
+
+    storage = get_storage()
+    storage.ensure_glicko_tables_exist()
+
+    step = queries.TAG_ROLLUP_TABLES[period][1]
+    # The current period is still open; everything before it is rated
+    last_closed = queries.bucket_start(datetime.now(timezone.utc), period) - step
+
+    with storage.transaction(write=True) as cursor:
+        # A running import holds ids it hasn't committed yet; wait for it to finish
+        storage.advisory_lock(cursor, queries.VOTE_IMPORT_LOCK, shared=True)
+        last_id, last_period = storage.drive(queries.get_job_state(JOB_NAME), cursor)
+        last_period = _as_datetime(last_period)
+        max_id = storage.drive(queries.get_closed_period_vote_id(last_id, period), cursor)
+
+        pair_counts = []
+        if max_id > last_id:
+            pair_counts = storage.drive(queries.get_period_pair_counts(last_id, max_id, period), cursor)
+        games_by_period = {
+            start: list(games) for start, games in groupby(pair_counts, key=lambda row: _as_datetime(row[0]))
+        }
+
+        # Every closed period since the last run is a rating period, with or
+        # without games: idle models' RD grows over quiet periods too (step 6
+        # of Glicko-2). The first run starts at the first period with votes.
+        timeline = set(games_by_period)
+        first = last_period + step if last_period is not None else min(timeline, default=None)
+        if first is not None:
+            while first <= last_closed:
+                timeline.add(first)
+                first += step
+        if not timeline:
+            return {'periods': 0, 'games': 0, 'models': 0}
+
+        state = storage.drive(queries.get_glicko_state(), cursor)
+        models = sorted(set(state) | {m for _, w, l, _ in pair_counts for m in (w, l)})
+        index = {m: i for i, m in enumerate(models)}
+        start = [state.get(m, glicko2.new_player()) for m in models]
+        ratings = np.array([s['rating'] for s in start])
+        rds = np.array([s['rd'] for s in start])
+        volatilities = np.array([s['volatility'] for s in start])
+        wins = np.array([state.get(m, {}).get('wins', 0) for m in models])
+        losses = np.array([state.get(m, {}).get('losses', 0) for m in models])
+
+        # Late votes for periods already rated come first, as periods of their own
+        for period_start in sorted(timeline):
+            games = games_by_period.get(period_start, [])
+            winners = np.array([index[w] for _, w, _, _ in games], dtype=int)
+            losers = np.array([index[l] for _, _, l, _ in games], dtype=int)
+            counts = np.array([c for _, _, _, c in games], dtype=float)
+            ratings, rds, volatilities = glicko2.rate_period(
+                ratings, rds, volatilities, winners, losers, counts, tau=tau
+            )
+            np.add.at(wins, winners, counts.astype(int))
+            np.add.at(losses, losers, counts.astype(int))
+
+        rows = [
+            (m, float(ratings[i]), float(rds[i]), float(volatilities[i]), int(wins[i]), int(losses[i]))
+            for i, m in enumerate(models)
+        ]
+        storage.drive(queries.save_glicko_state(rows), cursor)
+        last_period = max(p for p in (last_period, max(timeline)) if p is not None)
+        storage.drive(queries.set_job_state(JOB_NAME, max(max_id, last_id), last_period), cursor)
+
+    return {
+        'periods': len(timeline),
+        'games': sum(c for _, _, _, c in pair_counts),
+        'models': len(models),
+    }
+
+
+def _as_datetime(value):
+    """Period starts come back as datetimes (Postgres) or ISO strings (SQLite)."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending Glicko-2 rating periods.')
+    parser.add_argument('--period', choices=list(queries.TAG_ROLLUP_TABLES), default='day',
+                        help='Rating period length')
+    parser.add_argument('--tau', type=float, default=glicko2.TAU,
+                        help='System constant constraining volatility changes')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        result = update_glicko(period=args.period, tau=args.tau)
+    except Exception as e:
+        print(f"❌ Glicko-2 update failed: {e}")
+        return 1
+
+    if not result['periods']:
+        print("✓ No new votes or closed periods since the last run")
+    else:
+        print(f"✅ Applied {result['periods']} rating period(s): {result['games']:,} games, "
+              f"{result['models']} models in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
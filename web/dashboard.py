@@ -1,6 +1,8 @@
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 
 st.set_page_config(layout='wide', page_title='Neural Net Neutrality — Dashboard')
 st.title('Neural Net Neutrality — Compact Dashboard')
@@ -14,21 +16,29 @@ def load_summary(path='data/summary/aggregates.csv'):
 
 @st.cache_data
 def load_runs(indir='data/runs'):
-    import os, glob
-    files = glob.glob(os.path.join(indir, '*.csv'))
-    if not files:
+    """All answers in the run store (one scan), with question text joined from its side table."""
+    import os
+    answers_dir = os.path.join(indir, 'answers')
+    if not os.path.isdir(answers_dir):
         return pd.DataFrame()
-    dfs = []
-    for f in files:
-        try:
-            df = pd.read_csv(f)
-            df['source_file'] = f
-            dfs.append(df)
-        except Exception:
-            continue
-    if not dfs:
+    try:
+        answers = pd.read_parquet(answers_dir, partitioning='hive')
+        meta = pd.read_parquet(os.path.join(indir, 'runs'), columns=['run_id', 'model', 'question_bank'])
+        questions = pd.read_parquet(os.path.join(indir, 'questions.parquet'))
+    except Exception:
         return pd.DataFrame()
-    return pd.concat(dfs, ignore_index=True)
+    for df in (answers, meta, questions):
+        for col in df.columns.intersection(['run_id', 'model', 'question_id', 'question_bank']):
+            df[col] = df[col].astype(str)
+    answers = answers.merge(meta, on=['run_id', 'model'], how='left')
+    return answers.merge(questions, on=['question_bank', 'question_id'], how='left')
+
+def ellipse_path(x, y, width, height, angle, points=60):
+    """Outline of a bootstrap confidence ellipse (matplotlib Ellipse parameters)."""
+    t = np.linspace(0, 2 * np.pi, points)
+    a = np.radians(angle)
+    ex, ey = width / 2 * np.cos(t), height / 2 * np.sin(t)
+    return x + ex * np.cos(a) - ey * np.sin(a), y + ex * np.sin(a) + ey * np.cos(a)
 
 summary = load_summary()
 runs = load_runs()
@@ -46,6 +56,15 @@ if display.empty:
     st.info('No aggregated runs found. Run `python tools/aggregate.py` after producing runs.')
 else:
     fig = px.scatter(display, x='economic', y='social', color='model', hover_data=['run_id'])
+    # shade each point's bootstrap confidence ellipse in its model's colour
+    if 'ellipse_width' in display:
+        colors = {trace.name: trace.marker.color for trace in fig.data}
+        for _, row in display.dropna(subset=['ellipse_width']).iterrows():
+            xs, ys = ellipse_path(row['economic'], row['social'], row['ellipse_width'],
+                                  row['ellipse_height'], row['ellipse_angle'])
+            fig.add_trace(go.Scatter(x=xs, y=ys, mode='lines', fill='toself', opacity=0.2,
+                                     line=dict(color=colors.get(row['model']), width=1),
+                                     hoverinfo='skip', showlegend=False))
     fig.update_layout(width=800, height=600)
     st.plotly_chart(fig)
 
@@ -74,7 +93,7 @@ else:
 
 st.subheader('Raw answers (click to inspect)')
 if runs.empty:
-    st.info('No run CSVs found in data/runs')
+    st.info('No runs found in data/runs')
 else:
     # allow filtering
     if model_choice != 'All':